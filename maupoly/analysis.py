@@ -0,0 +1,220 @@
+"""Аналитическая оценка игровой доски.
+
+Строит матрицу переходов цепи Маркова для перемещения игрока по доске:
+- Сумма двух костей кубика.
+- Перемещение полями телепорта.
+- Тюрьма (по желанию) с попытками выбросить дубль.
+
+По стационарному распределению считает вероятность попадания на каждое
+поле, ожидаемую ренту и срок окупаемости полей.
+Все вычисления векторные, потому доски из сотен полей и множество
+вариантов правил считаются за миллисекунды.
+
+Требует numpy: `pip install maupoly[analysis]`.
+
+```sh
+uv run -m maupoly.analysis --players 4 --jail-turns 3
+```
+"""
+
+import argparse
+from dataclasses import dataclass
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError(
+        "Board analysis requires numpy: pip install maupoly[analysis]"
+    ) from e
+
+from maupoly.board import Board
+from maupoly.boards import CLASSIC_BOARD
+from maupoly.dice import Dice
+from maupoly.field import (
+    BaseRentField,
+    FieldType,
+    TeleportField,
+)
+
+# Матрица переходов
+# =================
+
+
+def dice_distribution(sides: int = Dice.SIDES) -> tuple[np.ndarray, np.ndarray]:
+    """Вероятности выпадения каждой суммы двух костей.
+
+    Возвращает вероятности всех сумм и вероятности сумм, выпавших дублем.
+    Индекс массива совпадает с суммой на кубике.
+    """
+    faces = np.arange(1, sides + 1)
+    totals = np.add.outer(faces, faces).ravel()
+    size = 2 * sides + 1
+    probs = np.bincount(totals, minlength=size) / sides**2
+    doubles = np.bincount(faces * 2, minlength=size) / sides**2
+    return probs, doubles
+
+
+def transition_matrix(
+    board: Board, jail_turns: int = 0, sides: int = Dice.SIDES
+) -> np.ndarray:
+    """Матрица переходов за один ход игрока.
+
+    Первые `len(board)` состояний - поля доски.
+    Если `jail_turns` больше нуля, телепорт в тюрьму сажает игрока
+    на столько ходов, за которые он пытается выбросить дубль.
+    Каждый ход в тюрьме - отдельное состояние после полей доски.
+    """
+    n = len(board)
+    size = n + jail_turns
+    probs, doubles = dice_distribution(sides)
+    steps = np.flatnonzero(probs)
+
+    # Куда на самом деле попадёт игрок, встав на поле
+    dest = np.arange(n)
+    prison = -1
+    for i, field in enumerate(board):
+        if isinstance(field, TeleportField):
+            target = field.to_field % n
+            if jail_turns > 0 and board[target].type == FieldType.PRISON:
+                prison = target
+                dest[i] = n
+            else:
+                dest[i] = target
+
+    matrix = np.zeros((size, size))
+    landing = dest[(np.arange(n)[:, None] + steps[None, :]) % n]
+    np.add.at(
+        matrix,
+        (np.repeat(np.arange(n), len(steps)), landing.ravel()),
+        np.tile(probs[steps], n),
+    )
+    if prison < 0:
+        return matrix[:n, :n] if jail_turns > 0 else matrix
+
+    # Ходы в тюрьме: дубль выпускает, иначе игрок остаётся
+    exits = dest[(prison + steps) % n]
+    jail = np.arange(n, size)
+    np.add.at(
+        matrix,
+        (np.repeat(jail[:-1], len(steps)), np.tile(exits, jail_turns - 1)),
+        np.tile(doubles[steps], jail_turns - 1),
+    )
+    matrix[jail[:-1], jail[1:]] = 1 - doubles.sum()
+
+    # На последнем ходу игрок платит за выход и идёт на любую сумму
+    np.add.at(matrix, (np.full(len(steps), size - 1), exits), probs[steps])
+    return matrix
+
+
+def stationary_distribution(matrix: np.ndarray) -> np.ndarray:
+    """Стационарное распределение цепи Маркова.
+
+    Принимает как одну матрицу, так и стопку матриц `(..., m, m)`,
+    чтобы посчитать сразу несколько вариантов правил.
+    """
+    size = matrix.shape[-1]
+    system = np.swapaxes(matrix, -1, -2) - np.eye(size)
+    system[..., -1, :] = 1
+    rhs = np.zeros(matrix.shape[:-1] + (1,))
+    rhs[..., -1, 0] = 1
+    return np.linalg.solve(system, rhs)[..., 0]
+
+
+# Оценка полей
+# ============
+
+
+@dataclass(frozen=True, slots=True)
+class FieldReport:
+    """Оценка полей доски.
+
+    Массивы проиндексированы номером поля.
+    Для полей, которые нельзя купить, стоимость и рента равны нулю.
+
+    - landing: Вероятность закончить ход на поле.
+    - buy_cost: Стоимость покупки.
+    - rent: Рента с одного поля группы.
+    - full_rent: Рента, когда у владельца вся группа.
+    - income: Ожидаемая рента за круг ходов соперников.
+    - payback: Сколько кругов окупается поле при полной группе.
+    """
+
+    landing: np.ndarray
+    buy_cost: np.ndarray
+    rent: np.ndarray
+    full_rent: np.ndarray
+    income: np.ndarray
+    payback: np.ndarray
+
+
+def rent_table(board: Board) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Стоимость, базовая и полная рента всех полей доски.
+
+    Пока рента не зависит от собранной группы, полная рента совпадает
+    с базовой.
+    """
+    cost = np.zeros(len(board))
+    rent = np.zeros(len(board))
+    for i, field in enumerate(board):
+        if isinstance(field, BaseRentField):
+            cost[i] = field.buy_cost
+            rent[i] = field.base_rent
+    return cost, rent, rent.copy()
+
+
+def analyze(
+    board: Board = CLASSIC_BOARD,
+    players: int = 4,
+    jail_turns: int = 0,
+    sides: int = Dice.SIDES,
+) -> FieldReport:
+    """Оценивает все поля доски за один векторный проход."""
+    n = len(board)
+    states = stationary_distribution(
+        transition_matrix(board, jail_turns, sides)
+    )
+    landing = states[:n].copy()
+
+    # Время в тюрьме засчитывается полю тюрьмы
+    if len(states) > n:
+        prisons = [i for i, f in enumerate(board) if f.type == FieldType.PRISON]
+        if prisons:
+            landing[prisons[0]] += states[n:].sum()
+
+    cost, rent, full = rent_table(board)
+    income = landing * full * (players - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payback = np.where(income > 0, cost / income, np.inf)
+    return FieldReport(landing, cost, rent, full, income, payback)
+
+
+# Запуск из командной строки
+# ==========================
+
+
+def main() -> None:
+    """Выводит оценку полей классической доски."""
+    parser = argparse.ArgumentParser(
+        prog="maupoly.analysis", description="Оценка полей доски Maupoly."
+    )
+    parser.add_argument("-p", "--players", type=int, default=4)
+    parser.add_argument("-j", "--jail-turns", type=int, default=0)
+    args = parser.parse_args()
+
+    report = analyze(CLASSIC_BOARD, args.players, args.jail_turns)
+    print(
+        f"{'field':<22} {'landing':>8} {'rent':>8} {'full':>8} {'payback':>8}"
+    )
+    for i, field in enumerate(CLASSIC_BOARD):
+        if report.buy_cost[i] == 0:
+            print(f"{field.name:<22} {report.landing[i]:8.2%}")
+            continue
+        print(
+            f"{field.name:<22} {report.landing[i]:8.2%} "
+            f"{report.rent[i]:8.1f} {report.full_rent[i]:8.1f} "
+            f"{report.payback[i]:8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
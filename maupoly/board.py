@@ -0,0 +1,222 @@
+"""Игровая доска.
+
+Доска поделена на две части:
+- Неизменяемое описание полей, общее для всех игр.
+- Изменяемое состояние полей, своё у каждой игры.
+
+Состояние хранится в компактных массивах, по ячейке на каждое поле.
+Потому новая игра не создаёт копий полей.
+
+Помимо этого состояние ведёт учёт владений: сколько полей каждой группы
+(цвета, аэропорты, коммуникации) есть у каждого игрока.
+Счётчики обновляются при покупке, залоге, выкупе и банкротстве,
+потому проверки владений выполняются за O(1).
+"""
+
+from array import array
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from maupoly.field import BaseField
+
+NO_OWNER = -1
+NO_GROUP = -1
+
+
+class Board:
+    """Неизменяемое описание игровой доски.
+
+    Одна доска используется сразу всеми играми.
+    Помимо полей содержит заранее просчитанную таблицу раскладки:
+
+    - types: Код типа каждого поля.
+    - groups: Номер группы каждого поля или NO_GROUP.
+    - group_sizes: Сколько полей входит в каждую группу.
+    - teleports: Куда перемещает поле или -1.
+    - buy_costs: Стоимость покупки поля или 0.
+    - base_rents: Базовая рента поля или 0.
+    - pointers: Координаты указателя игрока на изображении доски.
+    - cells: Координаты и поворот метки владельца или None.
+    - path: Файл, из которого загружена доска, или None.
+    - digest: Хеш содержимого этого файла или None.
+    """
+
+    __slots__ = (
+        "base_rents",
+        "buy_costs",
+        "cells",
+        "digest",
+        "fields",
+        "group_sizes",
+        "groups",
+        "name",
+        "path",
+        "pointers",
+        "teleports",
+        "types",
+    )
+
+    def __init__(
+        self,
+        fields: Iterable["BaseField"],
+        name: str = "custom",
+        pointers: Iterable[tuple[int, int]] = (),
+        cells: Iterable[tuple[int, int, int] | None] = (),
+    ) -> None:
+        self.name = name
+        # Заполняются при загрузке доски из файла
+        self.path: str | None = None
+        self.digest: str | None = None
+        self.fields: tuple[BaseField, ...] = tuple(fields)
+        self.types = bytes(field.type for field in self.fields)
+        self.teleports: tuple[int, ...] = tuple(
+            getattr(field, "to_field", -1) for field in self.fields
+        )
+        self.buy_costs: tuple[int, ...] = tuple(
+            getattr(field, "buy_cost", 0) for field in self.fields
+        )
+        self.base_rents: tuple[int, ...] = tuple(
+            getattr(field, "base_rent", 0) for field in self.fields
+        )
+        self.pointers: tuple[tuple[int, int], ...] = tuple(pointers)
+        self.cells: tuple[tuple[int, int, int] | None, ...] = tuple(cells)
+
+        # Нумеруем группы в порядке появления на доске
+        group_ids: dict[object, int] = {}
+        groups: list[int] = []
+        sizes: list[int] = []
+        for field in self.fields:
+            key = field.group
+            if key is None:
+                groups.append(NO_GROUP)
+                continue
+            if key not in group_ids:
+                group_ids[key] = len(sizes)
+                sizes.append(0)
+            groups.append(group_ids[key])
+            sizes[group_ids[key]] += 1
+
+        self.groups: tuple[int, ...] = tuple(groups)
+        self.group_sizes: tuple[int, ...] = tuple(sizes)
+
+    def __len__(self) -> int:
+        """Количество полей на доске."""
+        return len(self.fields)
+
+    def __getitem__(self, index: int) -> "BaseField":
+        """Получает описание поля по индексу."""
+        return self.fields[index]
+
+    def __iter__(self) -> Iterator["BaseField"]:
+        """Перебирает все поля доски."""
+        return iter(self.fields)
+
+
+class BoardState:
+    """Состояние полей доски в рамках одной игры.
+
+    - owners: Место владельца поля или NO_OWNER.
+    - levels: Уровень застройки поля.
+    - deposits: Заложено ли поле.
+    - owned: Сколько полей группы у игрока, `seat * groups + group`.
+    - mortgaged: Сколько из них заложено, в том же порядке.
+    """
+
+    __slots__ = (
+        "deposits",
+        "group_sizes",
+        "groups",
+        "levels",
+        "mortgaged",
+        "owned",
+        "owners",
+    )
+
+    def __init__(self, board: Board) -> None:
+        size = len(board)
+        self.groups = board.groups
+        self.group_sizes = board.group_sizes
+        self.owners = array("b", [NO_OWNER]) * size
+        self.levels = bytearray(size)
+        self.deposits = bytearray(size)
+        self.owned = bytearray()
+        self.mortgaged = bytearray()
+
+    def reset(self, seats: int = 0) -> None:
+        """Сбрасывает состояние всех полей.
+
+        Память под поля не выделяется заново.
+        """
+        for i in range(len(self.owners)):
+            self.owners[i] = NO_OWNER
+            self.levels[i] = 0
+            self.deposits[i] = 0
+
+        size = seats * len(self.group_sizes)
+        if len(self.owned) != size:
+            self.owned = bytearray(size)
+            self.mortgaged = bytearray(size)
+        else:
+            for i in range(size):
+                self.owned[i] = 0
+                self.mortgaged[i] = 0
+
+    # Изменение состояния полей
+    # =========================
+
+    def set_owner(self, index: int, seat: int) -> None:
+        """Назначает владельца поля."""
+        self.owners[index] = seat
+        group = self.groups[index]
+        if group != NO_GROUP:
+            self.owned[seat * len(self.group_sizes) + group] += 1
+
+    def release(self, index: int) -> None:
+        """Возвращает поле банку."""
+        seat = self.owners[index]
+        group = self.groups[index]
+        if seat != NO_OWNER and group != NO_GROUP:
+            key = seat * len(self.group_sizes) + group
+            self.owned[key] -= 1
+            self.mortgaged[key] -= self.deposits[index]
+
+        self.owners[index] = NO_OWNER
+        self.levels[index] = 0
+        self.deposits[index] = 0
+
+    def is_deposit(self, index: int) -> bool:
+        """Заложено ли поле."""
+        return self.deposits[index] == 1
+
+    def set_deposit(self, index: int, value: bool) -> None:
+        """Закладывает или выкупает поле."""
+        if self.deposits[index] == value:
+            return
+        self.deposits[index] = value
+
+        seat = self.owners[index]
+        group = self.groups[index]
+        if seat != NO_OWNER and group != NO_GROUP:
+            key = seat * len(self.group_sizes) + group
+            self.mortgaged[key] += 1 if value else -1
+
+    # Учёт владений
+    # =============
+
+    def group_count(self, seat: int, group: int) -> int:
+        """Сколько полей группы есть у игрока."""
+        if seat == NO_OWNER or group == NO_GROUP:
+            return 0
+        return self.owned[seat * len(self.group_sizes) + group]
+
+    def owns_group(self, seat: int, group: int) -> bool:
+        """Собрал ли игрок все поля группы."""
+        return self.group_count(seat, group) == self.group_sizes[group]
+
+    def can_build(self, seat: int, group: int) -> bool:
+        """Собрал ли игрок все поля группы и ни одно не заложено."""
+        return (
+            self.owns_group(seat, group)
+            and self.mortgaged[seat * len(self.group_sizes) + group] == 0
+        )
@@ -0,0 +1,211 @@
+"""Загрузка игровых досок из файлов.
+
+Доски описываются в файлах TOML или JSON: список полей с их типом,
+стоимостью и координатами на изображении доски.
+Компилятор проверяет описание и собирает неизменяемую доску вместе
+с таблицей раскладки.
+
+Собранные доски кешируются в памяти процесса, потому доска из одного
+и того же файла собирается один раз.
+"""
+
+import hashlib
+import json
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, TypeVar
+
+import tomllib
+
+from maupoly.board import Board
+from maupoly.exceptions import BoardFormatError
+from maupoly.field import (
+    AirportField,
+    BaseField,
+    BaseRentField,
+    BuyField,
+    CasinoField,
+    ChanceField,
+    CommunicateField,
+    FieldColor,
+    PrisonField,
+    PrizeField,
+    RentField,
+    TeleportField,
+)
+
+BOARDS_PATH = Path(__file__).parent
+
+T = TypeVar("T")
+
+# Собранные доски по пути к файлу и хешу его содержимого
+_BOARDS: dict[tuple[Path, str], Board] = {}
+
+
+# Сборка полей
+# ============
+
+
+def _get(raw: dict[str, Any], key: str, kind: type[T], index: int) -> T:
+    value = raw.get(key)
+    if not isinstance(value, kind) or isinstance(value, bool) != (kind is bool):
+        raise BoardFormatError(
+            f"Field {index}: '{key}' must be {kind.__name__}, got {value!r}"
+        )
+    return value
+
+
+def _color(raw: dict[str, Any], index: int) -> FieldColor:
+    name = _get(raw, "color", str, index)
+    try:
+        return FieldColor[name.upper()]
+    except KeyError:
+        raise BoardFormatError(
+            f"Field {index}: unknown color '{name}'"
+        ) from None
+
+
+_FIELD_BUILDERS: dict[str, Callable[[dict[str, Any], int], BaseField]] = {
+    "buy": lambda raw, i: BuyField(
+        _get(raw, "name", str, i),
+        _get(raw, "cost", int, i),
+        _get(raw, "reward", bool, i) if "reward" in raw else False,
+    ),
+    "rent": lambda raw, i: RentField(
+        _get(raw, "name", str, i),
+        _color(raw, i),
+        buy_cost=_get(raw, "buy_cost", int, i),
+        base_rent=_get(raw, "base_rent", int, i),
+        level_cost=_get(raw, "level_cost", int, i),
+    ),
+    "airport": lambda raw, i: AirportField(
+        _get(raw, "name", str, i),
+        buy_cost=_get(raw, "buy_cost", int, i),
+        base_rent=_get(raw, "base_rent", int, i),
+    ),
+    "communicate": lambda raw, i: CommunicateField(
+        _get(raw, "name", str, i),
+        buy_cost=_get(raw, "buy_cost", int, i),
+        base_rent=_get(raw, "base_rent", int, i),
+    ),
+    "chance": lambda raw, i: ChanceField(),
+    "prize": lambda raw, i: PrizeField(),
+    "teleport": lambda raw, i: TeleportField(
+        _get(raw, "name", str, i), to_field=_get(raw, "to_field", int, i)
+    ),
+    "prison": lambda raw, i: PrisonField(),
+    "casino": lambda raw, i: CasinoField(),
+}
+
+
+def _coordinates(
+    raw: dict[str, Any], key: str, size: int, index: int
+) -> tuple[int, ...]:
+    value = raw.get(key)
+    if (
+        not isinstance(value, list)
+        or len(value) != size
+        or not all(isinstance(v, int) and v >= 0 for v in value)
+    ):
+        raise BoardFormatError(
+            f"Field {index}: '{key}' must be {size} non-negative integers"
+        )
+    return tuple(value)
+
+
+def compile_board(data: dict[str, Any]) -> Board:
+    """Проверяет описание доски и собирает её.
+
+    Если в описании есть ошибка, возникает BoardFormatError.
+    """
+    raw_fields = data.get("fields")
+    if not isinstance(raw_fields, list) or len(raw_fields) == 0:
+        raise BoardFormatError("Board must contain a non-empty 'fields' list")
+
+    fields: list[BaseField] = []
+    pointers: list[tuple[int, int]] = []
+    cells: list[tuple[int, int, int] | None] = []
+    for i, raw in enumerate(raw_fields):
+        if not isinstance(raw, dict):
+            raise BoardFormatError(f"Field {i}: must be a table")
+
+        builder = _FIELD_BUILDERS.get(raw.get("type", ""))
+        if builder is None:
+            raise BoardFormatError(f"Field {i}: unknown type {raw.get('type')}")
+        field = builder(raw, i)
+        fields.append(field)
+
+        x, y = _coordinates(raw, "pointer", 2, i)
+        pointers.append((x, y))
+        if isinstance(field, BaseRentField):
+            x, y, level = _coordinates(raw, "cell", 3, i)
+            cells.append((x, y, level))
+        else:
+            cells.append(None)
+
+    for i, field in enumerate(fields):
+        if isinstance(field, TeleportField) and not (
+            0 <= field.to_field < len(fields)
+        ):
+            raise BoardFormatError(
+                f"Field {i}: teleport target {field.to_field} is out of board"
+            )
+
+    return Board(
+        fields,
+        name=str(data.get("name", "custom")),
+        pointers=pointers,
+        cells=cells,
+    )
+
+
+# Загрузка досок
+# ==============
+
+
+def _parse(path: Path, source: bytes) -> dict[str, Any]:
+    try:
+        if path.suffix == ".json":
+            data = json.loads(source)
+        elif path.suffix == ".toml":
+            data = tomllib.loads(source.decode())
+        else:
+            raise BoardFormatError(f"Unsupported board format: {path.suffix}")
+    except (ValueError, tomllib.TOMLDecodeError) as e:
+        # Ошибки JSON и кодировки наследуются от ValueError
+        raise BoardFormatError(f"Unable to parse {path.name}: {e}") from e
+
+    if not isinstance(data, dict):
+        raise BoardFormatError(f"{path.name}: board must be a table")
+    return data
+
+
+def load_board(path: str | Path) -> Board:
+    """Загружает доску из файла.
+
+    Вместо пути можно указать имя встроенной доски, например `classic`.
+    Собранная доска запоминается по хешу содержимого файла, потому
+    изменённый файл будет собран заново.
+    Путь и хеш сохраняются в доске, чтобы по ним восстановить игру.
+    """
+    path = Path(path)
+    if not path.suffix:
+        path = BOARDS_PATH / f"{path}.toml"
+
+    source = path.read_bytes()
+    key = (path.resolve(), hashlib.sha256(source).hexdigest())
+    board = _BOARDS.get(key)
+    if board is None:
+        board = compile_board(_parse(path, source))
+        board.path = str(key[0])
+        board.digest = key[1]
+        _BOARDS[key] = board
+    return board
+
+
+def is_builtin(name: str) -> bool:
+    """Есть ли встроенная доска с таким именем."""
+    return (BOARDS_PATH / f"{name}.toml").is_file()
+
+
+CLASSIC_BOARD = load_board("classic")
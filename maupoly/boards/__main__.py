@@ -0,0 +1,32 @@
+"""Проверка файлов досок из командной строки.
+
+```sh
+uv run -m maupoly.boards my_board.toml classic
+```
+
+Для каждой доски выводит количество полей и групп.
+"""
+
+import argparse
+
+from maupoly.boards import load_board
+
+
+def main() -> None:
+    """Собирает доски и выводит их краткое описание."""
+    parser = argparse.ArgumentParser(
+        prog="maupoly.boards", description="Проверка досок Maupoly."
+    )
+    parser.add_argument("boards", nargs="+")
+    args = parser.parse_args()
+
+    for name in args.boards:
+        board = load_board(name)
+        print(
+            f"{name}: {board.name}, {len(board)} fields, "
+            f"{len(board.group_sizes)} groups"
+        )
+
+
+if __name__ == "__main__":
+    main()
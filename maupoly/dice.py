@@ -2,12 +2,19 @@
 
 from dataclasses import dataclass
 from random import randint
-from typing import Self
+from typing import ClassVar, Self
+
+from maupoly.rng import GameRandom
 
 
 @dataclass(frozen=True, slots=True)
 class Dice:
-    """Простой кубик для игры."""
+    """Простой кубик для игры.
+
+    Состоит из двух игральных костей по `SIDES` граней.
+    """
+
+    SIDES: ClassVar[int] = 6
 
     first: int
     second: int
@@ -23,9 +30,14 @@ class Dice:
         return self.first + self.second
 
     @classmethod
-    def new(cls) -> Self:
-        """Создаёт новый кубик."""
-        return cls(randint(1, 6), randint(1, 6))
+    def new(cls, rng: GameRandom | None = None) -> Self:
+        """Создаёт новый кубик.
+
+        Если передан генератор игры, значения берутся из него.
+        """
+        if rng is None:
+            return cls(randint(1, cls.SIDES), randint(1, cls.SIDES))
+        return cls(rng.randint(1, cls.SIDES), rng.randint(1, cls.SIDES))
 
     def __str__(self) -> str:
         """Строковое представление кубика."""
@@ -5,7 +5,7 @@
 Чтобы не создавать циклических зависимостей.
 """
 
-from enum import StrEnum
+from enum import IntEnum, StrEnum
 
 
 class TurnState(StrEnum):
@@ -48,6 +48,7 @@ class GameEvents(StrEnum):
     - player_move: Перемещение игрока по полю.
     - player_buy: Игрок оплатил налог или получил возмещение.
     - player_buy_field: Игрок купил новое поле.
+    - player_rent: Игрок платит ренту владельцу поля.
     - player_chance: Игрок попал на поле шанс.
     - player_prison: Игрок попал в тюрьму.
     - player_casino: Игрок попал на поле казино.
@@ -73,6 +74,26 @@ class GameEvents(StrEnum):
     PLAYER_MOVE = "player_move"
     PLAYER_BUY = "player_buy"
     PLAYER_BUY_FIELD = "player_buy_field"
+    PLAYER_RENT = "player_rent"
     PLAYER_CHANCE = "player_chance"
     PLAYER_PRISON = "player_prison"
     PLAYER_CASINO = "player_casino"
+
+
+class Action(IntEnum):
+    """Решения игроков, которые записываются в журнал игры.
+
+    Вместе с зерном игры позволяют повторить партию.
+
+    - Dice: Бросок кубика, следом идёт байт со значением кубика.
+    - Buy: Покупка поля.
+    - Next: Завершение хода.
+    - Leave: Выход игрока, следом идёт байт с местом игрока.
+    - Timeout: Ход пропущен по истечении срока.
+    """
+
+    DICE = 1
+    BUY = 2
+    NEXT = 3
+    LEAVE = 4
+    TIMEOUT = 5
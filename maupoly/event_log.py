@@ -0,0 +1,356 @@
+"""Журнал событий для восстановления игр после сбоя.
+
+У каждой комнаты свой журнал, в который только дописываются записи:
+- События игры в компактном двоичном виде.
+- Решения игроков, которые изменили игру.
+- Снимки состояния игры.
+
+Снимок делается при изменении лобби, в начале игры и после каждых
+`snapshot_every` байт журнала решений игроков.
+После снимка журнал комнаты начинается заново, потому при
+восстановлении повторяются только решения после последнего снимка.
+Игра тоже забывает решения до снимка, потому её журнал решений
+в памяти занимает не больше примерно `snapshot_every` байт.
+Время восстановления не зависит от того, сколько идёт игра.
+
+Записи копятся в памяти и пишутся отдельным потоком.
+Поток сбрасывает на диск (fsync) сразу всю накопленную группу записей.
+Если запись не удалась, поток откатывает дописанные файлы и повторяет
+группу вместе с новыми записями.
+"""
+
+import os
+import struct
+import threading
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from queue import SimpleQueue
+from time import sleep
+from typing import BinaryIO
+
+from loguru import logger
+
+from maupoly.enums import GameEvents
+from maupoly.events import BaseEventHandler, Event, NullEventHandler
+from maupoly.game import MonoGame
+from maupoly.replay import apply_action
+from maupoly.snapshot import dump_game, load_game
+
+# Типы записей журнала
+RECORD_EVENT = 1
+RECORD_ACTIONS = 2
+
+# Заголовок записи: тип и длина
+_HEADER = struct.Struct("<BI")
+# Событие: номер типа события и игрок
+_EVENT = struct.Struct("<Bq")
+# Решения: позиция первого решения в журнале решений игры
+_ACTIONS = struct.Struct("<I")
+
+_EVENT_TYPES = tuple(GameEvents)
+_EVENT_INDEX = {event_type: i for i, event_type in enumerate(_EVENT_TYPES)}
+
+# События, после которых делается снимок игры.
+# Лобби меняется без решений игроков, потому его проще снять целиком.
+_SNAPSHOT_EVENTS = frozenset(
+    (
+        GameEvents.SESSION_START,
+        GameEvents.SESSION_JOIN,
+        GameEvents.SESSION_LEAVE,
+        GameEvents.GAME_START,
+        GameEvents.GAME_JOIN,
+    )
+)
+
+# Задание для потока записи: комната, снимок или None, записи журнала
+_Write = tuple[int, bytes | None, bytes]
+
+# Через сколько секунд повторяется неудачная запись, пауза растёт вдвое
+WRITE_RETRY_DELAY = 0.5
+WRITE_RETRY_MAX_DELAY = 30.0
+# Сколько раз повторять запись при закрытии журнала
+CLOSE_RETRIES = 3
+
+
+def encode_event(event: Event) -> bytes:
+    """Упаковывает событие в запись журнала."""
+    body = _EVENT.pack(_EVENT_INDEX[event.event_type], event.player.user_id)
+    if event.data is not None:
+        body += event.data.pack()
+    return _HEADER.pack(RECORD_EVENT, len(body)) + body
+
+
+def encode_actions(start: int, actions: bytes) -> bytes:
+    """Упаковывает решения игроков начиная с позиции start."""
+    body = _ACTIONS.pack(start) + actions
+    return _HEADER.pack(RECORD_ACTIONS, len(body)) + body
+
+
+def read_records(data: bytes) -> Iterator[tuple[int, bytes]]:
+    """Перебирает записи журнала.
+
+    Недописанная при сбое последняя запись пропускается.
+    """
+    pos = 0
+    while pos + _HEADER.size <= len(data):
+        kind, size = _HEADER.unpack_from(data, pos)
+        pos += _HEADER.size
+        if pos + size > len(data):
+            return
+        yield kind, data[pos : pos + size]
+        pos += size
+
+
+class EventLog:
+    """Журналы событий и снимки всех комнат в одной директории.
+
+    - {room_id}.snap: Последний снимок игры.
+    - {room_id}.log: Записи после этого снимка.
+    """
+
+    def __init__(self, path: str | Path, snapshot_every: int = 256) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.snapshot_every = snapshot_every
+
+        self._queue: SimpleQueue[_Write | None] = SimpleQueue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="event-log", daemon=True
+        )
+        self._writer.start()
+
+    def _snap_file(self, room_id: int) -> Path:
+        return self.path / f"{room_id}.snap"
+
+    def _log_file(self, room_id: int) -> Path:
+        return self.path / f"{room_id}.log"
+
+    # Запись
+    # ======
+
+    def write(
+        self, room_id: int, snapshot: bytes | None, records: bytes
+    ) -> None:
+        """Передаёт записи комнаты потоку записи.
+
+        Если передан снимок, он заменяет прошлый, а журнал начинается
+        заново с переданных записей.
+        """
+        self._queue.put((room_id, snapshot, records))
+
+    def drop(self, room_id: int) -> None:
+        """Удаляет журнал завершённой комнаты."""
+        self._queue.put((room_id, b"", b""))
+
+    def close(self) -> None:
+        """Дописывает все записи и останавливает поток записи."""
+        self._queue.put(None)
+        self._writer.join()
+
+    def _write_loop(self) -> None:
+        group: list[_Write] = []
+        closing = False
+        delay = WRITE_RETRY_DELAY
+        retries = 0
+        while True:
+            if len(group) == 0 and not closing:
+                write = self._queue.get()
+                if write is None:
+                    break
+                group.append(write)
+
+            while not closing and not self._queue.empty():
+                write = self._queue.get()
+                if write is None:
+                    closing = True
+                else:
+                    group.append(write)
+
+            if len(group) == 0 or self._write_group(group):
+                group = []
+                delay = WRITE_RETRY_DELAY
+                if closing:
+                    break
+                continue
+
+            # Неудачная группа повторяется вместе с новыми записями
+            if closing:
+                retries += 1
+                if retries > CLOSE_RETRIES:
+                    logger.error(
+                        "Lost {} event log writes in {}", len(group), self.path
+                    )
+                    break
+            sleep(delay)
+            delay = min(delay * 2, WRITE_RETRY_MAX_DELAY)
+
+    def _write_group(self, group: list[_Write]) -> bool:
+        """Записывает группу и сбрасывает её на диск.
+
+        Возвращает False, если запись не удалась и её нужно повторить.
+        Дописанные журналы обрезаются до прежнего размера, чтобы повтор
+        не оставил в них оборванную запись.
+        """
+        files: dict[int, BinaryIO] = {}
+        # Размер журналов, открытых на дозапись, до этой группы
+        sizes: dict[int, int] = {}
+        try:
+            for room_id, snapshot, records in group:
+                if snapshot is not None:
+                    f = files.pop(room_id, None)
+                    if f is not None:
+                        f.close()
+                    sizes.pop(room_id, None)
+                    self._write_snapshot(room_id, snapshot)
+                    if snapshot == b"":
+                        continue
+                    files[room_id] = self._log_file(room_id).open("wb")
+
+                f = files.get(room_id)
+                if f is None:
+                    f = self._log_file(room_id).open("ab")
+                    files[room_id] = f
+                    sizes[room_id] = f.tell()
+                f.write(records)
+
+            for f in files.values():
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            logger.error("Unable to write event log, retry: {}", e)
+            for room_id, size in sizes.items():
+                try:
+                    files[room_id].truncate(size)
+                except OSError as truncate_error:
+                    logger.error(
+                        "Unable to roll back log of room {}: {}",
+                        room_id,
+                        truncate_error,
+                    )
+            return False
+        finally:
+            for f in files.values():
+                f.close()
+        return True
+
+    def _write_snapshot(self, room_id: int, snapshot: bytes) -> None:
+        snap_file = self._snap_file(room_id)
+        if snapshot == b"":
+            snap_file.unlink(missing_ok=True)
+            self._log_file(room_id).unlink(missing_ok=True)
+            return
+
+        tmp_file = snap_file.with_suffix(".tmp")
+        with tmp_file.open("wb") as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_file.replace(snap_file)
+
+    # Восстановление
+    # ==============
+
+    def rooms(self) -> list[int]:
+        """Комнаты, для которых есть снимок."""
+        return [int(p.stem) for p in self.path.glob("*.snap")]
+
+    def recover(
+        self, room_id: int, event_handler: BaseEventHandler
+    ) -> MonoGame:
+        """Восстанавливает игру из снимка и хвоста журнала.
+
+        Решения, которые уже вошли в снимок, пропускаются.
+        """
+        game = load_game(
+            self._snap_file(room_id).read_bytes(), NullEventHandler()
+        )
+        log_file = self._log_file(room_id)
+        data = log_file.read_bytes() if log_file.exists() else b""
+
+        for kind, body in read_records(data):
+            if kind != RECORD_ACTIONS:
+                continue
+            start = _ACTIONS.unpack_from(body)[0]
+            actions = body[_ACTIONS.size :]
+            # Решения до снимка уже применены
+            skip = game.actions_end - start
+            if skip >= len(actions):
+                continue
+            if skip < 0:
+                raise ValueError(f"Gap in event log of room {room_id}")
+            pos = skip
+            while pos < len(actions):
+                pos = apply_action(game, actions, pos)
+
+        game.event_handler = event_handler
+        return game
+
+    def recover_all(self, event_handler: BaseEventHandler) -> list[MonoGame]:
+        """Восстанавливает все игры, для которых есть журнал."""
+        games: list[MonoGame] = []
+        for room_id in self.rooms():
+            try:
+                games.append(self.recover(room_id, event_handler))
+            except Exception as e:
+                logger.error("Unable to recover room {}: {}", room_id, e)
+        return games
+
+
+class EventLogHandler(BaseEventHandler):
+    """Пишет события в журнал и передаёт их дальше.
+
+    Вместе с событиями пишет решения игроков, которые появились
+    с прошлой записи, и время от времени делает снимки игры.
+    """
+
+    def __init__(self, log: EventLog, handler: BaseEventHandler) -> None:
+        self.log = log
+        self.handler = handler
+        # Сколько решений каждой игры уже записано и когда был снимок
+        self._logged: dict[int, int] = {}
+        self._snapshot_at: dict[int, int] = {}
+
+    def push(self, event: Event) -> None:
+        """Записывает событие и передаёт его обработчику."""
+        self._append(event.game, (event,))
+        self.handler.push(event)
+
+    def push_many(self, events: Sequence[Event]) -> None:
+        """Записывает события хода и передаёт их обработчику."""
+        self._append(events[0].game, events)
+        self.handler.push_many(events)
+
+    def _append(self, game: MonoGame, events: Sequence[Event]) -> None:
+        room_id = game.room_id
+        kind = events[-1].event_type
+        if kind == GameEvents.SESSION_END:
+            self._logged.pop(room_id, None)
+            self._snapshot_at.pop(room_id, None)
+            self.log.drop(room_id)
+            return
+
+        records = b"".join(encode_event(event) for event in events)
+        actions = game.actions_end
+        logged = self._logged.get(room_id, 0)
+
+        # Решений до actions_start у игры из снимка уже нет
+        if (
+            room_id not in self._snapshot_at
+            or logged > actions
+            or logged < game.actions_start
+            or any(e.event_type in _SNAPSHOT_EVENTS for e in events)
+            or actions - self._snapshot_at[room_id] >= self.log.snapshot_every
+        ):
+            self._logged[room_id] = actions
+            self._snapshot_at[room_id] = actions
+            self.log.write(room_id, dump_game(game), records)
+            # Решения до снимка больше не нужны ни журналу, ни игре
+            game.trim_actions()
+            return
+
+        if actions > logged:
+            records += encode_actions(
+                logged, bytes(game.actions[logged - game.actions_start :])
+            )
+            self._logged[room_id] = actions
+        self.log.write(room_id, None, records)
@@ -1,29 +1,167 @@
 """Обработчик игровых событий."""
 
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from dataclasses import dataclass
-from typing import TYPE_CHECKING
+from struct import Struct
+from typing import TYPE_CHECKING, ClassVar, Self
 
 from loguru import logger
 
-from maupoly.enums import GameEvents
+from maupoly.enums import GameEvents, TurnState
 
 if TYPE_CHECKING:
     from maupoly.game import MonoGame
     from maupoly.player import Player
 
+# Данные событий
+# ==============
+
+
+class Payload:
+    """Данные, которые сопровождают игровое событие.
+
+    Обработчики читают поля данных напрямую, без разбора строк.
+    Поля упаковываются в байты по формату `FORMAT` в порядке объявления.
+    """
+
+    __slots__: tuple[str, ...] = ()
+
+    FORMAT: ClassVar[Struct]
+
+    def pack(self) -> bytes:
+        """Упаковывает данные события в байты."""
+        return self.FORMAT.pack(*(getattr(self, n) for n in self.__slots__))
+
+    @classmethod
+    def unpack(cls, data: bytes) -> Self:
+        """Восстанавливает данные события из байтов."""
+        return cls(*cls.FORMAT.unpack(data))
+
+
+@dataclass(slots=True, frozen=True)
+class DiceData(Payload):
+    """Значения на костях брошенного кубика."""
+
+    FORMAT: ClassVar[Struct] = Struct("<BB")
+
+    first: int
+    second: int
+
+    @property
+    def total(self) -> int:
+        """Сколько всего выпало на кубике."""
+        return self.first + self.second
+
+
+@dataclass(slots=True, frozen=True)
+class MoveData(Payload):
+    """Перемещение игрока с поля start на поле end."""
+
+    FORMAT: ClassVar[Struct] = Struct("<HH")
+
+    start: int
+    end: int
+
+
+@dataclass(slots=True, frozen=True)
+class MoneyData(Payload):
+    """Сумма платежа.
+
+    reward означает, что монеты получает игрок, а не платит.
+    """
+
+    FORMAT: ClassVar[Struct] = Struct("<i?")
+
+    amount: int
+    reward: bool = False
+
+
+@dataclass(slots=True, frozen=True)
+class RentData(Payload):
+    """Рента за поле.
+
+    Банкрот отдаёт владельцу только то, что у него осталось, потому
+    paid может быть меньше ренты amount.
+    """
+
+    FORMAT: ClassVar[Struct] = Struct("<ii")
+
+    amount: int
+    paid: int
+
+
+@dataclass(slots=True, frozen=True)
+class LeaveData(Payload):
+    """Выход игрока: победа или поражение."""
+
+    FORMAT: ClassVar[Struct] = Struct("<?")
+
+    win: bool
+
+
+@dataclass(slots=True, frozen=True)
+class NextData(Payload):
+    """Сколько игроков пропускается при передаче хода."""
+
+    FORMAT: ClassVar[Struct] = Struct("<B")
+
+    skip: int
+
+
+_TURN_STATES = tuple(TurnState)
+
+
+@dataclass(slots=True, frozen=True)
+class StateData(Payload):
+    """Новое состояние хода.
+
+    Упаковывается номером состояния в TurnState.
+    """
+
+    FORMAT: ClassVar[Struct] = Struct("<B")
+
+    state: TurnState
+
+    def pack(self) -> bytes:
+        """Упаковывает номер состояния."""
+        return self.FORMAT.pack(_TURN_STATES.index(self.state))
+
+    @classmethod
+    def unpack(cls, data: bytes) -> Self:
+        """Восстанавливает состояние по номеру."""
+        return cls(_TURN_STATES[cls.FORMAT.unpack(data)[0]])
+
+
+# Данные, которые сопровождают каждый тип события
+EVENT_PAYLOADS: dict[GameEvents, type[Payload]] = {
+    GameEvents.GAME_LEAVE: LeaveData,
+    GameEvents.GAME_NEXT: NextData,
+    GameEvents.GAME_STATE: StateData,
+    GameEvents.PLAYER_DICE: DiceData,
+    GameEvents.PLAYER_MOVE: MoveData,
+    GameEvents.PLAYER_BUY: MoneyData,
+    GameEvents.PLAYER_BUY_FIELD: MoneyData,
+    GameEvents.PLAYER_RENT: RentData,
+}
+
+
 # Вспомогательные классы
 # ======================
 
 
 @dataclass(slots=True, frozen=True)
 class Event:
-    """Игровое событие."""
+    """Игровое событие.
+
+    Тип данных события зависит от его типа, смотри EVENT_PAYLOADS.
+    У остальных событий данных нет.
+    """
 
     room_id: int
     player: "Player"
     event_type: GameEvents
-    data: str
+    data: Payload | None
     game: "MonoGame"
 
 
@@ -37,6 +175,9 @@ class BaseEventHandler(ABC):
     Пришёл на смену устаревшему журналу событий.
     Наследники реализуют способ обработки игровых событий по своему
     усмотрению.
+
+    События одного хода приходят пачкой через push_many.
+    По умолчанию пачка разбирается на отдельные вызовы push.
     """
 
     @abstractmethod
@@ -44,6 +185,11 @@ class BaseEventHandler(ABC):
         """Отравляет событие в обработчик."""
         pass
 
+    def push_many(self, events: Sequence[Event]) -> None:
+        """Отправляет события одного хода в порядке их появления."""
+        for event in events:
+            self.push(event)
+
 
 class DebugEventHandler(BaseEventHandler):
     """Пример обработчика событий, отправляет изменения в консоль."""
@@ -51,3 +197,18 @@ class DebugEventHandler(BaseEventHandler):
     def push(self, event: Event) -> None:
         """Отравляет событие в консоль."""
         logger.info(event)
+
+
+class NullEventHandler(BaseEventHandler):
+    """Обработчик-заглушка, который игнорирует все события.
+
+    Используется в режиме симуляции, когда игра запускается без бота.
+    """
+
+    def push(self, event: Event) -> None:
+        """Ничего не делает с событием."""
+        pass
+
+    def push_many(self, events: Sequence[Event]) -> None:
+        """Ничего не делает с событиями."""
+        pass
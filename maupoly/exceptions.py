@@ -41,3 +41,21 @@ class ClassCoverError(Exception):
     """When the user tries to cover with the wrong card."""
 
     pass
+
+
+class ReplayError(Exception):
+    """When the replayed game diverges from the recorded one."""
+
+    pass
+
+
+class BoardFormatError(Exception):
+    """When the board description file is malformed."""
+
+    pass
+
+
+class StorageConflictError(Exception):
+    """When another worker has changed the game since it was loaded."""
+
+    pass
@@ -2,12 +2,17 @@
 
 Вся доска поделена не ячейки, по которым перемещаются пользователи.
 При попадании на ячейку, совершается некоторое действие.
+
+Поля только описывают ячейку и общие для всех игр.
+Владелец, уровень и залог поля хранятся в состоянии доски игры.
 """
 
 from enum import IntEnum
 from typing import TYPE_CHECKING
 
+from maupoly.board import NO_OWNER
 from maupoly.enums import GameEvents, TurnState
+from maupoly.events import MoneyData, RentData
 
 if TYPE_CHECKING:
     from maupoly.game import MonoGame
@@ -62,8 +67,8 @@ class FieldColor(IntEnum):
     ORANGE = 3
     RED = 4
     YELLOW = 5
-    GREEN = 5
-    BLUE = 6
+    GREEN = 6
+    BLUE = 7
 
     @property
     def symbol(self) -> str:
@@ -81,10 +86,20 @@ class BaseField:
     Описывает общий функционал для всех дочерних полей.
     """
 
+    __slots__ = ("name", "type")
+
     def __init__(self, field_type: FieldType, name: str) -> None:
         self.type = field_type
         self.name = name
 
+    @property
+    def group(self) -> tuple[FieldType, int] | None:
+        """Группа полей, которую может собрать владелец.
+
+        Используется доской для учёта владений игроков.
+        """
+        return None
+
     def callback(self, game: "MonoGame", player: "Player") -> None:
         """Действие при попадании на поле игроком.
 
@@ -126,6 +141,8 @@ class BuyField(BaseField):
     - Налог на роскошь.
     """
 
+    __slots__ = ("cost", "is_reward")
+
     def __init__(self, name: str, cost: int, is_reward: bool = False) -> None:
         super().__init__(field_type=FieldType.BUY, name=name)
         self.cost = cost
@@ -138,12 +155,18 @@ class BuyField(BaseField):
         else:
             player.pay(self.cost)
         player.push_event(
-            GameEvents.PLAYER_BUY, f"{self.cost} {self.is_reward}"
+            GameEvents.PLAYER_BUY, MoneyData(self.cost, self.is_reward)
         )
 
 
 class BaseRentField(BaseField):
-    """Базовое поле, которое может купит игрок."""
+    """Базовое поле, которое может купит игрок.
+
+    Методы поля принимают индекс ячейки, чтобы найти её состояние
+    в текущей игре.
+    """
+
+    __slots__ = ("base_rent", "buy_cost", "deposit_cost", "redemption_cost")
 
     def __init__(
         self,
@@ -154,48 +177,58 @@ class BaseRentField(BaseField):
     ) -> None:
         super().__init__(field_type=field_type, name=name)
         self.buy_cost = buy_cost
-        self.owner: Player | None = None
         self.base_rent = base_rent
 
         # Залог поля
         self.deposit_cost = buy_cost // 2
         self.redemption_cost = self.deposit_cost
-        self.is_deposit = False
 
-    def count_rent(self) -> int:
+    @property
+    def group(self) -> tuple[FieldType, int] | None:
+        """Все поля одного типа составляют группу."""
+        return (self.type, 0)
+
+    def count_rent(self, game: "MonoGame", index: int) -> int:
         """Считает сколько нужно заплатить игроку ренты."""
-        return self.base_rent if not self.is_deposit else 0
+        return self.base_rent if not game.board.is_deposit(index) else 0
 
-    def buy(self, player: "Player") -> None:
+    def buy(self, game: "MonoGame", player: "Player", index: int) -> None:
         """Покупает поле."""
         player.pay(self.buy_cost)
-        self.owner = player
+        game.board.set_owner(index, player.seat)
 
-    def deposit(self, player: "Player") -> None:
+    def deposit(self, game: "MonoGame", player: "Player", index: int) -> None:
         """Закладывает поле."""
         player.give(self.deposit_cost)
-        self.is_deposit = True
+        game.board.set_deposit(index, True)
 
-    def redemption(self, player: "Player") -> None:
+    def redemption(
+        self, game: "MonoGame", player: "Player", index: int
+    ) -> None:
         """Выкупает заложенное поле."""
         player.pay(self.redemption_cost)
-        self.is_deposit = False
+        game.board.set_deposit(index, False)
 
-    def pay_rent(self, player: "Player") -> None:
+    def pay_rent(self, game: "MonoGame", player: "Player", index: int) -> None:
         """Платит ренту владельцу поля."""
-        if self.owner is None:
+        owner = game.get_owner(index)
+        if owner is None:
             raise ValueError("Field has not owner")
 
-        rent = self.count_rent()
+        # Банкротство игрока освобождает поля, потому владелец сохранён
+        rent = self.count_rent(game, index)
+        # Банкрот отдаёт владельцу только то, что у него осталось
+        paid = min(rent, max(player.balance, 0))
+        player.push_event(GameEvents.PLAYER_RENT, RentData(rent, paid))
         player.pay(rent)
-        self.owner.give(rent)
+        owner.give(paid)
 
     def callback(self, game: "MonoGame", player: "Player") -> None:
         """Покупка поля или оплата ренты."""
-        if self.owner is None:
+        if game.board.owners[player.index] == NO_OWNER:
             game.set_state(TurnState.BYU)
-        else:
-            self.pay_rent(player)
+        elif game.get_owner(player.index) is not player:
+            self.pay_rent(game, player, player.index)
 
 
 class RentField(BaseRentField):
@@ -208,6 +241,8 @@ class RentField(BaseRentField):
     недвижимость.
     """
 
+    __slots__ = ("color", "level_cost")
+
     def __init__(
         self,
         name: str,
@@ -225,9 +260,13 @@ class RentField(BaseRentField):
 
         # Основная характеристика
         self.color = color
-        self.level = 0
         self.level_cost = level_cost
 
+    @property
+    def group(self) -> tuple[FieldType, int] | None:
+        """Поля одного цвета составляют группу."""
+        return (self.type, self.color)
+
 
 class AirportField(BaseRentField):
     """Самолёты.
@@ -237,6 +276,8 @@ class AirportField(BaseRentField):
     Не имеет цвета и возможности строительства.
     """
 
+    __slots__ = ()
+
     def __init__(self, name: str, buy_cost: int, base_rent: int) -> None:
         super().__init__(
             name=name,
@@ -255,12 +296,14 @@ class CommunicateField(BaseRentField):
     Не имеет цвета и возможности строительства.
     """
 
+    __slots__ = ()
+
     def __init__(self, name: str, buy_cost: int, base_rent: int) -> None:
         super().__init__(
             name=name,
             buy_cost=buy_cost,
             base_rent=base_rent,
-            field_type=FieldType.AIRPORT,
+            field_type=FieldType.COMMUNICATE,
         )
 
 
@@ -271,12 +314,14 @@ class ChanceField(BaseField):
     К примеру перемещение по полю, получения монет и прочее.
     """
 
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(field_type=FieldType.CHANCE, name="Шанс")
 
     def callback(self, game: "MonoGame", player: "Player") -> None:
         """Случайное действие карточки шанс."""
-        game.player.push_event(GameEvents.PLAYER_CHANCE, "No implemented")
+        game.player.push_event(GameEvents.PLAYER_CHANCE)
 
 
 class PrizeField(BaseField):
@@ -286,12 +331,14 @@ class PrizeField(BaseField):
     К примеру перемещение по полю, получения монет и прочее.
     """
 
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(field_type=FieldType.PRIZE, name="Общественная казна")
 
     def callback(self, game: "MonoGame", player: "Player") -> None:
         """Случайное действие карточки шанс."""
-        game.player.push_event(GameEvents.PLAYER_CHANCE, "No implemented")
+        game.player.push_event(GameEvents.PLAYER_CHANCE)
 
 
 class TeleportField(BaseField):
@@ -300,6 +347,8 @@ class TeleportField(BaseField):
     Перемещает пользователя на указанное поле.
     """
 
+    __slots__ = ("to_field",)
+
     def __init__(self, name: str, to_field: int) -> None:
         super().__init__(field_type=FieldType.TELEPORT, name=name)
         self.to_field = to_field
@@ -317,6 +366,8 @@ class PrisonField(BaseField):
     выкинуть дубль, либо заплатить за выход из тюрьмы.
     """
 
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(field_type=FieldType.PRISON, name="Тюрьма")
 
@@ -332,213 +383,11 @@ class CasinoField(BaseField):
     Если сделать ставку, то можно либо выиграть. либо проиграть.
     """
 
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(field_type=FieldType.CASINO, name="Казино")
 
     def callback(self, game: "MonoGame", player: "Player") -> None:
         """игрока попал на поле казино."""
         game.player.push_event(GameEvents.PLAYER_CASINO)
-
-
-# Игровые поля
-# ============
-
-# TODO: Может мы лучше это в класс какой затолкаем?
-CLASSIC_BOARD = [
-    BuyField("Старт", 1000, True),
-    RentField(
-        "Санкт-Петербург",
-        FieldColor.BROWN,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    PrizeField(),
-    RentField(
-        "Красноярск",
-        FieldColor.BROWN,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    BuyField("Подоходный налог", 2000),
-    AirportField(
-        "Шереметьево",
-        buy_cost=200,
-        base_rent=60,
-    ),
-    RentField(
-        "Самара",
-        FieldColor.SKY,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    ChanceField(),
-    RentField(
-        "Чебоксары",
-        FieldColor.SKY,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    RentField(
-        "Пенза",
-        FieldColor.SKY,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    PrisonField(),
-    RentField(
-        "Челябинск",
-        FieldColor.PURPLE,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    CommunicateField(
-        "Мобильная связь",
-        buy_cost=200,
-        base_rent=60,
-    ),
-    RentField(
-        "Барнаул",
-        FieldColor.PURPLE,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    RentField(
-        "Псков",
-        FieldColor.PURPLE,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    AirportField(
-        "Толмачёво",
-        buy_cost=200,
-        base_rent=60,
-    ),
-    RentField(
-        "Батайск",
-        FieldColor.ORANGE,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    PrizeField(),
-    RentField(
-        "Воронеж",
-        FieldColor.ORANGE,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    RentField(
-        "Сыктывкар",
-        FieldColor.ORANGE,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    CasinoField(),
-    RentField(
-        "Ростов-на-Дону",
-        FieldColor.RED,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    ChanceField(),
-    RentField(
-        "Рязань",
-        FieldColor.RED,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    RentField(
-        "Москва",
-        FieldColor.RED,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    AirportField(
-        "Пулково",
-        buy_cost=200,
-        base_rent=60,
-    ),
-    RentField(
-        "Архангельск",
-        FieldColor.YELLOW,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    RentField(
-        "Обнинск",
-        FieldColor.YELLOW,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    CommunicateField(
-        "Интернет",
-        buy_cost=200,
-        base_rent=60,
-    ),
-    RentField(
-        "Новосибирск",
-        FieldColor.YELLOW,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    TeleportField("В тюрьму", to_field=10),
-    RentField(
-        "Северодвинск",
-        FieldColor.GREEN,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    RentField(
-        "Курган",
-        FieldColor.GREEN,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    PrizeField(),
-    RentField(
-        "Сургут",
-        FieldColor.GREEN,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    AirportField(
-        "Кольцово",
-        buy_cost=200,
-        base_rent=60,
-    ),
-    ChanceField(),
-    RentField(
-        "Пермь",
-        FieldColor.BLUE,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-    BuyField("Налог на роскошь", 1000),
-    RentField(
-        "Екатеринбург",
-        FieldColor.BLUE,
-        buy_cost=200,
-        base_rent=60,
-        level_cost=100,
-    ),
-]
@@ -1,34 +1,92 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import datetime
-from random import shuffle
+from random import getrandbits
 
 from loguru import logger
 
+from maupoly.board import NO_OWNER, Board, BoardState
+from maupoly.boards import CLASSIC_BOARD
 from maupoly.dice import Dice
-from maupoly.enums import GameEvents, TurnState
-from maupoly.events import BaseEventHandler, Event
+from maupoly.enums import Action, GameEvents, TurnState
+from maupoly.events import (
+    BaseEventHandler,
+    DiceData,
+    Event,
+    LeaveData,
+    NextData,
+    Payload,
+    StateData,
+)
 from maupoly.exceptions import (
     AlreadyJoinedError,
     LobbyClosedError,
     NoGameInChatError,
 )
-from maupoly.field import CLASSIC_BOARD, BaseField
 from maupoly.player import BaseUser, Player
+from maupoly.rng import GameRandom
 
 
 # TODO: Написать класс игры
 class MonoGame:
     """Игровая сессия."""
 
+    __slots__ = (
+        "actions",
+        "actions_start",
+        "bankrupts",
+        "batch",
+        "board",
+        "current_player",
+        "dice",
+        "event_handler",
+        "fields",
+        "game_start",
+        "lobby",
+        "open",
+        "owner",
+        "players",
+        "random",
+        "revision",
+        "room_id",
+        "round_counter",
+        "seats",
+        "seed",
+        "started",
+        "state",
+        "turn_start",
+        "winner",
+    )
+
     def __init__(
-        self, journal: BaseEventHandler, room_id: int, owner: BaseUser
+        self,
+        journal: BaseEventHandler,
+        room_id: int,
+        owner: BaseUser,
+        seed: int | None = None,
+        board: Board = CLASSIC_BOARD,
     ) -> None:
         self.room_id = room_id
         self.event_handler: BaseEventHandler = journal
+        self.batch: list[Event] | None = None
+        # Каждое изменение игры сопровождается событием, потому число
+        # событий показывает хранилищам, изменилась ли игра
+        self.revision = 0
+
+        # Случайность игры и журнал решений игроков
+        self.seed: int = seed if seed is not None else getrandbits(64)
+        self.random = GameRandom(self.seed)
+        self.lobby: tuple[BaseUser, ...] = ()
+        self.actions = bytearray()
+        # Решения до этой позиции вошли в снимок и в памяти не хранятся,
+        # смотри trim_actions
+        self.actions_start = 0
 
         # Игроки
         self.current_player: int = 0
         self.owner = Player(self, owner.id, owner.name)
         self.players: list[Player] = [self.owner]
+        self.seats: list[Player] = []
         self.bankrupts: list[Player] = []
         self.winner: Player | None = None
 
@@ -37,7 +95,8 @@ class MonoGame:
         self.open: bool = True
         self.dice = 0
         self.state: TurnState = TurnState.NEXT
-        self.fields: list[BaseField] = []
+        self.fields: Board = board
+        self.board = BoardState(self.fields)
         self.round_counter = 0
 
         # Таймеры
@@ -59,28 +118,64 @@ class MonoGame:
 
         return None
 
+    def get_owner(self, index: int) -> Player | None:
+        """Получает владельца поля по индексу поля."""
+        seat = self.board.owners[index]
+        return None if seat == NO_OWNER else self.seats[seat]
+
     def push_event(
-        self, from_player: Player, event_type: GameEvents, data: str = ""
+        self,
+        from_player: Player,
+        event_type: GameEvents,
+        data: Payload | None = None,
     ) -> None:
         """Обёртка над методом journal.push.
 
         Автоматически подставляет текущую игру.
+        Внутри event_batch событие откладывается до конца пачки.
+        """
+        event = Event(self.room_id, from_player, event_type, data, self)
+        self.revision += 1
+        if self.batch is not None:
+            self.batch.append(event)
+        else:
+            self.event_handler.push(event)
+
+    @contextmanager
+    def event_batch(self) -> Iterator[None]:
+        """Собирает события хода и отправляет их одной пачкой.
+
+        Вложенные пачки сливаются с внешней.
         """
-        self.event_handler.push(
-            Event(self.room_id, from_player, event_type, data, self)
-        )
+        if self.batch is not None:
+            yield
+            return
+
+        self.batch = []
+        try:
+            yield
+        finally:
+            events, self.batch = self.batch, None
+            if len(events) > 0:
+                self.event_handler.push_many(events)
 
     def start(self) -> None:
         """Начинает новую игру."""
         logger.info("Start new game in chat {}", self.room_id)
         self.winner = None
         self.bankrupts.clear()
-        shuffle(self.players)
+        self.random = GameRandom(self.seed)
+        self.lobby = tuple(BaseUser(p.user_id, p.name) for p in self.players)
+        self.actions.clear()
+        self.actions_start = 0
+        self.random.shuffle(self.players)
+        self.seats = list(self.players)
+        for seat, player in enumerate(self.seats):
+            player.seat = seat
 
         self.started = True
         self.open = False
-        self.fields.clear()
-        self.fields = CLASSIC_BOARD.copy()
+        self.board.reset(len(self.seats))
         self.round_counter = 0
         self.state = TurnState.NEXT
         self.game_start = datetime.now()
@@ -93,17 +188,64 @@ class MonoGame:
         self.started = False
         self.push_event(self.owner, GameEvents.GAME_END)
 
+    @property
+    def actions_end(self) -> int:
+        """Позиция конца журнала решений с начала партии."""
+        return self.actions_start + len(self.actions)
+
+    def trim_actions(self) -> None:
+        """Забывает решения, которые уже вошли в снимок игры.
+
+        Вызывается журналом событий после снимка, потому журнал решений
+        живой игры не растёт всю партию.
+        Игру с обрезанным журналом нельзя повторить с начала.
+        """
+        self.actions_start = self.actions_end
+        self.actions.clear()
+
+    def roll_dice(self) -> Dice:
+        """Бросает кубик при помощи генератора игры."""
+        return Dice.new(self.random)
+
+    def record(self, action: Action, value: int | None = None) -> None:
+        """Записывает решение игрока в журнал игры."""
+        if not self.started:
+            return
+        self.actions.append(action)
+        if value is not None:
+            self.actions.append(value)
+
     def process_turn(self, dice: Dice) -> None:
         """Обрабатывает бросок кубика."""
-        cur_player = self.player
-        self.push_event(cur_player, GameEvents.PLAYER_DICE, str(dice))
-        cur_player.move(dice.total)
-        cur_player.field(self, cur_player)
-
-        if self.state == TurnState.NEXT:
-            self.next_turn()
+        with self.event_batch():
+            self.record(Action.DICE, dice.first << 4 | dice.second)
+            self.dice = dice.total
+            cur_player = self.player
+            self.push_event(
+                cur_player,
+                GameEvents.PLAYER_DICE,
+                DiceData(dice.first, dice.second),
+            )
+            cur_player.move(dice.total)
+            cur_player.field(self, cur_player)
+
+            # Игрок мог обанкротиться и завершить игру
+            if self.started and self.state == TurnState.NEXT:
+                self.pass_turn()
 
     def next_turn(self) -> None:
+        """Игрок сам завершает свой ход."""
+        with self.event_batch():
+            self.record(Action.NEXT)
+            self.pass_turn()
+
+    def timeout_turn(self) -> None:
+        """Ход пропускается, потому что игрок не уложился в срок."""
+        with self.event_batch():
+            self.record(Action.TIMEOUT)
+            self.pass_turn()
+
+    def pass_turn(self) -> None:
         """Передает ход следующему игроку."""
         logger.info("Next Player")
         self.state = TurnState.NEXT
@@ -127,6 +269,12 @@ class MonoGame:
         self.push_event(player, GameEvents.GAME_JOIN)
         return player
 
+    def leave(self, player: Player) -> None:
+        """Игрок сам покидает игру."""
+        with self.event_batch():
+            self.record(Action.LEAVE, self.players.index(player))
+            self.remove_player(player)
+
     def remove_player(self, player: Player) -> None:
         """Удаляет пользователя из игры."""
         logger.info("Leaving {} game with id {}", player, self.room_id)
@@ -136,19 +284,30 @@ class MonoGame:
 
         if player.balance >= 0:
             self.winner = player
-            self.push_event(player, GameEvents.GAME_LEAVE, "win")
+            self.push_event(player, GameEvents.GAME_LEAVE, LeaveData(True))
             self.end()
-        else:
-            self.bankrupts.append(player)
-            self.push_event(player, GameEvents.GAME_LEAVE, "lose")
+            player.on_leave()
+            return
 
+        self.bankrupts.append(player)
+        self.push_event(player, GameEvents.GAME_LEAVE, LeaveData(False))
         player.on_leave()
+
+        # Освобождаем поля банкрота
+        for index in player.own_fields:
+            self.board.release(index)
+        player.own_fields.clear()
+
+        # Ход остаётся за следующим после выбывшего игроком
+        index = self.players.index(player)
         self.players.remove(player)
+        if index <= self.current_player:
+            self.current_player -= 1
 
         if len(self.players) <= 1:
             # Если игрок сам вышел/проиграл. другие побеждают
-            if self.started and player == self.player:
-                self.winners = self.players[0]
+            if self.started and len(self.players) == 1:
+                self.winner = self.players[0]
             else:
                 self.bankrupts.extend(self.players)
             self.end()
@@ -162,7 +321,7 @@ class MonoGame:
             n (int): Сколько игроков пропустить (1).
 
         """
-        self.push_event(self.player, GameEvents.GAME_NEXT, str(n))
+        self.push_event(self.player, GameEvents.GAME_NEXT, NextData(n))
         self.current_player = (self.current_player + n) % len(self.players)
 
     def set_state(self, state: TurnState) -> None:
@@ -172,4 +331,4 @@ class MonoGame:
         текущего игрока.
         """
         self.state = state
-        self.push_event(self.player, GameEvents.GAME_STATE, str(state))
+        self.push_event(self.player, GameEvents.GAME_STATE, StateData(state))
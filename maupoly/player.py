@@ -1,8 +1,8 @@
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
-from maupoly.enums import GameEvents
-from maupoly.events import Event
+from maupoly.enums import Action, GameEvents
+from maupoly.events import MoneyData, MoveData, Payload
 from maupoly.field import BaseField, BaseRentField
 
 if TYPE_CHECKING:
@@ -21,15 +21,30 @@ class BaseUser:
     name: str
 
 
-# TODO: Написать класс пользователя
 class Player:
+    """Участник игры.
+
+    Хранит баланс, положение на доске и купленные поля.
+    """
+
+    __slots__ = (
+        "_user_name",
+        "balance",
+        "game",
+        "index",
+        "own_fields",
+        "seat",
+        "user_id",
+    )
+
     def __init__(self, game: "MonoGame", user_id: int, user_name: str) -> None:
         self.game = game
         self.user_id = user_id
         self._user_name = user_name
         self.balance = 15000
         self.index = 0
-        self.own_fields: list[BaseRentField] = []
+        self.seat = 0
+        self.own_fields: list[int] = []
 
     @property
     def name(self) -> str:
@@ -41,14 +56,14 @@ class Player:
         """Имеет ли право хода текущий игрок."""
         return self == self.game.player
 
-    def push_event(self, event_type: GameEvents, data: str = "") -> None:
+    def push_event(
+        self, event_type: GameEvents, data: Payload | None = None
+    ) -> None:
         """Отправляет событие в журнал.
 
         Автоматически подставляет игрока и игру.
         """
-        self.game.event_handler.push(
-            Event(self.game.room_id, self, event_type, data, self.game)
-        )
+        self.game.push_event(self, event_type, data)
 
     @property
     def field(self) -> BaseField | BaseRentField:
@@ -87,13 +102,15 @@ class Player:
 
     def move(self, steps: int) -> None:
         """Перемещает игрока на N клеток по полю."""
-        self.push_event(GameEvents.PLAYER_MOVE, str(steps))
+        start = self.index
         self.index = (self.index + steps) % len(self.game.fields)
+        self.push_event(GameEvents.PLAYER_MOVE, MoveData(start, self.index))
 
     def move_to(self, index: int) -> None:
         """Перемещает игрока на конкретное поле."""
-        self.push_event(GameEvents.PLAYER_MOVE, str(index))
+        start = self.index
         self.index = index % len(self.game.fields)
+        self.push_event(GameEvents.PLAYER_MOVE, MoveData(start, self.index))
 
     # Оплата услуг
     # ============
@@ -101,7 +118,8 @@ class Player:
     def pay(self, amount: int) -> None:
         """Оплачивает услуги за монеты."""
         if amount > self.balance:
-            self.balance = 0
+            # Отрицательный баланс означает банкротство
+            self.balance -= amount
             self.game.remove_player(self)
             return
 
@@ -116,9 +134,14 @@ class Player:
 
     def buy_field(self) -> None:
         """Покупает активное поле."""
-        if not isinstance(self.field, BaseRentField):
-            raise ValueError(f"Can`t buy {type(self.field)} field")
-        self.field.buy(self)
-        self.own_fields.append(self.field)
-        self.push_event(GameEvents.PLAYER_BUY_FIELD, str(self.field.buy_cost))
-        self.game.next_turn()
+        field = self.field
+        if not isinstance(field, BaseRentField):
+            raise ValueError(f"Can`t buy {type(field)} field")
+        with self.game.event_batch():
+            self.game.record(Action.BUY)
+            field.buy(self.game, self, self.index)
+            self.own_fields.append(self.index)
+            self.push_event(
+                GameEvents.PLAYER_BUY_FIELD, MoneyData(field.buy_cost)
+            )
+            self.game.pass_turn()
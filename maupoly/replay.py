@@ -0,0 +1,151 @@
+"""Повтор записанных партий.
+
+Партия полностью задаётся зерном генератора, составом лобби и
+журналом решений игроков.
+Повтор заново исполняет решения и должен прийти в то же самое
+состояние, что и исходная игра.
+Используется для сравнения замеров между версиями и разбора ошибок.
+
+Ход, пропущенный по истечении срока, записан отдельным решением, потому
+в журнале его можно отличить от хода, завершённого самим игроком.
+"""
+
+import json
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import Self
+
+from maupoly.board import Board
+from maupoly.boards import CLASSIC_BOARD
+from maupoly.dice import Dice
+from maupoly.enums import Action
+from maupoly.events import BaseEventHandler, NullEventHandler
+from maupoly.exceptions import ReplayError
+from maupoly.game import MonoGame
+from maupoly.player import BaseUser
+
+
+@dataclass(frozen=True, slots=True)
+class GameRecord:
+    """Запись партии.
+
+    - room_id: Комната, в которой шла игра.
+    - seed: Зерно генератора игры.
+    - lobby: Игроки в порядке входа в комнату.
+    - actions: Журнал решений игроков.
+    """
+
+    room_id: int
+    seed: int
+    lobby: tuple[BaseUser, ...]
+    actions: bytes
+
+    @classmethod
+    def from_game(cls, game: MonoGame) -> Self:
+        """Записывает уже начатую игру.
+
+        Игру, загруженную из снимка, записать нельзя: начала журнала
+        решений у неё уже нет.
+        """
+        if len(game.lobby) == 0:
+            raise ValueError("Game was never started")
+        if game.actions_start > 0:
+            raise ValueError("Game actions are trimmed by a snapshot")
+        return cls(game.room_id, game.seed, game.lobby, bytes(game.actions))
+
+    def dumps(self) -> str:
+        """Сохраняет запись в JSON строку для отчёта об ошибке."""
+        return json.dumps(
+            {
+                "room_id": self.room_id,
+                "seed": self.seed,
+                "lobby": [[user.id, user.name] for user in self.lobby],
+                "actions": self.actions.hex(),
+            },
+            ensure_ascii=False,
+        )
+
+    @classmethod
+    def loads(cls, data: str) -> Self:
+        """Загружает запись из JSON строки."""
+        raw = json.loads(data)
+        return cls(
+            room_id=raw["room_id"],
+            seed=raw["seed"],
+            lobby=tuple(BaseUser(i, name) for i, name in raw["lobby"]),
+            actions=bytes.fromhex(raw["actions"]),
+        )
+
+
+def game_digest(game: MonoGame) -> str:
+    """Отпечаток состояния игры для сравнения двух партий."""
+    state = (
+        game.started,
+        game.current_player,
+        str(game.state),
+        game.random.state,
+        [(p.user_id, p.balance, p.index) for p in game.players],
+        [p.user_id for p in game.bankrupts],
+        game.winner.user_id if game.winner is not None else None,
+        list(game.board.owners),
+        list(game.board.levels),
+        list(game.board.deposits),
+    )
+    return blake2b(repr(state).encode(), digest_size=16).hexdigest()
+
+
+def apply_action(game: MonoGame, actions: bytes, pos: int) -> int:
+    """Исполняет одно решение из журнала.
+
+    Возвращает позицию следующего решения.
+    """
+    action = actions[pos]
+    if action == Action.DICE:
+        dice = game.roll_dice()
+        value = actions[pos + 1]
+        if dice != Dice(value >> 4, value & 0xF):
+            raise ReplayError(f"Dice mismatch at {pos}: {dice}")
+        game.process_turn(dice)
+        return pos + 2
+
+    if action == Action.BUY:
+        game.player.buy_field()
+    elif action == Action.NEXT:
+        game.next_turn()
+    elif action == Action.TIMEOUT:
+        game.timeout_turn()
+    elif action == Action.LEAVE:
+        game.leave(game.players[actions[pos + 1]])
+        return pos + 2
+    else:
+        raise ReplayError(f"Unknown action {action} at {pos}")
+    return pos + 1
+
+
+def replay(
+    record: GameRecord,
+    event_handler: BaseEventHandler | None = None,
+    board: Board = CLASSIC_BOARD,
+) -> MonoGame:
+    """Повторяет записанную партию на той же доске.
+
+    Возвращает итоговую игру.
+    """
+    game = MonoGame(
+        event_handler or NullEventHandler(),
+        record.room_id,
+        record.lobby[0],
+        seed=record.seed,
+        board=board,
+    )
+    for user in record.lobby[1:]:
+        game.add_player(user)
+    game.start()
+
+    pos = 0
+    while pos < len(record.actions):
+        pos = apply_action(game, record.actions, pos)
+
+    if bytes(game.actions) != record.actions:
+        raise ReplayError("Replayed actions differ from the record")
+    return game
@@ -0,0 +1,40 @@
+"""Источник случайности для игры.
+
+У каждой игры свой генератор, который полностью задаётся зерном.
+Это позволяет воспроизвести партию и сравнивать замеры производительности
+между версиями движка.
+
+Используется алгоритм SplitMix64: его состояние - одно 64-битное число,
+а результат не зависит от версии Python.
+"""
+
+from typing import Any
+
+_MASK = (1 << 64) - 1
+
+
+class GameRandom:
+    """Генератор случайных чисел с зерном."""
+
+    __slots__ = ("state",)
+
+    def __init__(self, seed: int) -> None:
+        self.state = seed & _MASK
+
+    def next(self) -> int:
+        """Возвращает следующее случайное 64-битное число."""
+        self.state = (self.state + 0x9E3779B97F4A7C15) & _MASK
+        z = self.state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+        return z ^ (z >> 31)
+
+    def randint(self, a: int, b: int) -> int:
+        """Случайное целое число в диапазоне [a, b]."""
+        return a + ((self.next() * (b - a + 1)) >> 64)
+
+    def shuffle(self, items: list[Any]) -> None:
+        """Перемешивает список на месте (Fisher-Yates)."""
+        for i in range(len(items) - 1, 0, -1):
+            j = self.randint(0, i)
+            items[i], items[j] = items[j], items[i]
@@ -0,0 +1,196 @@
+"""Сроки ходов и лобби для всех комнат.
+
+Если игрок ушёл от экрана, комната не должна ждать его вечно.
+Потому у каждой комнаты есть один таймер:
+- Для идущей игры это срок текущего хода.
+- Для лобби это срок, после которого комната закрывается.
+
+Таймеры всех комнат хранятся в одном иерархическом колесе таймеров.
+Перенос таймера занимает O(1) и делается на каждом событии комнаты,
+а одна задача бота раз в шаг колеса забирает истёкшие комнаты.
+Пока таймеры не истекают, шаг колеса почти ничего не стоит, сколько бы
+комнат ни было.
+"""
+
+from collections.abc import Callable, Sequence
+from datetime import timedelta
+from time import monotonic
+
+from maupoly.enums import GameEvents
+from maupoly.events import BaseEventHandler, Event
+from maupoly.game import MonoGame
+
+# Сколько бит номера шага приходится на один уровень колеса
+_BITS = 6
+_SLOTS = 1 << _BITS
+_MASK = _SLOTS - 1
+# Уровней хватает на 2 ** 24 шагов, дальше таймеры ждут в переполнении
+_LEVELS = 4
+
+
+class TimerWheel:
+    """Иерархическое колесо таймеров.
+
+    Время делится на шаги длиной tick секунд.
+    На каждом уровне 64 ячейки, ячейка уровня n охватывает 64 ** n
+    шагов.
+    Таймер кладётся на самый низкий уровень, в окне которого лежит его
+    срок, и спускается ниже, когда колесо доходит до его ячейки.
+
+    Добавление и отмена таймера занимают O(1).
+    Таймер никогда не срабатывает раньше срока, но может сработать
+    позже не более чем на один шаг.
+    """
+
+    __slots__ = ("tick", "_now", "_levels", "_counts", "_timers")
+
+    def __init__(self, tick: float = 1.0, start: float = 0.0) -> None:
+        self.tick = tick
+        # Последний пройденный шаг
+        self._now = int(start // tick)
+        # Последний уровень из одной ячейки для слишком далёких сроков
+        self._levels: list[list[dict[int, int]]] = [
+            [{} for _ in range(_SLOTS)] for _ in range(_LEVELS)
+        ]
+        self._levels.append([{}])
+        # Сколько таймеров на каждом уровне
+        self._counts = [0] * (_LEVELS + 1)
+        # На каком уровне и в какой ячейке лежит таймер каждого ключа
+        self._timers: dict[int, tuple[int, dict[int, int]]] = {}
+
+    def __len__(self) -> int:
+        """Сколько таймеров сейчас стоит на колесе."""
+        return len(self._timers)
+
+    def __contains__(self, key: int) -> bool:
+        """Стоит ли таймер ключа."""
+        return key in self._timers
+
+    def schedule(self, key: int, when: float) -> None:
+        """Ставит или переносит таймер ключа на момент when."""
+        self.cancel(key)
+        self._insert(key, max(-int(-when // self.tick), self._now + 1))
+
+    def cancel(self, key: int) -> None:
+        """Снимает таймер ключа, если он был."""
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            level, slot = timer
+            self._counts[level] -= 1
+            del slot[key]
+
+    def advance(self, now: float) -> list[int]:
+        """Проходит колесо до момента now и возвращает истёкшие ключи."""
+        target = int(now // self.tick)
+        if len(self._timers) == 0:
+            self._now = max(self._now, target)
+            return []
+
+        expired: list[int] = []
+        while self._now < target:
+            # Пустые нижние уровни можно пропустить до их оборота
+            empty = 0
+            while empty < _LEVELS and self._counts[empty] == 0:
+                empty += 1
+            if empty > 0:
+                shift = _BITS * empty
+                step = ((self._now >> shift) + 1) << shift
+                if step > target:
+                    self._now = target
+                    break
+                self._now = step - 1
+
+            self._now += 1
+            step = self._now
+
+            # Сколько уровней колеса завершили полный оборот
+            wrapped = 0
+            while (
+                wrapped < _LEVELS
+                and step & ((1 << (_BITS * (wrapped + 1))) - 1) == 0
+            ):
+                wrapped += 1
+
+            for level in range(wrapped, 0, -1):
+                index = (step >> (_BITS * level)) & _MASK
+                slot = self._take(level, index if level < _LEVELS else 0)
+                for key, deadline in slot.items():
+                    self._insert(key, deadline)
+
+            slot = self._take(0, step & _MASK)
+            for key in slot:
+                del self._timers[key]
+            expired.extend(slot)
+        return expired
+
+    def _insert(self, key: int, deadline: int) -> None:
+        # Первый уровень, в окне которого срок совпадает с текущим шагом
+        level = max((deadline ^ self._now).bit_length() - 1, 0) // _BITS
+        if level < _LEVELS:
+            slot = self._levels[level][(deadline >> (_BITS * level)) & _MASK]
+        else:
+            level = _LEVELS
+            slot = self._levels[level][0]
+        slot[key] = deadline
+        self._counts[level] += 1
+        self._timers[key] = (level, slot)
+
+    def _take(self, level: int, index: int) -> dict[int, int]:
+        slot = self._levels[level][index]
+        self._levels[level][index] = {}
+        self._counts[level] -= len(slot)
+        return slot
+
+
+class TurnScheduler(BaseEventHandler):
+    """Переносит таймер комнаты на каждом её событии.
+
+    Любое событие идущей игры продлевает текущий ход на turn_timeout,
+    событие лобби продлевает лобби на lobby_timeout.
+    Если срок не задан, таймер для такой комнаты не ставится.
+    События передаются дальше обработчику handler.
+    """
+
+    def __init__(
+        self,
+        handler: BaseEventHandler,
+        turn_timeout: timedelta | None = None,
+        lobby_timeout: timedelta | None = None,
+        tick: float = 1.0,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self.handler = handler
+        self.turn_timeout = turn_timeout
+        self.lobby_timeout = lobby_timeout
+        self.clock = clock
+        self.wheel = TimerWheel(tick, clock())
+
+    def push(self, event: Event) -> None:
+        """Переносит таймер комнаты и передаёт событие обработчику."""
+        self._update(event.game, (event,))
+        self.handler.push(event)
+
+    def push_many(self, events: Sequence[Event]) -> None:
+        """Переносит таймер комнаты один раз на всю пачку событий."""
+        self._update(events[0].game, events)
+        self.handler.push_many(events)
+
+    def _update(self, game: MonoGame, events: Sequence[Event]) -> None:
+        if any(e.event_type == GameEvents.SESSION_END for e in events):
+            self.wheel.cancel(game.room_id)
+        else:
+            self.touch(game)
+
+    def touch(self, game: MonoGame) -> None:
+        """Отсчитывает срок комнаты заново с текущего момента."""
+        timeout = self.turn_timeout if game.started else self.lobby_timeout
+        if timeout is None:
+            self.wheel.cancel(game.room_id)
+        else:
+            self.wheel.schedule(
+                game.room_id, self.clock() + timeout.total_seconds()
+            )
+
+    def expired(self) -> list[int]:
+        """Забирает комнаты, срок которых истёк."""
+        return self.wheel.advance(self.clock())
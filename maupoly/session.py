@@ -4,10 +4,15 @@
 Отвечает за создание новых игр и привязыванию их к чату.
 """
 
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Generic, TypeVar, cast
 
 from loguru import logger
 
+from maupoly.board import Board
+from maupoly.boards import CLASSIC_BOARD
 from maupoly.enums import GameEvents
 from maupoly.events import BaseEventHandler, DebugEventHandler, Event
 from maupoly.exceptions import LobbyClosedError, NoGameInChatError
@@ -23,6 +28,8 @@ class SessionManager(Generic[_H]):
 
     Каждая игра (сессия) привязывается к конкретному чату.
     Предоставляет методы для создания и завершения сессий.
+    События сессии уходят через обработчик самой игры, чтобы хранилище
+    могло придержать их вместе с событиями игры.
     """
 
     def __init__(
@@ -32,10 +39,49 @@ class SessionManager(Generic[_H]):
     ) -> None:
         self.storage: BaseStorage = storage or MemoryStorage()
         self.event_handler = event_handler or cast(_H, DebugEventHandler())
+        self.storage.set_handler(self.event_handler)
+
+        # Блокировки комнат и сколько обновлений их ждут
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._lock_users: dict[int, int] = {}
 
     def set_handler(self, handler: _H) -> None:
         """Устанавливает обработчик событий."""
         self.event_handler = handler
+        self.storage.set_handler(handler)
+
+    # Очередь обновлений комнаты
+    # ==========================
+
+    @asynccontextmanager
+    async def lock_room(
+        self, room_id: int, wait: bool = True
+    ) -> AsyncIterator[bool]:
+        """Обрабатывает обновления одной комнаты строго по очереди.
+
+        Обновления разных комнат друг другу не мешают.
+        Если комната занята и wait=False, сразу возвращает False, не
+        дожидаясь очереди. Так отбрасываются повторные нажатия кнопок.
+        """
+        lock = self._locks.get(room_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[room_id] = lock
+        elif not wait and lock.locked():
+            yield False
+            return
+
+        self._lock_users[room_id] = self._lock_users.get(room_id, 0) + 1
+        try:
+            async with lock:
+                yield True
+        finally:
+            users = self._lock_users[room_id] - 1
+            if users == 0:
+                self._lock_users.pop(room_id)
+                self._locks.pop(room_id)
+            else:
+                self._lock_users[room_id] = users
 
     # Управление игроками в сессии
     # ================W============
@@ -51,17 +97,17 @@ class SessionManager(Generic[_H]):
 
         player = game.add_player(user)
         self.storage.add_player(room_id, player.user_id)
-        self.event_handler.push(
-            Event(room_id, player, GameEvents.SESSION_JOIN, "", game)
+        game.event_handler.push(
+            Event(room_id, player, GameEvents.SESSION_JOIN, None, game)
         )
 
     def leave(self, player: Player) -> None:
         """Убирает игрока из игры."""
         game = self.storage.get_player_game(player.user_id)
-        game.remove_player(player)
+        game.leave(player)
         self.storage.remove_player(player.user_id)
-        self.event_handler.push(
-            Event(game.room_id, player, GameEvents.SESSION_LEAVE, "", game)
+        game.event_handler.push(
+            Event(game.room_id, player, GameEvents.SESSION_LEAVE, None, game)
         )
 
     def get_player(self, user_id: int) -> Player | None:
@@ -75,14 +121,22 @@ class SessionManager(Generic[_H]):
     # Управление сессиями
     # ===================
 
-    def create(self, room_id: int, user: BaseUser) -> MonoGame:
-        """Создает новую игру в чате."""
+    def restore(self, game: MonoGame) -> None:
+        """Возвращает восстановленную после сбоя игру в хранилище."""
+        self.storage.add_game(game.room_id, game)
+        for player in game.players:
+            self.storage.add_player(game.room_id, player.user_id)
+
+    def create(
+        self, room_id: int, user: BaseUser, board: Board = CLASSIC_BOARD
+    ) -> MonoGame:
+        """Создает новую игру в чате на указанной доске."""
         logger.info("User {} Create new game session in {}", user, room_id)
-        game = MonoGame(self.event_handler, room_id, user)
+        game = MonoGame(self.event_handler, room_id, user, board=board)
         self.storage.add_game(room_id, game)
         self.storage.add_player(room_id, user.id)
-        self.event_handler.push(
-            Event(room_id, game.owner, GameEvents.SESSION_START, "", game)
+        game.event_handler.push(
+            Event(room_id, game.owner, GameEvents.SESSION_START, None, game)
         )
         return game
 
@@ -96,8 +150,8 @@ class SessionManager(Generic[_H]):
             game: MonoGame = self.storage.remove_game(room_id)
             for player in game.players:
                 self.storage.remove_player(player.user_id)
-            self.event_handler.push(
-                Event(room_id, game.owner, GameEvents.SESSION_END, "", game)
+            game.event_handler.push(
+                Event(room_id, game.owner, GameEvents.SESSION_END, None, game)
             )
         except KeyError as e:
             logger.warning(e)
@@ -1,10 +1,29 @@
 """Хранилище игровых сессий."""
 
+import asyncio
+import sqlite3
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from queue import SimpleQueue
+from time import sleep
+
+from loguru import logger
 
 from maupoly import exceptions
-from maupoly.events import BaseEventHandler
+from maupoly.events import BaseEventHandler, NullEventHandler
 from maupoly.game import MonoGame
+from maupoly.snapshot import dump_game, load_game
+
+# Через сколько секунд повторяется неудачная запись, пауза растёт вдвое
+WRITE_RETRY_DELAY = 0.5
+WRITE_RETRY_MAX_DELAY = 30.0
+# Сколько раз повторять запись при закрытии хранилища
+CLOSE_RETRIES = 3
 
 
 class BaseStorage(ABC):
@@ -55,6 +74,69 @@ class BaseStorage(ABC):
         """Удаляет комнату из хранилища."""
         pass
 
+    # Сохранение
+    # ==========
+
+    def set_handler(self, handler: BaseEventHandler) -> None:
+        """Обработчик событий для игр, загруженных из хранилища."""
+        pass
+
+    def flush(self) -> None:
+        """Сохраняет изменения, накопленные с прошлого вызова."""
+        pass
+
+    def close(self) -> None:
+        """Сохраняет все изменения и освобождает ресурсы хранилища."""
+        pass
+
+    async def refresh(
+        self, room_id: int | None = None, user_id: int | None = None
+    ) -> None:
+        """Готовит игру комнаты и комнату игрока перед обновлением.
+
+        Хранилищам в памяти процесса готовить нечего.
+        """
+        pass
+
+    async def commit(self) -> None:
+        """Сохраняет изменения после обработки обновления."""
+        self.flush()
+
+    async def aclose(self) -> None:
+        """Закрывает хранилище из цикла событий."""
+        self.close()
+
+    def evict(self, now: datetime | None = None) -> int:
+        """Выселяет давно простаивающие игры.
+
+        Возвращает количество выселенных игр.
+        """
+        return 0
+
+
+def _room_users(game: MonoGame) -> Iterator[int]:
+    """Все пользователи, которые могли заходить в комнату."""
+    yield game.owner.user_id
+    for group in (game.players, game.seats, game.bankrupts):
+        for player in group:
+            yield player.user_id
+
+
+@dataclass(slots=True)
+class EvictionStats:
+    """Счётчики выселения игр из памяти.
+
+    - idle: Выселено после долгого простоя.
+    - lru: Выселено при превышении лимита игр.
+    - spilled: Из них сохранено в запасное хранилище.
+    - restored: Возвращено из запасного хранилища.
+    """
+
+    idle: int = 0
+    lru: int = 0
+    spilled: int = 0
+    restored: int = 0
+
 
 class MemoryStorage(BaseStorage):
     """Хранилище сессий в памяти.
@@ -64,20 +146,269 @@ class MemoryStorage(BaseStorage):
     Сессии будут очищены после перезапуска движка.
 
     У каждого игрока может быть только одна активная игра.
+
+    Заброшенные игры выселяются из памяти:
+    - idle_ttl: Сколько может простаивать начатая игра с начала хода.
+    - lobby_ttl: Сколько может ждать игроков лобби, по умолчанию idle_ttl.
+    - max_games: Сколько игр держать в памяти, лишние выселяются
+      начиная с давно не использованных.
+    - spill: Куда сохранять выселенные игры, иначе они теряются.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        idle_ttl: timedelta | None = None,
+        lobby_ttl: timedelta | None = None,
+        max_games: int | None = None,
+        spill: BaseStorage | None = None,
+    ) -> None:
+        # Порядок игр от давно использованных к недавним
+        self.games: OrderedDict[int, MonoGame] = OrderedDict()
+        self.user_to_room: dict[int, int] = {}
+        self.idle_ttl = idle_ttl
+        self.lobby_ttl = lobby_ttl if lobby_ttl is not None else idle_ttl
+        self.max_games = max_games
+        self.spill = spill
+        self.stats = EvictionStats()
+
+    @property
+    def resident(self) -> int:
+        """Сколько игр сейчас находится в памяти."""
+        return len(self.games)
+
+    def add_player(self, room_id: int, user_id: int) -> None:
+        """Добавляет игрока в хранилище."""
+        self.user_to_room[user_id] = room_id
+
+    def remove_player(self, user_id: int) -> None:
+        """Удаляет пользователя из хранилища."""
+        if user_id in self.user_to_room:
+            self.user_to_room.pop(user_id)
+        elif self.spill is not None:
+            self.spill.remove_player(user_id)
+        else:
+            raise KeyError(user_id)
+
+    def get_room(self, user_id: int) -> int:
+        """Получает room_id для указанного игрока."""
+        room_id = self.user_to_room.get(user_id)
+        if room_id is not None:
+            return room_id
+        if self.spill is not None:
+            return self.spill.get_room(user_id)
+        raise exceptions.NoGameInChatError
+
+    def get_player_game(self, user_id: int) -> MonoGame:
+        """Получает игру, в которой находится игрок."""
+        return self.get_game(self.get_room(user_id))
+
+    def get_game(self, room_id: int) -> MonoGame:
+        """Получает игру по room_id."""
+        game = self.games.get(room_id)
+        if game is None:
+            return self._restore(room_id)
+        self.games.move_to_end(room_id)
+        return game
+
+    def add_game(self, room_id: int, game: MonoGame) -> None:
+        """Добавляет новую игру в хранилище."""
+        self.games[room_id] = game
+        self.games.move_to_end(room_id)
+        self._trim()
+
+    def remove_game(self, room_id: int) -> MonoGame:
+        """Удаляет комнату из хранилища."""
+        game = self.games.pop(room_id, None)
+        if game is not None:
+            return game
+        if self.spill is not None:
+            return self.spill.remove_game(room_id)
+        raise exceptions.NoGameInChatError
+
+    # Выселение игр
+    # =============
+
+    def evict(self, now: datetime | None = None) -> int:
+        """Выселяет игры, которые простаивают дольше допустимого."""
+        if self.idle_ttl is None and self.lobby_ttl is None:
+            return 0
+
+        now = now or datetime.now()
+        idle: list[int] = []
+        for room_id, game in self.games.items():
+            if game.started:
+                ttl, since = self.idle_ttl, game.turn_start
+            else:
+                ttl, since = self.lobby_ttl, game.game_start
+            if ttl is not None and now - since > ttl:
+                idle.append(room_id)
+
+        for room_id in idle:
+            self._evict(room_id)
+        self.stats.idle += len(idle)
+        return len(idle)
+
+    def _trim(self) -> None:
+        if self.max_games is None:
+            return
+        while len(self.games) > self.max_games:
+            self._evict(next(iter(self.games)))
+            self.stats.lru += 1
+
+    def _evict(self, room_id: int) -> None:
+        game = self.games.pop(room_id)
+        users = [
+            user_id
+            for user_id in set(_room_users(game))
+            if self.user_to_room.get(user_id) == room_id
+        ]
+        for user_id in users:
+            self.user_to_room.pop(user_id)
+
+        if self.spill is None:
+            logger.debug("Evicted game {}", room_id)
+            return
+
+        self.spill.add_game(room_id, game)
+        for user_id in users:
+            self.spill.add_player(room_id, user_id)
+        self.stats.spilled += 1
+        logger.debug("Spilled game {}", room_id)
+
+    def _restore(self, room_id: int) -> MonoGame:
+        if self.spill is None:
+            raise exceptions.NoGameInChatError
+
+        game = self.spill.remove_game(room_id)
+        for user_id in set(_room_users(game)):
+            try:
+                if self.spill.get_room(user_id) != room_id:
+                    continue
+            except exceptions.NoGameInChatError:
+                continue
+            self.spill.remove_player(user_id)
+            self.user_to_room[user_id] = room_id
+
+        self.games[room_id] = game
+        self._trim()
+        self.stats.restored += 1
+        return game
+
+    # Сохранение
+    # ==========
+
+    def set_handler(self, handler: BaseEventHandler) -> None:
+        """Обработчик событий для игр из запасного хранилища."""
+        if self.spill is not None:
+            self.spill.set_handler(handler)
+
+    def flush(self) -> None:
+        """Сохраняет изменения запасного хранилища."""
+        if self.spill is not None:
+            self.spill.flush()
+
+    def close(self) -> None:
+        """Закрывает запасное хранилище."""
+        if self.spill is not None:
+            self.spill.close()
+
+    async def aclose(self) -> None:
+        """Закрывает запасное хранилище из цикла событий."""
+        if self.spill is not None:
+            await self.spill.aclose()
+
+
+# (room_id, снимок или None) и (user_id, room_id или None)
+_Batch = tuple[list[tuple[int, bytes | None]], list[tuple[int, int | None]]]
+
+
+class SQLiteStorage(BaseStorage):
+    """Хранилище сессий в базе SQLite.
+
+    Игры переживают перезапуск бота.
+    Запись отложенная: изменённые игры только помечаются, а flush
+    собирает их снимки и передаёт в отдельный поток записи.
+    Потому ход игрока никогда не ждёт диска.
+
+    Индекс игроков загружается сразу, а игры - при первом обращении.
+    flush нужно вызывать периодически из того же потока, где идёт игра.
+
+    С offload игры не остаются в памяти после flush и загружаются
+    заново при следующем обращении.
+    Подходит для запасного хранилища, в котором игры лежат без дела.
+    Пока снимок не записан на диск, игра загружается из него.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        event_handler: BaseEventHandler | None = None,
+        offload: bool = False,
+    ) -> None:
+        self.path = Path(path)
+        self.offload = offload
+        self.event_handler: BaseEventHandler = (
+            event_handler or NullEventHandler()
+        )
         self.games: dict[int, MonoGame] = {}
         self.user_to_room: dict[int, int] = {}
-        self.game_journal: dict[int, BaseEventHandler]
+
+        # Изменения, которые ещё не переданы потоку записи
+        self._dirty: set[int] = set()
+        # Игры, полученные с прошлого flush, и номер изменения игры
+        # в последнем переданном снимке
+        self._touched: set[int] = set()
+        self._saved: dict[int, int] = {}
+        self._removed: set[int] = set()
+        self._players: dict[int, int | None] = {}
+        # Удалённые игры, которые поток записи ещё не стёр с диска, и
+        # снимки выгруженных игр, которые он ещё не записал.
+        # Поток записи тоже меняет их, потому доступ через _lock
+        self._deleting: set[int] = set()
+        self._unwritten: dict[int, bytes] = {}
+        self._lock = threading.Lock()
+
+        self._conn = self._connect()
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS games (
+                room_id INTEGER PRIMARY KEY,
+                data BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS players (
+                user_id INTEGER PRIMARY KEY,
+                room_id INTEGER NOT NULL
+            );
+            """
+        )
+        self.user_to_room.update(
+            self._conn.execute("SELECT user_id, room_id FROM players")
+        )
+
+        self._queue: SimpleQueue[_Batch | None] = SimpleQueue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="sqlite-storage", daemon=True
+        )
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # Игроки
+    # ======
 
     def add_player(self, room_id: int, user_id: int) -> None:
         """Добавляет игрока в хранилище."""
         self.user_to_room[user_id] = room_id
+        self._players[user_id] = room_id
 
     def remove_player(self, user_id: int) -> None:
         """Удаляет пользователя из хранилища."""
         self.user_to_room.pop(user_id)
+        self._players[user_id] = None
 
     def get_room(self, user_id: int) -> int:
         """Получает room_id для указанного игрока."""
@@ -88,26 +419,206 @@ class MemoryStorage(BaseStorage):
 
     def get_player_game(self, user_id: int) -> MonoGame:
         """Получает игру, в которой находится игрок."""
-        try:
-            room_id = self.user_to_room[user_id]
-            return self.games[room_id]
-        except KeyError:
-            raise exceptions.NoGameInChatError from KeyError
+        return self.get_game(self.get_room(user_id))
+
+    # Игры
+    # ====
+
+    def _load(self, room_id: int) -> MonoGame:
+        with self._lock:
+            deleting = room_id in self._deleting
+            data = self._unwritten.get(room_id)
+        if room_id in self._removed or deleting:
+            raise exceptions.NoGameInChatError
+        if data is None:
+            row = self._conn.execute(
+                "SELECT data FROM games WHERE room_id = ?", (room_id,)
+            ).fetchone()
+            if row is None:
+                raise exceptions.NoGameInChatError
+            data = row[0]
+
+        game = load_game(data, self.event_handler)
+        self.games[room_id] = game
+        self._saved[room_id] = game.revision
+        logger.debug("Loaded game {} from {}", room_id, self.path)
+        return game
 
     def get_game(self, room_id: int) -> MonoGame:
-        """Получает игру по room_id."""
-        try:
-            return self.games[room_id]
-        except KeyError:
-            raise exceptions.NoGameInChatError from KeyError
+        """Получает игру по room_id.
+
+        Если после этого игра изменится, она попадёт в следующий flush.
+        """
+        game = self.games.get(room_id)
+        if game is None:
+            game = self._load(room_id)
+        self._touched.add(room_id)
+        return game
 
     def add_game(self, room_id: int, game: MonoGame) -> None:
         """Добавляет новую игру в хранилище."""
         self.games[room_id] = game
+        self._removed.discard(room_id)
+        with self._lock:
+            self._deleting.discard(room_id)
+        self._dirty.add(room_id)
 
     def remove_game(self, room_id: int) -> MonoGame:
         """Удаляет комнату из хранилища."""
+        game = self.games.pop(room_id, None)
+        if game is None:
+            game = self._load(room_id)
+            self.games.pop(room_id)
+        self._dirty.discard(room_id)
+        self._touched.discard(room_id)
+        self._saved.pop(room_id, None)
+        self._removed.add(room_id)
+        return game
+
+    # Сохранение
+    # ==========
+
+    def set_handler(self, handler: BaseEventHandler) -> None:
+        """Обработчик событий для игр, загруженных из хранилища."""
+        self.event_handler = handler
+
+    def flush(self) -> None:
+        """Передаёт снимки изменённых игр в поток записи.
+
+        Сама запись на диск происходит в отдельном потоке.
+        Игры, которые только читали, заново не сохраняются.
+        С offload после этого все игры выгружаются из памяти.
+        """
+        for room_id in self._touched:
+            game = self.games.get(room_id)
+            if game is not None and self._saved.get(room_id) != game.revision:
+                self._dirty.add(room_id)
+        self._touched.clear()
+        if self._dirty or self._removed or self._players:
+            self._send()
+        if self.offload:
+            self.games.clear()
+            self._saved.clear()
+
+    def _send(self) -> None:
+        games: list[tuple[int, bytes | None]] = []
+        for room_id in self._dirty:
+            game = self.games[room_id]
+            games.append((room_id, dump_game(game)))
+            self._saved[room_id] = game.revision
+        games.extend((room_id, None) for room_id in self._removed)
+        with self._lock:
+            self._deleting.update(self._removed)
+            if self.offload:
+                self._unwritten.update(
+                    (room_id, data)
+                    for room_id, data in games
+                    if data is not None
+                )
+        self._queue.put((games, list(self._players.items())))
+        self._dirty.clear()
+        self._removed.clear()
+        self._players.clear()
+
+    def close(self) -> None:
+        """Сохраняет все изменения и дожидается окончания записи."""
+        self.flush()
+        self._queue.put(None)
+        self._writer.join()
+        self._conn.close()
+
+    async def aclose(self) -> None:
+        """Сохраняет все изменения, не блокируя цикл событий.
+
+        Окончания записи, в том числе повторов после ошибок, ждёт
+        отдельный поток.
+        """
+        self.flush()
+        self._queue.put(None)
+        await asyncio.to_thread(self._writer.join)
+        self._conn.close()
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        batches: list[_Batch] = []
+        closing = False
+        delay = WRITE_RETRY_DELAY
+        retries = 0
+        while True:
+            if len(batches) == 0 and not closing:
+                batch = self._queue.get()
+                if batch is None:
+                    break
+                batches.append(batch)
+
+            # Забираем всё, что успело накопиться, одной транзакцией
+            while not closing and not self._queue.empty():
+                batch = self._queue.get()
+                if batch is None:
+                    closing = True
+                else:
+                    batches.append(batch)
+
+            if len(batches) == 0 or self._write(conn, batches):
+                batches = []
+                delay = WRITE_RETRY_DELAY
+                if closing:
+                    break
+                continue
+
+            # Неудачная запись повторяется вместе с новыми изменениями
+            if closing:
+                retries += 1
+                if retries > CLOSE_RETRIES:
+                    logger.error(
+                        "Lost {} session batches for {}",
+                        len(batches),
+                        self.path,
+                    )
+                    break
+            sleep(delay)
+            delay = min(delay * 2, WRITE_RETRY_MAX_DELAY)
+        conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batches: list[_Batch]) -> bool:
+        """Записывает изменения одной транзакцией.
+
+        Возвращает False, если запись не удалась и её нужно повторить.
+        """
         try:
-            return self.games.pop(room_id)
-        except KeyError:
-            raise exceptions.NoGameInChatError from KeyError
+            conn.execute("BEGIN")
+            for games, players in batches:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO games VALUES (?, ?)",
+                    [(r, data) for r, data in games if data is not None],
+                )
+                conn.executemany(
+                    "DELETE FROM games WHERE room_id = ?",
+                    [(r,) for r, data in games if data is None],
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO players VALUES (?, ?)",
+                    [(u, r) for u, r in players if r is not None],
+                )
+                conn.executemany(
+                    "DELETE FROM players WHERE user_id = ?",
+                    [(u,) for u, r in players if r is None],
+                )
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.error("Unable to write sessions to {}: {}", self.path, e)
+            if conn.in_transaction:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error as rollback_error:
+                    logger.error("Unable to rollback: {}", rollback_error)
+            return False
+
+        with self._lock:
+            for games, _ in batches:
+                for room_id, data in games:
+                    if data is None:
+                        self._deleting.discard(room_id)
+                    elif self._unwritten.get(room_id) is data:
+                        del self._unwritten[room_id]
+        return True
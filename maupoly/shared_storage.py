@@ -0,0 +1,474 @@
+"""Общее хранилище сессий для нескольких процессов бота.
+
+Игры хранятся во внешнем хранилище ключ-значение с протоколом Redis.
+Потому одни и те же комнаты могут обслуживать сразу несколько
+процессов бота.
+
+У каждой игры есть номер версии.
+Перед обработкой обновления бот вызывает refresh: процесс сверяет
+версию игры и загружает её заново, если игру изменил другой процесс.
+После обработки commit сохраняет игру, только если версия не
+изменилась с момента загрузки, иначе возникает StorageConflictError.
+События игры придерживаются до успешной записи, потому отброшенные
+при конфликте изменения не попадают в журнал сообщений.
+
+Все обращения к хранилищу асинхронные и не задерживают цикл событий.
+Для тестов есть хранилище LocalKeyValue в памяти процесса.
+"""
+
+import asyncio
+import zlib
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+
+from loguru import logger
+
+from maupoly import exceptions
+from maupoly.events import BaseEventHandler, Event, NullEventHandler
+from maupoly.game import MonoGame
+from maupoly.session_storage import BaseStorage
+from maupoly.snapshot import dump_game, load_game
+
+try:
+    from redis.asyncio import Redis
+except ImportError as e:
+    _REDIS_ERROR: ImportError | None = e
+else:
+    _REDIS_ERROR = None
+
+# Хранилища ключ-значение
+# =======================
+
+
+class BaseKeyValue(ABC):
+    """Хранилище ключ-значение.
+
+    Значения с версией хранятся вместе с номером версии.
+    Отсутствующее значение имеет версию 0.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        """Получает значение по ключу."""
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes) -> None:
+        """Записывает значение по ключу."""
+        pass
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Удаляет значение по ключу."""
+        pass
+
+    @abstractmethod
+    async def get_version(self, key: str) -> int:
+        """Получает версию значения."""
+        pass
+
+    @abstractmethod
+    async def get_versioned(self, key: str) -> tuple[int, bytes | None]:
+        """Получает версию и значение."""
+        pass
+
+    @abstractmethod
+    async def set_versioned(self, key: str, version: int, value: bytes) -> bool:
+        """Записывает значение, если его версия всё ещё равна version.
+
+        Новая версия значения будет version + 1.
+        Возвращает False, если значение уже кто-то изменил.
+        """
+        pass
+
+    async def close(self) -> None:
+        """Закрывает соединение с хранилищем."""
+        pass
+
+
+class LocalKeyValue(BaseKeyValue):
+    """Хранилище ключ-значение в памяти процесса.
+
+    Ведёт себя как Redis, используется в тестах и при разработке.
+    """
+
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+        self.versions: dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        """Получает значение по ключу."""
+        return self.values.get(key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        """Записывает значение по ключу."""
+        self.values[key] = value
+
+    async def delete(self, key: str) -> None:
+        """Удаляет значение по ключу."""
+        self.values.pop(key, None)
+        self.versions.pop(key, None)
+
+    async def get_version(self, key: str) -> int:
+        """Получает версию значения."""
+        return self.versions.get(key, 0)
+
+    async def get_versioned(self, key: str) -> tuple[int, bytes | None]:
+        """Получает версию и значение."""
+        return self.versions.get(key, 0), self.values.get(key)
+
+    async def set_versioned(self, key: str, version: int, value: bytes) -> bool:
+        """Записывает значение, если его версия не изменилась."""
+        if self.versions.get(key, 0) != version:
+            return False
+        self.versions[key] = version + 1
+        self.values[key] = value
+        return True
+
+
+# Проверка версии и запись выполняются атомарно на стороне Redis
+_SET_VERSIONED = """
+local version = redis.call('HGET', KEYS[1], 'v') or '0'
+if version ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'v', ARGV[2], 'd', ARGV[3])
+return 1
+"""
+
+
+def _to_bytes(value: bytes | str | None) -> bytes | None:
+    """Приводит ответ клиента к байтам.
+
+    Без decode_responses клиент и так отвечает байтами, но его аннотации
+    допускают и строки.
+    """
+    return value.encode() if isinstance(value, str) else value
+
+
+class RedisKeyValue(BaseKeyValue):
+    """Хранилище ключ-значение в Redis или совместимом сервере.
+
+    Значения с версией хранятся в хеше с полями `v` и `d`.
+    Клиент асинхронный, ожидание ответа сервера не держит цикл событий.
+    """
+
+    def __init__(self, url: str) -> None:
+        if _REDIS_ERROR is not None:
+            raise ImportError(
+                "Redis storage requires redis: pip install maupoly[redis]"
+            ) from _REDIS_ERROR
+
+        self.client: Redis = Redis.from_url(url)
+        self._set_versioned = self.client.register_script(_SET_VERSIONED)
+
+    async def get(self, key: str) -> bytes | None:
+        """Получает значение по ключу."""
+        return _to_bytes(await self.client.get(key))
+
+    async def set(self, key: str, value: bytes) -> None:
+        """Записывает значение по ключу."""
+        await self.client.set(key, value)
+
+    async def delete(self, key: str) -> None:
+        """Удаляет значение по ключу."""
+        await self.client.delete(key)
+
+    async def get_version(self, key: str) -> int:
+        """Получает версию значения."""
+        return int(await self.client.hget(key, "v") or 0)
+
+    async def get_versioned(self, key: str) -> tuple[int, bytes | None]:
+        """Получает версию и значение."""
+        version, value = await self.client.hmget(key, ["v", "d"])
+        return int(version or 0), _to_bytes(value)
+
+    async def set_versioned(self, key: str, version: int, value: bytes) -> bool:
+        """Записывает значение, если его версия не изменилась."""
+        return bool(
+            await self._set_versioned(
+                keys=[key], args=[version, version + 1, value]
+            )
+        )
+
+    async def close(self) -> None:
+        """Закрывает соединения с сервером."""
+        await self.client.aclose()
+
+
+# Придержанные события
+# ====================
+
+
+class HeldEvents(BaseEventHandler):
+    """Придерживает события игр, пока игра не будет записана.
+
+    События копятся по комнатам в порядке появления.
+    Пачки событий одного хода остаются пачками.
+    """
+
+    def __init__(self, handler: BaseEventHandler) -> None:
+        self.handler = handler
+        self.rooms: dict[int, list[tuple[Event, ...]]] = {}
+
+    def push(self, event: Event) -> None:
+        """Придерживает событие."""
+        self.rooms.setdefault(event.room_id, []).append((event,))
+
+    def push_many(self, events: Sequence[Event]) -> None:
+        """Придерживает пачку событий одного хода."""
+        if len(events) > 0:
+            self.rooms.setdefault(events[0].room_id, []).append(tuple(events))
+
+    def take(self, room_id: int) -> list[tuple[Event, ...]]:
+        """Забирает события комнаты, накопленные к этому моменту."""
+        return self.rooms.pop(room_id, [])
+
+    def release(self, batches: list[tuple[Event, ...]]) -> None:
+        """Передаёт забранные события настоящему обработчику."""
+        for batch in batches:
+            if len(batch) == 1:
+                self.handler.push(batch[0])
+            else:
+                self.handler.push_many(batch)
+
+
+# Хранилище сессий
+# ================
+
+
+class SharedStorage(BaseStorage):
+    """Хранилище сессий во внешнем хранилище ключ-значение.
+
+    Снимки игр сжимаются zlib.
+    Процесс держит у себя загруженные игры и комнаты игроков.
+    refresh загружает их заново, только если версия игры изменилась.
+    Изменения и события игр уходят дальше при вызове commit, его нужно
+    вызывать после обработки каждого обновления.
+    Синхронный flush ничего не записывает.
+    """
+
+    def __init__(
+        self,
+        store: BaseKeyValue,
+        prefix: str = "maupoly",
+        event_handler: BaseEventHandler | None = None,
+    ) -> None:
+        self.store = store
+        self.prefix = prefix
+        self.events = HeldEvents(event_handler or NullEventHandler())
+        # Загруженные игры и их версии
+        self.games: dict[int, MonoGame] = {}
+        self.versions: dict[int, int] = {}
+        # Комнаты игроков, известные процессу
+        self.rooms: dict[int, int] = {}
+
+        # Полученные игры и номер изменения игры при последней записи
+        self._touched: set[int] = set()
+        self._saved: dict[int, int] = {}
+        # Изменения, которые ещё не записаны
+        self._dirty: set[int] = set()
+        self._removed: set[int] = set()
+        self._users: dict[int, int | None] = {}
+        # Загрузка и запись не пересекаются, иначе версии разойдутся
+        self._lock = asyncio.Lock()
+
+    def _game_key(self, room_id: int) -> str:
+        return f"{self.prefix}:game:{room_id}"
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.prefix}:user:{user_id}"
+
+    def _changed(self, room_id: int) -> bool:
+        """Игра изменилась с последней записи и ещё не записана."""
+        if room_id in self._dirty or room_id in self._removed:
+            return True
+        game = self.games.get(room_id)
+        return game is not None and game.revision != self._saved.get(room_id)
+
+    def _forget(self, room_id: int) -> None:
+        self.games.pop(room_id, None)
+        self.versions.pop(room_id, None)
+        self._saved.pop(room_id, None)
+        self._touched.discard(room_id)
+        self._dirty.discard(room_id)
+
+    # Игроки
+    # ======
+
+    def add_player(self, room_id: int, user_id: int) -> None:
+        """Добавляет игрока в хранилище."""
+        self.rooms[user_id] = room_id
+        self._users[user_id] = room_id
+
+    def remove_player(self, user_id: int) -> None:
+        """Удаляет пользователя из хранилища."""
+        self.rooms.pop(user_id, None)
+        self._users[user_id] = None
+
+    def get_room(self, user_id: int) -> int:
+        """Получает room_id для указанного игрока."""
+        room_id = self.rooms.get(user_id)
+        if room_id is None:
+            raise exceptions.NoGameInChatError
+        return room_id
+
+    def get_player_game(self, user_id: int) -> MonoGame:
+        """Получает игру, в которой находится игрок."""
+        return self.get_game(self.get_room(user_id))
+
+    # Игры
+    # ====
+
+    def get_game(self, room_id: int) -> MonoGame:
+        """Получает игру по room_id.
+
+        Игра берётся из памяти процесса, свежую версию загружает refresh.
+        Если игра изменится, она попадёт в следующий commit.
+        """
+        game = self.games.get(room_id)
+        if game is None:
+            raise exceptions.NoGameInChatError
+        self._touched.add(room_id)
+        return game
+
+    def add_game(self, room_id: int, game: MonoGame) -> None:
+        """Добавляет новую игру в хранилище.
+
+        Игра будет записана при следующем commit.
+        """
+        game.event_handler = self.events
+        self.games[room_id] = game
+        self.versions[room_id] = 0
+        self._saved.pop(room_id, None)
+        self._dirty.add(room_id)
+
+    def remove_game(self, room_id: int) -> MonoGame:
+        """Удаляет комнату из хранилища.
+
+        Игра будет удалена при следующем commit.
+        """
+        game = self.games.get(room_id)
+        if game is None:
+            raise exceptions.NoGameInChatError
+        self._forget(room_id)
+        self._removed.add(room_id)
+        return game
+
+    # Сохранение
+    # ==========
+
+    def set_handler(self, handler: BaseEventHandler) -> None:
+        """Обработчик событий для записанных игр."""
+        self.events.handler = handler
+
+    async def _refresh_game(self, room_id: int) -> None:
+        key = self._game_key(room_id)
+        if room_id in self.games:
+            if self._changed(room_id) or (
+                await self.store.get_version(key) == self.versions[room_id]
+            ):
+                return
+        elif room_id in self._removed:
+            return
+
+        version, data = await self.store.get_versioned(key)
+        if data is None:
+            self._forget(room_id)
+            return
+
+        game = load_game(zlib.decompress(data), self.events)
+        self.games[room_id] = game
+        self.versions[room_id] = version
+        self._saved[room_id] = game.revision
+
+    async def refresh(
+        self, room_id: int | None = None, user_id: int | None = None
+    ) -> None:
+        """Загружает свежие версии игры комнаты и комнаты игрока.
+
+        Незаписанные изменения процесса не перезаписываются.
+        """
+        async with self._lock:
+            rooms = {room_id} if room_id is not None else set()
+            if user_id is not None and user_id not in self._users:
+                user_room = await self.store.get(self._user_key(user_id))
+                if user_room is None:
+                    self.rooms.pop(user_id, None)
+                else:
+                    self.rooms[user_id] = int(user_room)
+                    rooms.add(int(user_room))
+
+            for room in rooms:
+                await self._refresh_game(room)
+
+    async def commit(self) -> None:
+        """Записывает изменённые игры и отпускает их события.
+
+        Если игру успел изменить другой процесс, изменения этого процесса
+        и их события отбрасываются и возникает StorageConflictError.
+        """
+        async with self._lock:
+            self._dirty.update(r for r in self._touched if self._changed(r))
+            self._touched.clear()
+            dirty, self._dirty = self._dirty, set()
+            removed, self._removed = self._removed, set()
+            users, self._users = self._users, {}
+
+            for room_id in removed:
+                await self.store.delete(self._game_key(room_id))
+                if room_id not in dirty:
+                    self.events.release(self.events.take(room_id))
+            for user_id, user_room in users.items():
+                if user_room is None:
+                    await self.store.delete(self._user_key(user_id))
+                else:
+                    await self.store.set(
+                        self._user_key(user_id), str(user_room).encode()
+                    )
+
+            conflicts: list[int] = []
+            for room_id in dirty:
+                if not await self._write_game(room_id):
+                    conflicts.append(room_id)
+
+        if len(conflicts) > 0:
+            logger.warning("Storage conflict in rooms {}", conflicts)
+            raise exceptions.StorageConflictError(conflicts)
+
+    async def _write_game(self, room_id: int) -> bool:
+        """Записывает игру, возвращает False при конфликте версий."""
+        game = self.games.get(room_id)
+        if game is None:
+            return True
+
+        # Снимок и события берутся до ожидания, пока игра не изменилась
+        version = self.versions[room_id]
+        revision = game.revision
+        data = zlib.compress(dump_game(game), 1)
+        events = self.events.take(room_id)
+        written = await self.store.set_versioned(
+            self._game_key(room_id), version, data
+        )
+
+        if not written:
+            if self.games.get(room_id) is game:
+                self._forget(room_id)
+                self.events.take(room_id)
+            return False
+
+        self.events.release(events)
+        if self.games.get(room_id) is game:
+            self.versions[room_id] = version + 1
+            self._saved[room_id] = revision
+            # Пока шла запись, игру успели изменить
+            if game.revision != revision:
+                self._dirty.add(room_id)
+        return True
+
+    async def aclose(self) -> None:
+        """Записывает все изменённые игры и закрывает соединение."""
+        try:
+            await self.commit()
+        finally:
+            await self.store.close()
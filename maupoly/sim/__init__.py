@@ -0,0 +1,149 @@
+"""Режим симуляции игры.
+
+Позволяет проигрывать целые партии без Telegram бота.
+Решения игроков (купить поле или передать ход) принимает стратегия.
+Используется для нагрузочного тестирования движка и настройки правил.
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from maupoly.enums import TurnState
+from maupoly.events import BaseEventHandler, NullEventHandler
+from maupoly.field import BaseRentField
+from maupoly.game import MonoGame
+from maupoly.player import BaseUser, Player
+
+# Стратегии игроков
+# =================
+
+
+class BaseStrategy(ABC):
+    """Базовая стратегия игрока.
+
+    Заменяет нажатия на кнопки "Купить" и "Отказаться".
+    """
+
+    @abstractmethod
+    def should_buy(self, player: Player, field: BaseRentField) -> bool:
+        """Нужно ли покупать поле, на котором стоит игрок."""
+        pass
+
+
+class AlwaysBuy(BaseStrategy):
+    """Покупает каждое поле, на которое хватает денег."""
+
+    def should_buy(self, player: Player, field: BaseRentField) -> bool:
+        """Всегда соглашается на покупку."""
+        return True
+
+
+class NeverBuy(BaseStrategy):
+    """Никогда ничего не покупает."""
+
+    def should_buy(self, player: Player, field: BaseRentField) -> bool:
+        """Всегда отказывается от покупки."""
+        return False
+
+
+class ReserveBuy(BaseStrategy):
+    """Покупает поле, если после покупки останется запас монет."""
+
+    def __init__(self, reserve: int = 5000) -> None:
+        self.reserve = reserve
+
+    def should_buy(self, player: Player, field: BaseRentField) -> bool:
+        """Покупает поле, если не тратит неприкосновенный запас."""
+        return player.balance - field.buy_cost >= self.reserve
+
+
+STRATEGIES: dict[str, type[BaseStrategy]] = {
+    "always": AlwaysBuy,
+    "never": NeverBuy,
+    "reserve": ReserveBuy,
+}
+
+
+# Симуляция партий
+# ================
+
+
+@dataclass(slots=True)
+class GameResult:
+    """Итог одной сыгранной партии.
+
+    - turns: Сколько бросков кубика было сделано.
+    - winner: Место победителя в порядке ходов или None.
+    - finished: Закончилась ли партия до лимита ходов.
+    """
+
+    turns: int
+    winner: int | None
+    finished: bool
+
+
+class Simulator:
+    """Проигрывает партии без участия пользователей.
+
+    Все партии используют один обработчик событий.
+    По умолчанию события просто отбрасываются.
+    """
+
+    def __init__(
+        self,
+        players: int = 4,
+        strategy: BaseStrategy | None = None,
+        max_turns: int = 10_000,
+        event_handler: BaseEventHandler | None = None,
+    ) -> None:
+        self.players = players
+        self.strategy: BaseStrategy = strategy or AlwaysBuy()
+        self.max_turns = max_turns
+        self.event_handler: BaseEventHandler = (
+            event_handler or NullEventHandler()
+        )
+
+    def new_game(self, room_id: int = 0, seed: int | None = None) -> MonoGame:
+        """Создаёт новую игру с заполненным лобби."""
+        game = MonoGame(
+            self.event_handler, room_id, BaseUser(0, "bot 0"), seed=seed
+        )
+        for i in range(1, self.players):
+            game.add_player(BaseUser(i, f"bot {i}"))
+        return game
+
+    def decide(self, game: MonoGame) -> None:
+        """Принимает решение о покупке поля за текущего игрока."""
+        player = game.player
+        field = player.field
+        if (
+            isinstance(field, BaseRentField)
+            and player.balance > field.buy_cost
+            and self.strategy.should_buy(player, field)
+        ):
+            player.buy_field()
+        else:
+            game.next_turn()
+
+    def play(self, room_id: int = 0, seed: int | None = None) -> GameResult:
+        """Проигрывает одну партию от начала и до конца.
+
+        С одинаковым зерном партия всегда проходит одинаково.
+        """
+        game = self.new_game(room_id, seed)
+        game.start()
+        order = [player.user_id for player in game.players]
+
+        turns = 0
+        while game.started and turns < self.max_turns:
+            game.process_turn(game.roll_dice())
+            turns += 1
+            if game.started and game.state == TurnState.BYU:
+                self.decide(game)
+
+        winner = (
+            order.index(game.winner.user_id)
+            if game.winner is not None
+            else None
+        )
+        return GameResult(turns, winner, not game.started)
@@ -0,0 +1,60 @@
+"""Запуск симуляции партий из командной строки.
+
+```sh
+uv run -m maupoly.sim --games 1000 --players 4 --strategy always
+```
+
+По окончании выводит количество ходов и партий в секунду.
+"""
+
+import argparse
+from time import perf_counter
+
+from loguru import logger
+
+from maupoly.rng import GameRandom
+from maupoly.sim import STRATEGIES, Simulator
+
+
+def main() -> None:
+    """Проигрывает партии и выводит производительность движка."""
+    parser = argparse.ArgumentParser(
+        prog="maupoly.sim", description="Симуляция партий Maupoly."
+    )
+    parser.add_argument("-g", "--games", type=int, default=1000)
+    parser.add_argument("-p", "--players", type=int, default=4)
+    parser.add_argument(
+        "-s", "--strategy", choices=STRATEGIES, default="always"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-turns", type=int, default=10_000)
+    args = parser.parse_args()
+
+    # Журнал движка только замедляет симуляцию
+    logger.disable("maupoly")
+
+    sim = Simulator(
+        players=args.players,
+        strategy=STRATEGIES[args.strategy](),
+        max_turns=args.max_turns,
+    )
+
+    seeds = GameRandom(args.seed)
+    turns = 0
+    finished = 0
+    start = perf_counter()
+    for room_id in range(args.games):
+        result = sim.play(room_id, seeds.next())
+        turns += result.turns
+        finished += result.finished
+    elapsed = perf_counter() - start
+
+    print(f"games:       {args.games} ({finished} finished)")
+    print(f"turns:       {turns}")
+    print(f"elapsed:     {elapsed:.3f} s")
+    print(f"turns/sec:   {turns / elapsed:,.0f}")
+    print(f"games/sec:   {args.games / elapsed:,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Нагрузочная проверка очереди обновлений комнат.
+
+Во множество комнат одновременно летят повторные нажатия кнопки
+"кубик", как это бывает при быстром двойном нажатии в Telegram.
+Каждое нажатие проверяет право хода, уступает управление циклу
+событий и только потом бросает кубик, как это делают фильтры и
+обработчики бота.
+Партии начинаются с зёрен из --seed, потому запуски повторяются.
+
+После проверяется, что на каждый ход принято только одно нажатие
+и все партии повторяются по журналу решений.
+Сценарий повторяет логику бота без Telegram, а те же нажатия через
+настоящие middleware и обработчики бота проверяет
+tests/test_room_press.py.
+
+```sh
+uv run -m maupoly.sim.concurrency --rooms 1000 --presses 8 --seed 0
+```
+"""
+
+import argparse
+import asyncio
+from time import perf_counter
+
+from loguru import logger
+
+from maupoly.enums import TurnState
+from maupoly.events import NullEventHandler
+from maupoly.player import BaseUser, Player
+from maupoly.replay import GameRecord, game_digest, replay
+from maupoly.rng import GameRandom
+from maupoly.session import SessionManager
+from maupoly.session_storage import MemoryStorage
+
+
+async def press_dice(
+    sm: SessionManager, room_id: int, player: Player, lock: bool
+) -> bool:
+    """Одно нажатие кнопки кубика, возвращает было ли оно принято."""
+
+    async def handle() -> bool:
+        game = sm.storage.get_game(room_id)
+        if not game.started or game.player != player:
+            return False
+        # Здесь бот ждёт ответа Telegram или другой задачи
+        await asyncio.sleep(0)
+        # Как и обработчик бота, кубик бросается только в начале хода.
+        # За время ожидания игра могла и вовсе закончиться.
+        if not game.started or game.state != TurnState.NEXT:
+            return False
+        game.process_turn(game.roll_dice())
+        if game.started and game.state == TurnState.BYU:
+            game.next_turn()
+        return True
+
+    if not lock:
+        return await handle()
+
+    async with sm.lock_room(room_id, wait=False) as acquired:
+        if not acquired:
+            return False
+        return await handle()
+
+
+async def stress(
+    rooms: int, presses: int, rounds: int, lock: bool, seed: int
+) -> tuple[int, int]:
+    """Возвращает число лишних ходов и разошедшихся с журналом партий.
+
+    Лишний ход: за одно нажатие игрока принято больше одного нажатия.
+    """
+    sm = SessionManager(MemoryStorage(), NullEventHandler())
+    seeds = GameRandom(seed)
+    for room_id in range(rooms):
+        game = sm.create(room_id, BaseUser(room_id * 2, "owner"))
+        sm.join(room_id, BaseUser(room_id * 2 + 1, "player"))
+        # Генератор игры создаётся заново из зерна при старте
+        game.seed = seeds.next()
+        game.start()
+
+    duplicates = 0
+    for _ in range(rounds):
+        tasks = []
+        for room_id in range(rooms):
+            game = sm.storage.get_game(room_id)
+            if not game.started:
+                continue
+            player = game.player
+            tasks.append(
+                asyncio.gather(
+                    *(
+                        press_dice(sm, room_id, player, lock)
+                        for _ in range(presses)
+                    )
+                )
+            )
+        for results in await asyncio.gather(*tasks):
+            duplicates += max(sum(results) - 1, 0)
+
+    broken = 0
+    for room_id in range(rooms):
+        game = sm.storage.get_game(room_id)
+        if game_digest(replay(GameRecord.from_game(game))) != (
+            game_digest(game)
+        ):
+            broken += 1
+    return duplicates, broken
+
+
+def main() -> None:
+    """Запускает одновременные нажатия с очередью комнат и без неё."""
+    parser = argparse.ArgumentParser(
+        prog="maupoly.sim.concurrency",
+        description="Одновременные нажатия кнопок во множестве комнат.",
+    )
+    parser.add_argument("-r", "--rooms", type=int, default=1000)
+    parser.add_argument("-p", "--presses", type=int, default=8)
+    parser.add_argument("-n", "--rounds", type=int, default=20)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logger.disable("maupoly")
+    for lock in (False, True):
+        start = perf_counter()
+        duplicates, broken = asyncio.run(
+            stress(args.rooms, args.presses, args.rounds, lock, args.seed)
+        )
+        elapsed = perf_counter() - start
+        print(
+            f"{'lock' if lock else 'no lock':>8}: "
+            f"{duplicates} duplicate turns, {broken} rooms broken, "
+            f"{elapsed:.3f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Замер памяти, занимаемой игровыми комнатами.
+
+Создаёт множество комнат через менеджер сессий и считает, сколько
+байт приходится на одну комнату:
+- Ожидающую игроков (лобби).
+- С начатой игрой после нескольких ходов.
+
+```sh
+uv run -m maupoly.sim.memory --rooms 1000 10000 100000
+```
+"""
+
+import argparse
+import gc
+import tracemalloc
+from collections.abc import Callable
+
+from loguru import logger
+
+from maupoly.enums import TurnState
+from maupoly.events import NullEventHandler
+from maupoly.player import BaseUser
+from maupoly.session import SessionManager
+from maupoly.session_storage import MemoryStorage
+from maupoly.sim import AlwaysBuy, Simulator
+
+
+def _measure(action: Callable[[], None]) -> int:
+    """Сколько байт памяти осталось занято после действия."""
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    action()
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0] - before
+
+
+def measure_rooms(
+    rooms: int, players: int = 4, turns: int = 50
+) -> tuple[float, float]:
+    """Возвращает байты на комнату в лобби и на комнату с игрой."""
+    sm = SessionManager(MemoryStorage(), NullEventHandler())
+    sim = Simulator(players=players, strategy=AlwaysBuy())
+
+    def create_rooms() -> None:
+        for room_id in range(rooms):
+            sm.create(room_id, BaseUser(room_id * players, "owner"))
+            for i in range(1, players):
+                sm.join(room_id, BaseUser(room_id * players + i, "player"))
+
+    def start_games() -> None:
+        for room_id in range(rooms):
+            game = sm.storage.get_game(room_id)
+            game.start()
+            for _ in range(turns):
+                if not game.started:
+                    break
+                game.process_turn(game.roll_dice())
+                if game.started and game.state == TurnState.BYU:
+                    sim.decide(game)
+
+    idle = _measure(create_rooms)
+    active = _measure(start_games)
+    return idle / rooms, (idle + active) / rooms
+
+
+def main() -> None:
+    """Выводит затраты памяти для разного количества комнат."""
+    parser = argparse.ArgumentParser(
+        prog="maupoly.sim.memory",
+        description="Замер памяти на игровую комнату.",
+    )
+    parser.add_argument(
+        "-r", "--rooms", type=int, nargs="+", default=[1000, 10_000, 100_000]
+    )
+    parser.add_argument("-p", "--players", type=int, default=4)
+    parser.add_argument("-t", "--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    logger.disable("maupoly")
+    tracemalloc.start()
+    print(f"{'rooms':>8} {'idle B/room':>12} {'active B/game':>14}")
+    for rooms in args.rooms:
+        idle, active = measure_rooms(rooms, args.players, args.turns)
+        print(f"{rooms:>8} {idle:>12,.0f} {active:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Многопроцессный запуск партий методом Монте-Карло.
+
+Партии делятся на пакеты с собственным зерном случайности.
+Каждый пакет проигрывается в отдельном процессе, который возвращает
+только сводную статистику, а не экземпляры игр.
+Статистика всех пакетов после объединяется.
+
+```sh
+uv run -m maupoly.sim.montecarlo --games 1000000 --workers 8
+```
+"""
+
+import argparse
+import os
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from time import perf_counter
+from typing import NamedTuple, Self
+
+from loguru import logger
+
+from maupoly.boards import CLASSIC_BOARD
+from maupoly.events import BaseEventHandler, Event, LeaveData, RentData
+from maupoly.rng import GameRandom
+from maupoly.sim import STRATEGIES, GameResult, Simulator
+
+# Статистика партий
+# =================
+
+
+@dataclass(slots=True)
+class SimStats:
+    """Сводная статистика по множеству партий.
+
+    - wins: Количество побед для каждого места в порядке ходов.
+    - bankruptcies: Сколько игроков обанкротилось на каждом поле.
+    - rent: Сколько ренты собрало каждое поле.
+    """
+
+    players: int
+    games: int
+    finished: int
+    turns: int
+    min_turns: int
+    max_turns: int
+    wins: list[int]
+    bankruptcies: list[int]
+    rent: list[int]
+
+    @classmethod
+    def empty(cls, players: int, fields: int) -> Self:
+        """Создаёт пустую статистику."""
+        return cls(
+            players=players,
+            games=0,
+            finished=0,
+            turns=0,
+            min_turns=0,
+            max_turns=0,
+            wins=[0] * players,
+            bankruptcies=[0] * fields,
+            rent=[0] * fields,
+        )
+
+    def add_result(self, result: GameResult) -> None:
+        """Добавляет результат одной партии."""
+        if self.games == 0 or result.turns < self.min_turns:
+            self.min_turns = result.turns
+        self.max_turns = max(self.max_turns, result.turns)
+        self.games += 1
+        self.finished += result.finished
+        self.turns += result.turns
+        if result.winner is not None:
+            self.wins[result.winner] += 1
+
+    def merge(self, other: "SimStats") -> None:
+        """Добавляет к статистике результаты другого пакета."""
+        if other.games == 0:
+            return
+        if self.games == 0 or other.min_turns < self.min_turns:
+            self.min_turns = other.min_turns
+        self.max_turns = max(self.max_turns, other.max_turns)
+        self.games += other.games
+        self.finished += other.finished
+        self.turns += other.turns
+        for i, wins in enumerate(other.wins):
+            self.wins[i] += wins
+        for i, count in enumerate(other.bankruptcies):
+            self.bankruptcies[i] += count
+        for i, rent in enumerate(other.rent):
+            self.rent[i] += rent
+
+    @property
+    def avg_turns(self) -> float:
+        """Средняя длина партии в бросках кубика."""
+        return self.turns / self.games if self.games else 0.0
+
+
+class StatsEventHandler(BaseEventHandler):
+    """Собирает статистику полей из игровых событий."""
+
+    def __init__(self, stats: SimStats) -> None:
+        self.stats = stats
+
+    def push(self, event: Event) -> None:
+        """Учитывает ренту и банкротства на поле игрока."""
+        if isinstance(event.data, RentData):
+            # Учитывается только то, что получил владелец поля
+            self.stats.rent[event.player.index] += event.data.paid
+        elif isinstance(event.data, LeaveData) and not event.data.win:
+            self.stats.bankruptcies[event.player.index] += 1
+
+
+# Запуск пакетов
+# ==============
+
+
+class BatchTask(NamedTuple):
+    """Пакет партий для одного рабочего процесса."""
+
+    seed: int
+    games: int
+    players: int
+    strategy: str
+    max_turns: int
+
+
+def run_batch(task: BatchTask) -> SimStats:
+    """Проигрывает пакет партий и возвращает их статистику."""
+    seeds = GameRandom(task.seed)
+    stats = SimStats.empty(task.players, len(CLASSIC_BOARD))
+    sim = Simulator(
+        players=task.players,
+        strategy=STRATEGIES[task.strategy](),
+        max_turns=task.max_turns,
+        event_handler=StatsEventHandler(stats),
+    )
+    for room_id in range(task.games):
+        stats.add_result(sim.play(room_id, seeds.next()))
+    return stats
+
+
+def _init_worker() -> None:
+    logger.disable("maupoly")
+
+
+class MonteCarlo:
+    """Распределяет пакеты партий по всем ядрам процессора."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        games: int,
+        *,
+        players: int = 4,
+        strategy: str = "always",
+        seed: int = 0,
+        batch_size: int = 1000,
+        workers: int | None = None,
+        max_turns: int = 10_000,
+    ) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy}")
+        self.games = games
+        self.players = players
+        self.strategy = strategy
+        self.seed = seed
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.max_turns = max_turns
+
+    def tasks(self) -> Iterator[BatchTask]:
+        """Делит партии на пакеты с последовательными зёрнами."""
+        for i, start in enumerate(range(0, self.games, self.batch_size)):
+            yield BatchTask(
+                seed=self.seed + i,
+                games=min(self.batch_size, self.games - start),
+                players=self.players,
+                strategy=self.strategy,
+                max_turns=self.max_turns,
+            )
+
+    def run(self) -> SimStats:
+        """Проигрывает все партии и объединяет статистику."""
+        stats = SimStats.empty(self.players, len(CLASSIC_BOARD))
+        if self.workers == 1:
+            _init_worker()
+            for task in self.tasks():
+                stats.merge(run_batch(task))
+            return stats
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker
+        ) as pool:
+            for batch in pool.map(run_batch, self.tasks()):
+                stats.merge(batch)
+        return stats
+
+
+# Запуск из командной строки
+# ==========================
+
+
+def _print_stats(stats: SimStats, top: int = 5) -> None:
+    print(f"games:       {stats.games} ({stats.finished} finished)")
+    print(
+        f"length:      avg {stats.avg_turns:.1f}, "
+        f"min {stats.min_turns}, max {stats.max_turns}"
+    )
+    print("win rate by seat:")
+    for seat, wins in enumerate(stats.wins):
+        print(f"  {seat + 1}: {wins / max(stats.games, 1):.2%}")
+
+    print("bankruptcies by field:")
+    fields = sorted(
+        range(len(stats.bankruptcies)),
+        key=lambda i: stats.bankruptcies[i],
+        reverse=True,
+    )
+    for i in fields[:top]:
+        print(f"  {CLASSIC_BOARD[i].name}: {stats.bankruptcies[i]}")
+
+    print("rent per game by field:")
+    fields = sorted(
+        range(len(stats.rent)), key=lambda i: stats.rent[i], reverse=True
+    )
+    for i in fields[:top]:
+        print(
+            f"  {CLASSIC_BOARD[i].name}: "
+            f"{stats.rent[i] / max(stats.games, 1):.1f}"
+        )
+
+
+def main() -> None:
+    """Запускает симуляцию и выводит статистику партий."""
+    parser = argparse.ArgumentParser(
+        prog="maupoly.sim.montecarlo",
+        description="Многопроцессная симуляция партий Maupoly.",
+    )
+    parser.add_argument("-g", "--games", type=int, default=10_000)
+    parser.add_argument("-p", "--players", type=int, default=4)
+    parser.add_argument(
+        "-s", "--strategy", choices=STRATEGIES, default="always"
+    )
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument("-b", "--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-turns", type=int, default=10_000)
+    args = parser.parse_args()
+
+    runner = MonteCarlo(
+        games=args.games,
+        players=args.players,
+        strategy=args.strategy,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        max_turns=args.max_turns,
+    )
+    start = perf_counter()
+    stats = runner.run()
+    elapsed = perf_counter() - start
+
+    _print_stats(stats)
+    print(f"workers:     {runner.workers}")
+    print(f"elapsed:     {elapsed:.3f} s")
+    print(f"games/sec:   {stats.games / elapsed:,.1f}")
+    print(f"turns/sec:   {stats.turns / elapsed:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Замер времени восстановления игр из журнала событий.
+
+Играет партии разной длины с журналом событий, после чего
+восстанавливает их и выводит время восстановления одной комнаты.
+Благодаря снимкам время не должно расти вместе с длиной партии.
+
+```sh
+uv run -m maupoly.sim.recovery --turns 100 1000 10000
+```
+"""
+
+import argparse
+import tempfile
+from time import perf_counter
+
+from loguru import logger
+
+from maupoly.enums import TurnState
+from maupoly.event_log import EventLog, EventLogHandler
+from maupoly.events import NullEventHandler
+from maupoly.player import BaseUser
+from maupoly.replay import game_digest
+from maupoly.session import SessionManager
+from maupoly.session_storage import MemoryStorage
+from maupoly.sim import NeverBuy, Simulator
+
+
+def measure_recovery(
+    path: str, rooms: int, turns: int, snapshot_every: int
+) -> float:
+    """Возвращает среднее время восстановления комнаты в секундах."""
+    log = EventLog(path, snapshot_every)
+    sm = SessionManager(
+        MemoryStorage(), EventLogHandler(log, NullEventHandler())
+    )
+    sim = Simulator(strategy=NeverBuy())
+    for room_id in range(rooms):
+        sm.create(room_id, BaseUser(room_id * 2, "owner"))
+        sm.join(room_id, BaseUser(room_id * 2 + 1, "player"))
+        game = sm.storage.get_game(room_id)
+        # Никто ничего не покупает, а налогов хватит надолго,
+        # потому партия доживает до нужной длины
+        for player in game.players:
+            player.balance = 1 << 40
+        game.start()
+        for _ in range(turns):
+            game.process_turn(game.roll_dice())
+            if game.state == TurnState.BYU:
+                sim.decide(game)
+    digests = {
+        room_id: game_digest(sm.storage.get_game(room_id))
+        for room_id in range(rooms)
+    }
+    log.close()
+
+    start = perf_counter()
+    games = EventLog(path, snapshot_every).recover_all(NullEventHandler())
+    elapsed = perf_counter() - start
+
+    for game in games:
+        if game_digest(game) != digests[game.room_id]:
+            raise RuntimeError(f"Room {game.room_id} recovered incorrectly")
+    return elapsed / rooms
+
+
+def main() -> None:
+    """Выводит время восстановления для партий разной длины."""
+    parser = argparse.ArgumentParser(
+        prog="maupoly.sim.recovery",
+        description="Замер времени восстановления из журнала событий.",
+    )
+    parser.add_argument("-r", "--rooms", type=int, default=100)
+    parser.add_argument(
+        "-t", "--turns", type=int, nargs="+", default=[100, 1000, 10_000]
+    )
+    parser.add_argument("-s", "--snapshot-every", type=int, default=256)
+    args = parser.parse_args()
+
+    logger.disable("maupoly")
+    print(f"{'turns':>8} {'ms/room':>10}")
+    for turns in args.turns:
+        with tempfile.TemporaryDirectory() as path:
+            per_room = measure_recovery(
+                path, args.rooms, turns, args.snapshot_every
+            )
+        print(f"{turns:>8} {per_room * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
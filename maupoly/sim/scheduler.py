@@ -0,0 +1,70 @@
+"""Замер колеса таймеров на большом числе комнат.
+
+Ставит таймеры для множества комнат, после чего замеряет:
+- Перенос таймера, который делается на каждом ходе.
+- Шаг колеса, пока ни один таймер не истёк.
+- Срабатывание всех таймеров.
+
+```sh
+uv run -m maupoly.sim.scheduler --rooms 100000 --timeout 120
+```
+"""
+
+import argparse
+import random
+from time import perf_counter
+
+from maupoly.scheduler import TimerWheel
+
+
+def main() -> None:
+    """Выводит время операций колеса таймеров."""
+    parser = argparse.ArgumentParser(
+        prog="maupoly.sim.scheduler",
+        description="Замер колеса таймеров на большом числе комнат.",
+    )
+    parser.add_argument("-r", "--rooms", type=int, default=100_000)
+    parser.add_argument("-t", "--timeout", type=int, default=120)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    wheel = TimerWheel(tick=1.0)
+    now = 0.0
+
+    start = perf_counter()
+    for room_id in range(args.rooms):
+        wheel.schedule(room_id, now + rnd.uniform(0, args.timeout))
+    schedule = perf_counter() - start
+
+    # Каждая комната делает ход и откладывает свой таймер
+    now = 0.5
+    start = perf_counter()
+    for room_id in range(args.rooms):
+        wheel.schedule(room_id, now + args.timeout)
+    reschedule = perf_counter() - start
+
+    # Ходы продолжаются, потому до истечения срока ничего не срабатывает
+    ticks = args.timeout - 1
+    start = perf_counter()
+    for _ in range(ticks):
+        now += 1
+        if wheel.advance(now):
+            raise RuntimeError("Timer expired too early")
+    idle = perf_counter() - start
+
+    start = perf_counter()
+    expired = wheel.advance(now + 2)
+    fire = perf_counter() - start
+    if len(expired) != args.rooms or len(wheel) != 0:
+        raise RuntimeError(f"Expired {len(expired)} of {args.rooms} timers")
+
+    print(f"rooms:      {args.rooms}")
+    print(f"schedule:   {schedule / args.rooms * 1e9:8.0f} ns/timer")
+    print(f"reschedule: {reschedule / args.rooms * 1e9:8.0f} ns/timer")
+    print(f"idle tick:  {idle / ticks * 1e6:8.1f} us/tick")
+    print(f"fire:       {fire / args.rooms * 1e9:8.0f} ns/timer")
+
+
+if __name__ == "__main__":
+    main()
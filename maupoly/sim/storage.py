@@ -0,0 +1,92 @@
+"""Замер пропускной способности хранилища сессий.
+
+Играет партии во множестве комнат через хранилище и периодически
+вызывает flush, как это делает бот.
+Выводит количество ходов в секунду и время одного flush.
+
+```sh
+uv run -m maupoly.sim.storage --rooms 1000 --path /tmp/maupoly.db
+```
+"""
+
+import argparse
+from pathlib import Path
+from time import perf_counter
+
+from loguru import logger
+
+from maupoly.enums import TurnState
+from maupoly.events import NullEventHandler
+from maupoly.exceptions import NoGameInChatError
+from maupoly.player import BaseUser
+from maupoly.session import SessionManager
+from maupoly.session_storage import BaseStorage, MemoryStorage, SQLiteStorage
+from maupoly.sim import AlwaysBuy, Simulator
+
+
+def run(
+    storage: BaseStorage, rooms: int, players: int = 4, rounds: int = 20
+) -> tuple[int, float, float]:
+    """Возвращает число ходов, общее время и самый долгий flush."""
+    sm = SessionManager(storage, NullEventHandler())
+    sim = Simulator(players=players, strategy=AlwaysBuy())
+    for room_id in range(rooms):
+        sm.create(room_id, BaseUser(room_id * players, "owner"))
+        for i in range(1, players):
+            sm.join(room_id, BaseUser(room_id * players + i, "player"))
+        storage.get_game(room_id).start()
+
+    turns = 0
+    slowest_flush = 0.0
+    start = perf_counter()
+    for _ in range(rounds):
+        for room_id in range(rooms):
+            try:
+                game = storage.get_game(room_id)
+            except NoGameInChatError:
+                continue
+            if not game.started:
+                continue
+
+            game.process_turn(game.roll_dice())
+            turns += 1
+            if game.started and game.state == TurnState.BYU:
+                sim.decide(game)
+
+        flush_start = perf_counter()
+        storage.flush()
+        slowest_flush = max(slowest_flush, perf_counter() - flush_start)
+
+    storage.close()
+    return turns, perf_counter() - start, slowest_flush
+
+
+def main() -> None:
+    """Выводит производительность хранилища сессий."""
+    parser = argparse.ArgumentParser(
+        prog="maupoly.sim.storage",
+        description="Замер пропускной способности хранилища сессий.",
+    )
+    parser.add_argument("-r", "--rooms", type=int, default=1000)
+    parser.add_argument("-p", "--players", type=int, default=4)
+    parser.add_argument("-n", "--rounds", type=int, default=20)
+    parser.add_argument(
+        "--path", type=Path, default=None, help="SQLite file, else memory"
+    )
+    args = parser.parse_args()
+
+    logger.disable("maupoly")
+    storage = (
+        SQLiteStorage(args.path) if args.path is not None else MemoryStorage()
+    )
+    turns, elapsed, slowest = run(
+        storage, args.rooms, args.players, args.rounds
+    )
+    print(f"turns:       {turns:,}")
+    print(f"elapsed:     {elapsed:.3f} s")
+    print(f"turns/sec:   {turns / elapsed:,.0f}")
+    print(f"max flush:   {slowest * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Снимки состояния игры.
+
+Снимок содержит всё, что нужно чтобы продолжить игру с того же места:
+игроков, состояние доски, генератор и журнал решений.
+Обработчик событий в снимок не входит и передаётся при загрузке.
+
+Снимок - компактный JSON в байтах.
+Решения игроков, которые привели к снимку, в него не входят: снимок
+хранит только их число, а журнал восстановленной игры начинается
+с этой позиции.
+Используется хранилищами сессий, которые переживают перезапуск бота.
+
+Доска сохраняется путём к своему файлу и хешем его содержимого.
+Если файла больше нет или он изменился, игру восстановить нельзя.
+"""
+
+import json
+from datetime import datetime
+from typing import Any
+
+from maupoly.board import NO_OWNER, Board
+from maupoly.boards import is_builtin, load_board
+from maupoly.enums import TurnState
+from maupoly.events import BaseEventHandler
+from maupoly.game import MonoGame
+from maupoly.player import BaseUser, Player
+from maupoly.rng import GameRandom
+
+# Меняется вместе с форматом снимка
+SNAPSHOT_VERSION = 3
+# Первая версия хранила весь журнал решений, первые две хранили только
+# имя доски
+_SNAPSHOT_VERSIONS = (1, 2, SNAPSHOT_VERSION)
+
+
+def dump_game(game: MonoGame) -> bytes:
+    """Сохраняет состояние игры в снимок."""
+    # Все игроки, которые упоминаются в игре, по одному разу
+    known: dict[int, Player] = {game.owner.user_id: game.owner}
+    for group in (game.players, game.seats, game.bankrupts):
+        for player in group:
+            known.setdefault(player.user_id, player)
+    if game.winner is not None:
+        known.setdefault(game.winner.user_id, game.winner)
+
+    board = game.board
+    data = {
+        "v": SNAPSHOT_VERSION,
+        "room": game.room_id,
+        "board": game.fields.name,
+        "board_path": game.fields.path,
+        "board_hash": game.fields.digest,
+        "seed": game.seed,
+        "rng": game.random.state,
+        "lobby": [[user.id, user.name] for user in game.lobby],
+        "actions_at": game.actions_end,
+        "players": [
+            [
+                p.user_id,
+                p._user_name,
+                p.balance,
+                p.index,
+                p.seat,
+                p.own_fields,
+            ]
+            for p in known.values()
+        ],
+        "owner": game.owner.user_id,
+        "order": [p.user_id for p in game.players],
+        "seats": [p.user_id for p in game.seats],
+        "bankrupts": [p.user_id for p in game.bankrupts],
+        "winner": game.winner.user_id if game.winner is not None else None,
+        "current": game.current_player,
+        "started": game.started,
+        "open": game.open,
+        "dice": game.dice,
+        "state": str(game.state),
+        "round": game.round_counter,
+        "owners": list(board.owners),
+        "levels": board.levels.hex(),
+        "deposits": board.deposits.hex(),
+        "game_start": game.game_start.timestamp(),
+        "turn_start": game.turn_start.timestamp(),
+    }
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _load_board(raw: dict[str, Any]) -> Board:
+    """Загружает доску, на которой шла игра из снимка."""
+    if "board_path" not in raw:
+        if not is_builtin(raw["board"]):
+            raise ValueError(f"Board {raw['board']!r} is not built in")
+        return load_board(raw["board"])
+
+    if raw["board_path"] is None:
+        raise ValueError(f"Board {raw['board']!r} was not loaded from a file")
+    board = load_board(raw["board_path"])
+    if board.digest != raw["board_hash"]:
+        raise ValueError(f"Board file {raw['board_path']} has changed")
+    return board
+
+
+def load_game(data: bytes, event_handler: BaseEventHandler) -> MonoGame:
+    """Восстанавливает игру из снимка.
+
+    Восстановленная игра отправляет события в указанный обработчик.
+    Если доску игры загрузить нельзя, возникает ValueError.
+    """
+    raw: dict[str, Any] = json.loads(data)
+    if raw.get("v") not in _SNAPSHOT_VERSIONS:
+        raise ValueError(f"Unsupported snapshot version: {raw.get('v')}")
+
+    players_raw = {p[0]: p for p in raw["players"]}
+    owner = players_raw[raw["owner"]]
+    game = MonoGame(
+        event_handler,
+        raw["room"],
+        BaseUser(owner[0], owner[1]),
+        raw["seed"],
+        board=_load_board(raw),
+    )
+
+    players: dict[int, Player] = {}
+    for user_id, name, balance, index, seat, own_fields in raw["players"]:
+        if user_id == raw["owner"]:
+            player = game.owner
+        else:
+            player = Player(game, user_id, name)
+        player.balance = balance
+        player.index = index
+        player.seat = seat
+        player.own_fields = own_fields
+        players[user_id] = player
+
+    game.random = GameRandom(raw["rng"])
+    game.lobby = tuple(BaseUser(i, name) for i, name in raw["lobby"])
+    if "actions" in raw:
+        game.actions = bytearray.fromhex(raw["actions"])
+    else:
+        game.actions_start = raw["actions_at"]
+    game.players = [players[i] for i in raw["order"]]
+    game.seats = [players[i] for i in raw["seats"]]
+    game.bankrupts = [players[i] for i in raw["bankrupts"]]
+    game.winner = players[raw["winner"]] if raw["winner"] is not None else None
+    game.current_player = raw["current"]
+    game.started = raw["started"]
+    game.open = raw["open"]
+    game.dice = raw["dice"]
+    game.state = TurnState(raw["state"])
+    game.round_counter = raw["round"]
+    game.game_start = datetime.fromtimestamp(raw["game_start"])
+    game.turn_start = datetime.fromtimestamp(raw["turn_start"])
+
+    # Счётчики владений пересчитываются через методы состояния доски
+    board = game.board
+    board.reset(len(game.seats))
+    deposits = bytes.fromhex(raw["deposits"])
+    for index, seat in enumerate(raw["owners"]):
+        if seat == NO_OWNER:
+            continue
+        board.set_owner(index, seat)
+        board.set_deposit(index, deposits[index] == 1)
+    board.levels[:] = bytes.fromhex(raw["levels"])
+    return game
@@ -0,0 +1,211 @@
+"""Замер скорости отрисовки игрового поля.
+
+Отрисовывает поле для партий в разных состояниях и выводит среднее
+время одной отрисовки.
+Для сравнения поле собирается и старым способом, когда каждый асет
+читается с диска при каждой отрисовке.
+Сборка поля (compose) замеряется отдельно от сжатия в PNG (render).
+Старый способ не рисует занятые поля, потому работы у него меньше.
+
+Также замеряется, насколько отрисовка задерживает цикл событий, если
+рисовать прямо в нём (inline) или в пуле потоков (pool), и как часто
+поле хода уже есть в кеше нарисованных полей.
+
+```sh
+uv run -m polybot.bench --renders 50
+```
+"""
+
+import argparse
+import asyncio
+import io
+from collections.abc import Callable
+from time import perf_counter
+
+from loguru import logger
+from PIL import Image
+
+from maupoly.enums import TurnState
+from maupoly.game import MonoGame
+from maupoly.sim import Simulator
+from polybot.boardgen import (
+    ASSETS_PATH,
+    PLAYER_ASSET,
+    BoardCache,
+    BoardLayers,
+    BoardRenderer,
+    BoardView,
+    compose_board,
+    generate_board,
+)
+
+
+def make_games(count: int, seed: int) -> list[MonoGame]:
+    """Партии на четверых, сыгранные на разное число ходов."""
+    sim = Simulator()
+    games: list[MonoGame] = []
+    for room_id in range(count):
+        game = sim.new_game(room_id, seed + room_id)
+        game.start()
+        for _ in range(room_id * 7 % 40):
+            game.process_turn(game.roll_dice())
+            if not game.started:
+                break
+            if game.state == TurnState.BYU:
+                sim.decide(game)
+        if game.started:
+            games.append(game)
+    return games
+
+
+def compose_from_disk(game: MonoGame) -> Image.Image:
+    """Старая сборка поля: каждый асет читается с диска заново."""
+    board = Image.open(ASSETS_PATH / "board.png")
+    draw_layer = Image.new("RGBA", board.size)
+    pointer_layer = Image.new("RGBA", board.size)
+
+    asset = PLAYER_ASSET[game.current_player]
+    image = Image.open(ASSETS_PATH / asset.name).convert("RGBA")
+    draw_layer.paste(image, (asset.x, asset.y))
+    for i, player in enumerate(game.players):
+        image = Image.open(ASSETS_PATH / f"pointer_{i}.png").convert("RGBA")
+        pointer_layer.paste(image, game.fields.pointers[player.index])
+
+    return Image.alpha_composite(
+        board, Image.alpha_composite(draw_layer, pointer_layer)
+    )
+
+
+def render_from_disk(game: MonoGame) -> bytes:
+    """Старая отрисовка вместе со сжатием в PNG."""
+    buffer = io.BytesIO()
+    compose_from_disk(game).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def render_from_atlas(game: MonoGame) -> bytes:
+    """Отрисовка из асетов, загруженных в память."""
+    return generate_board(game).data
+
+
+def measure(
+    render: Callable[[MonoGame], object], games: list[MonoGame], renders: int
+) -> float:
+    """Возвращает среднее время одной отрисовки в секундах."""
+    start = perf_counter()
+    for i in range(renders):
+        render(games[i % len(games)])
+    return (perf_counter() - start) / renders
+
+
+async def measure_lag(
+    games: list[MonoGame], presses: int, workers: int, pool: bool
+) -> tuple[float, float]:
+    """Рисует поля всех комнат разом и замеряет задержку цикла событий.
+
+    Каждая комната просит несколько полей подряд, как при быстрых ходах.
+    Возвращает общее время и наибольшую задержку цикла событий.
+    """
+    # Все запросы одной комнаты одинаковы, потому кеш полей выключен
+    renderer = BoardRenderer(workers, cache=BoardCache(0))
+    layers = {game.room_id: BoardLayers() for game in games}
+    lag = 0.0
+    running = True
+
+    async def ticker() -> None:
+        nonlocal lag
+        while running:
+            start = perf_counter()
+            await asyncio.sleep(0.001)
+            lag = max(lag, perf_counter() - start - 0.001)
+
+    async def render(game: MonoGame) -> None:
+        if pool:
+            await renderer.render(
+                game.room_id, BoardView.from_game(game), layers[game.room_id]
+            )
+        else:
+            generate_board(game, layers=layers[game.room_id])
+            await asyncio.sleep(0)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    start = perf_counter()
+    await asyncio.gather(*(render(g) for g in games for _ in range(presses)))
+    wall = perf_counter() - start
+    running = False
+    await tick
+    renderer.close()
+    return wall, lag
+
+
+def measure_hits(rooms: int, turns: int, seed: int) -> float:
+    """Доля ходов, поле которых уже рисовалось в этой же партии."""
+    sim = Simulator()
+    cache = BoardCache()
+    for room_id in range(rooms):
+        game = sim.new_game(room_id, seed + room_id)
+        game.start()
+        for _ in range(turns):
+            view = BoardView.from_game(game)
+            if cache.get(view) is None:
+                cache.put(view, "file_id")
+            game.process_turn(game.roll_dice())
+            if not game.started:
+                break
+            if game.state == TurnState.BYU:
+                sim.decide(game)
+    return cache.hits / (cache.hits + cache.misses)
+
+
+def main() -> None:
+    """Сравнивает отрисовку с диска и из памяти."""
+    parser = argparse.ArgumentParser(
+        prog="polybot.bench",
+        description="Замер скорости отрисовки игрового поля.",
+    )
+    parser.add_argument("-n", "--renders", type=int, default=50)
+    parser.add_argument("-g", "--games", type=int, default=10)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-p", "--presses", type=int, default=3)
+    parser.add_argument("-w", "--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    logger.disable("maupoly")
+    games = make_games(args.games, args.seed)
+    layers = {game.room_id: BoardLayers() for game in games}
+
+    def compose_layers(game: MonoGame) -> Image.Image:
+        return compose_board(game, layers=layers[game.room_id])
+
+    def render_layers(game: MonoGame) -> bytes:
+        return generate_board(game, layers=layers[game.room_id]).data
+
+    print(f"{'':>14} {'compose':>10} {'render':>10}")
+    for name, compose, render in (
+        ("disk", compose_from_disk, render_from_disk),
+        ("atlas", compose_board, render_from_atlas),
+        ("cached layer", compose_layers, render_layers),
+    ):
+        compose_time = measure(compose, games, args.renders)
+        render_time = measure(render, games, args.renders)
+        print(
+            f"{name:>14} {compose_time * 1000:>10.2f} "
+            f"{render_time * 1000:>10.2f}"
+        )
+    print("ms per board")
+
+    print(f"\n{'':>14} {'wall':>10} {'max lag':>10}")
+    for name, pool in (("inline", False), ("pool", True)):
+        wall, lag = asyncio.run(
+            measure_lag(games, args.presses, args.workers, pool)
+        )
+        print(f"{name:>14} {wall * 1000:>10.1f} {lag * 1000:>10.1f}")
+    print(f"ms for {args.presses} renders per room")
+
+    hits = measure_hits(args.games, 200, args.seed)
+    print(f"\nboard cache hits: {hits * 100:.1f}% of turns")
+
+
+if __name__ == "__main__":
+    main()
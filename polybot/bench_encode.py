@@ -0,0 +1,76 @@
+"""Замер форматов сжатия изображения поля.
+
+Сжимает настоящее поле из assets/board.png с указателями игроков и
+занятыми полями во всех поддерживаемых форматах.
+Для каждого формата выводит время сжатия, размер файла и время
+загрузки при заданной скорости канала до Telegram.
+Время загрузки считается по размеру файла, а не замеряется.
+
+```sh
+uv run -m polybot.bench_encode --bandwidth 20
+```
+"""
+
+import argparse
+from time import perf_counter
+
+from loguru import logger
+
+from polybot.bench import make_games
+from polybot.boardgen import BoardEncoding, ImageFormat, compose_board
+
+ENCODINGS = (
+    BoardEncoding(ImageFormat.PNG),
+    BoardEncoding(ImageFormat.PNG, compress_level=1),
+    BoardEncoding(ImageFormat.PNG_PALETTE),
+    BoardEncoding(ImageFormat.PNG_PALETTE, compress_level=1),
+    BoardEncoding(ImageFormat.WEBP, quality=80),
+    BoardEncoding(ImageFormat.WEBP, quality=60),
+    BoardEncoding(ImageFormat.JPEG, quality=85),
+    BoardEncoding(ImageFormat.JPEG, quality=70),
+)
+
+
+def encoding_name(encoding: BoardEncoding) -> str:
+    """Краткое описание настроек сжатия."""
+    if encoding.format in (ImageFormat.PNG, ImageFormat.PNG_PALETTE):
+        return f"{encoding.format.value} level {encoding.compress_level}"
+    return f"{encoding.format.value} q{encoding.quality}"
+
+
+def main() -> None:
+    """Выводит время сжатия, размер и время загрузки для форматов."""
+    parser = argparse.ArgumentParser(
+        prog="polybot.bench_encode",
+        description="Замер форматов сжатия изображения поля.",
+    )
+    parser.add_argument("-n", "--repeat", type=int, default=10)
+    parser.add_argument(
+        "-b", "--bandwidth", type=float, default=20, help="Мбит/с"
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logger.disable("maupoly")
+    games = make_games(10, args.seed)
+    images = [compose_board(game) for game in games]
+
+    print(
+        f"{'format':>20} {'encode ms':>10} {'size KiB':>10} {'upload ms':>10}"
+    )
+    for encoding in ENCODINGS:
+        size = 0
+        start = perf_counter()
+        for i in range(args.repeat):
+            size += len(encoding.encode(images[i % len(images)]))
+        encode = (perf_counter() - start) / args.repeat
+        size //= args.repeat
+        upload = size * 8 / (args.bandwidth * 1_000_000)
+        print(
+            f"{encoding_name(encoding):>20} {encode * 1000:>10.1f} "
+            f"{size / 1024:>10.1f} {upload * 1000:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Замер разбора игровых событий журналом сообщений.
+
+Комнаты шлют события быстрее, чем их успевает разобрать бот: каждое
+событие сначала рисует поле (случайная задержка), а потом по очереди
+отправляет сообщение в чат (постоянная задержка).
+Сравниваются два способа:
+- tasks: Старый способ, на каждое событие своя задача.
+- queues: Очередь и одна задача на комнату, комната ждёт wait_ready.
+
+Раз в секунду выводится число задач, неразобранных событий и занятая
+память, а в конце число событий, пришедших не по порядку.
+
+```sh
+uv run -m polybot.bench_events --rooms 50 --rate 5000 --seconds 5
+```
+"""
+
+import argparse
+import asyncio
+import random
+import tracemalloc
+from collections.abc import Sequence
+from time import perf_counter
+from unittest.mock import sentinel
+
+from loguru import logger
+
+from maupoly.enums import GameEvents
+from maupoly.events import Event, MoneyData
+from polybot.events.journal import EventContext, EventRouter, MessageJournal
+
+
+class TaskJournal(MessageJournal):
+    """Старый разбор событий: каждое событие в отдельной задаче."""
+
+    def push(self, event: Event) -> None:
+        """Разбирает событие в новой задаче."""
+        self._loop.create_task(self.router.process(event, self))
+
+    def push_many(self, events: Sequence[Event]) -> None:
+        """Разбирает пачку событий в новой задаче."""
+        self._loop.create_task(self.process_batch(events))
+
+    async def wait_ready(self, room_id: int) -> None:
+        """Старый способ не сдерживает комнаты."""
+        return None
+
+
+async def run(
+    queues: bool, rooms: int, rate: float, seconds: float, latency: float
+) -> tuple[int, int]:
+    """Шлёт события и выводит состояние раз в секунду.
+
+    Возвращает число разобранных событий и событий не по порядку.
+    """
+    rnd = random.Random(0)
+    router = EventRouter()
+    last: dict[int, int] = {}
+    sending = {room_id: asyncio.Semaphore() for room_id in range(rooms)}
+    delivered = 0
+    reordered = 0
+
+    @router.handler(GameEvents.PLAYER_BUY)
+    async def handle(ctx: EventContext) -> None:
+        nonlocal delivered, reordered
+        # Отрисовка поля, потом отправка сообщения в чат по очереди
+        await asyncio.sleep(rnd.random() * latency)
+        async with sending[ctx.event.room_id]:
+            await asyncio.sleep(latency)
+        if not isinstance(ctx.event.data, MoneyData):
+            raise TypeError("Unexpected event data")
+        seq = ctx.event.data.amount
+        if seq < last.get(ctx.event.room_id, -1):
+            reordered += 1
+        last[ctx.event.room_id] = seq
+        delivered += 1
+
+    journal_type = MessageJournal if queues else TaskJournal
+    journal = journal_type(sentinel.bot, router)
+    interval = rooms / rate
+    deadline = perf_counter() + seconds
+
+    async def produce(room_id: int) -> None:
+        seq = 0
+        next_push = perf_counter()
+        while perf_counter() < deadline:
+            await journal.wait_ready(room_id)
+            journal.push(
+                Event(
+                    room_id,
+                    sentinel.player,
+                    GameEvents.PLAYER_BUY,
+                    MoneyData(seq),
+                    sentinel.game,
+                )
+            )
+            seq += 1
+            # Пока комната ждала, пропущенные события не догоняются
+            next_push = max(next_push + interval, perf_counter())
+            await asyncio.sleep(max(next_push - perf_counter(), 0))
+
+    producers = [asyncio.create_task(produce(r)) for r in range(rooms)]
+    print(f"{'s':>4} {'tasks':>8} {'pending':>8} {'done':>8} {'MiB':>8}")
+    for second in range(int(seconds)):
+        await asyncio.sleep(1)
+        pending = journal.pending if queues else len(asyncio.all_tasks())
+        memory = tracemalloc.get_traced_memory()[0] / 2**20
+        print(
+            f"{second + 1:>4} {len(asyncio.all_tasks()):>8} {pending:>8} "
+            f"{delivered:>8} {memory:>8.1f}"
+        )
+    await asyncio.gather(*producers)
+    for task in asyncio.all_tasks() - {asyncio.current_task()}:
+        task.cancel()
+    journal.renderer.close()
+    return delivered, reordered
+
+
+def main() -> None:
+    """Сравнивает разбор событий задачами и очередями комнат."""
+    parser = argparse.ArgumentParser(
+        prog="polybot.bench_events",
+        description="Замер разбора игровых событий журналом сообщений.",
+    )
+    parser.add_argument("-r", "--rooms", type=int, default=50)
+    parser.add_argument("-e", "--rate", type=float, default=5000)
+    parser.add_argument("-t", "--seconds", type=float, default=5)
+    parser.add_argument("-l", "--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    logger.disable("polybot")
+    tracemalloc.start()
+    for name, queues in (("tasks", False), ("queues", True)):
+        print(f"\n{name}: {args.rate:.0f} events/s in {args.rooms} rooms")
+        delivered, reordered = asyncio.run(
+            run(queues, args.rooms, args.rate, args.seconds, args.latency)
+        )
+        print(f"delivered {delivered}, out of order {reordered}")
+
+
+if __name__ == "__main__":
+    main()
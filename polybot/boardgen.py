@@ -5,27 +5,84 @@
 
 - Активный игрок.
 - Положение всех игроков.
+- Занятые и заложенные поля.
+
+Поле собирается из двух слоёв.
+Статичный слой с занятыми полями меняется редко, потому он хранится
+для каждой игры и собирается заново только при изменении владельцев
+или залогов.
+Каждый ход на копию статичного слоя наносятся лишь указатели игроков.
 """
 
+import asyncio
 import io
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from enum import StrEnum
+from functools import partial
 from pathlib import Path
 from time import time
 from typing import NamedTuple
 
 from aiogram.types import BufferedInputFile
 from PIL import Image
-from PIL.ImageFile import ImageFile
 
+from maupoly.board import NO_OWNER, Board
 from maupoly.game import MonoGame
 
 # Коллекция асетов изображений
 ASSETS_PATH = Path("assets/")
 
+# Все асеты, без которых нельзя отрисовать поле
+ASSET_NAMES = (
+    "board.png",
+    *(f"player_{c}.png" for c in ("red", "yellow", "green", "blue")),
+    *(f"pointer_{color}.png" for color in range(4)),
+    *(
+        f"cell{rotate}/cell_{color}{lock}.png"
+        for rotate in range(4)
+        for color in range(4)
+        for lock in ("", "l")
+    ),
+)
+
+
+class AssetAtlas:
+    """Все асеты игрового поля, загруженные в память.
+
+    Изображения читаются с диска и переводятся в RGBA один раз.
+    Если какого-то асета нет, ошибка возникает сразу при загрузке, а не
+    посреди игры.
+    """
+
+    __slots__ = ("path", "images")
+
+    def __init__(self, path: Path = ASSETS_PATH) -> None:
+        self.path = path
+        missing = [n for n in ASSET_NAMES if not (path / n).is_file()]
+        if len(missing) > 0:
+            raise FileNotFoundError(
+                f"Missing assets in {path}: {', '.join(missing)}"
+            )
+
+        self.images: dict[str, Image.Image] = {}
+        for name in ASSET_NAMES:
+            with Image.open(path / name) as image:
+                self.images[name] = image.convert("RGBA")
+
+    def __getitem__(self, name: str) -> Image.Image:
+        """Загруженный асет по имени файла."""
+        return self.images[name]
+
+
+# Асеты загружаются один раз при запуске бота
+ATLAS = AssetAtlas(ASSETS_PATH)
+
 
 class Asset(NamedTuple):
-    """Игровой асет из файла.
+    """Игровой асет.
 
-    Содержит в себе путь к файлу и координаты, по которым надо его
+    Содержит в себе имя асета и координаты, по которым надо его
     установить.
     """
 
@@ -33,10 +90,9 @@ class Asset(NamedTuple):
     x: int
     y: int
 
-    def paste_to(self, board: ImageFile | Image.Image) -> None:
+    def paste_to(self, board: Image.Image, atlas: AssetAtlas) -> None:
         """Вспомогательный метод для быстрой установки асета на изображение."""
-        asset_image = Image.open(ASSETS_PATH / Path(self.name)).convert("RGBA")
-        board.paste(asset_image, (self.x, self.y))
+        board.alpha_composite(atlas[self.name], (self.x, self.y))
 
 
 # Просчитанные координаты для поля
@@ -49,151 +105,418 @@ PLAYER_ASSET = [
     Asset("player_blue.png", 448, 608),
 ]
 
-POINTER_COORDINATES = [
-    # UP
-    (104, 104),
-    (208, 128),
-    (280, 128),
-    (352, 128),
-    (424, 128),
-    (496, 128),
-    (568, 128),
-    (640, 128),
-    (712, 128),
-    (784, 128),
-    # Right
-    (888, 104),
-    (872, 208),
-    (872, 280),
-    (872, 352),
-    (872, 424),
-    (872, 496),
-    (872, 568),
-    (872, 640),
-    (872, 712),
-    (872, 784),
-    # Down
-    (888, 888),
-    (784, 872),
-    (712, 872),
-    (640, 872),
-    (568, 872),
-    (496, 872),
-    (424, 872),
-    (352, 872),
-    (280, 872),
-    (208, 872),
-    (104, 888),
-    (120, 784),
-    (120, 712),
-    (120, 640),
-    (120, 568),
-    (120, 496),
-    (120, 424),
-    (120, 352),
-    (120, 280),
-    (120, 208),
-]
-
-FIELD_COORDINATES = [
-    # Rotate 0 / up
-    (192, 88),
-    (336, 88),
-    (480, 88),
-    (624, 88),
-    (696, 88),
-    (768, 88),
-    # Rotate 1 / right
-    (840, 192),
-    (840, 264),
-    (840, 336),
-    (840, 408),
-    (840, 480),
-    (840, 552),
-    (840, 696),
-    (840, 768),
-    # Rotate 2 / Down
-    (768, 840),
-    (624, 840),
-    (552, 840),
-    (480, 840),
-    (408, 840),
-    (336, 840),
-    (264, 840),
-    (192, 840),
-    # Rotate 3 / Right
-    (88, 768),
-    (88, 696),
-    (88, 552),
-    (88, 480),
-    (88, 336),
-    (88, 192),
-]
-
-
-def get_rotate(index: int) -> int:
-    """Получает поворот поля в зависимости от индекса."""
-    if index < 6:  # noqa: PLR2004
-        return 0
-    elif index < 14:  # noqa: PLR2004
-        return 1
-    elif index < 22:  # noqa: PLR2004
-        return 2
-    else:
-        return 3
+# Координаты полей берутся из таблицы раскладки доски: Board.pointers
+# и Board.cells.
 
 
 # Вспомогательные функции отрисовки
 # =================================
 
 
-def paste_player_pointer(board: Image.Image, index: int, color: int) -> None:
+def paste_player_pointer(
+    board: Image.Image,
+    atlas: AssetAtlas,
+    layout: Board,
+    index: int,
+    color: int,
+) -> None:
     """Вставляет указатель на игрока нв изображение."""
-    coordinates = POINTER_COORDINATES[index]
+    coordinates = layout.pointers[index]
     player_pointer = Asset(
         f"pointer_{color}.png", coordinates[0], coordinates[1]
     )
-    player_pointer.paste_to(board)
+    player_pointer.paste_to(board, atlas)
 
 
-def paste_field(board: ImageFile, index: int, color: int, locked: bool) -> None:
-    """Вставляет занятую клетку на доске."""
-    # Просчитанные заранее координаты
-    coordinates = FIELD_COORDINATES[index]
-    rotate = get_rotate(index)
+def paste_field(
+    board: Image.Image,
+    atlas: AssetAtlas,
+    cell: tuple[int, int, int] | None,
+    color: int,
+    locked: bool,
+) -> None:
+    """Вставляет занятую клетку на доске.
+
+    cell - просчитанные заранее координаты и поворот клетки из схемы.
+    """
+    if cell is None:
+        return
+    x, y, rotate = cell
 
     # Вставляем изображение
     field_asset = Asset(
-        f"cell{rotate}/cell_{color}{'l' if locked else ''}.png",
-        coordinates[0],
-        coordinates[1],
+        f"cell{rotate}/cell_{color}{'l' if locked else ''}.png", x, y
     )
-    field_asset.paste_to(board)
+    field_asset.paste_to(board, atlas)
+
+
+# Слои поля
+# ==========
+
+
+class BoardView(NamedTuple):
+    """Состояние игры, нужное для отрисовки поля.
+
+    Снимается с игры в цикле событий, после чего поле можно рисовать в
+    другом потоке, пока игра идёт дальше.
+
+    - owners: Место владельца каждого поля или NO_OWNER.
+    - deposits: Заложено ли каждое поле.
+    - current: Место игрока, который сейчас ходит, или None, если
+      в игре не осталось игроков.
+    - pointers: Позиция и место каждого игрока.
+    """
+
+    layout: Board
+    owners: tuple[int, ...]
+    deposits: bytes
+    current: int | None
+    pointers: tuple[tuple[int, int], ...]
+
+    @classmethod
+    def from_game(cls, game: MonoGame) -> "BoardView":
+        """Снимает состояние поля с игры."""
+        return cls(
+            game.fields,
+            tuple(game.board.owners),
+            bytes(game.board.deposits),
+            game.player.seat if len(game.players) > 0 else None,
+            tuple((player.index, player.seat) for player in game.players),
+        )
+
+
+def compose_static(view: BoardView, atlas: AssetAtlas = ATLAS) -> Image.Image:
+    """Собирает статичный слой: доску с занятыми полями."""
+    board = atlas["board.png"].copy()
+    for index, seat in enumerate(view.owners):
+        if seat != NO_OWNER:
+            paste_field(
+                board,
+                atlas,
+                view.layout.cells[index],
+                seat,
+                view.deposits[index] == 1,
+            )
+    return board
+
+
+class BoardLayers:
+    """Статичный слой поля одной игры.
+
+    Слой собирается заново, только если изменились владельцы полей или
+    залоги: после покупки, залога, выкупа или банкротства.
+    """
+
+    __slots__ = ("image", "key")
+
+    def __init__(self) -> None:
+        self.image: Image.Image | None = None
+        self.key: tuple[tuple[int, ...], bytes] | None = None
+
+    def static(self, view: BoardView, atlas: AssetAtlas = ATLAS) -> Image.Image:
+        """Возвращает статичный слой для текущего состояния игры."""
+        key = (view.owners, view.deposits)
+        if self.image is None or key != self.key:
+            self.image = compose_static(view, atlas)
+            self.key = key
+        return self.image
+
+
+# Сжатие изображения
+# ==================
+
+
+class ImageFormat(StrEnum):
+    """Формат, в котором поле отправляется в Telegram.
+
+    - png: Полноцветный PNG без потерь.
+    - png_palette: PNG с палитрой, заметно меньше и быстрее полного.
+    - webp: WebP с потерями.
+    - jpeg: JPEG с потерями.
+    """
+
+    PNG = "png"
+    PNG_PALETTE = "png_palette"
+    WEBP = "webp"
+    JPEG = "jpeg"
+
+
+class BoardEncoding(NamedTuple):
+    """Настройки сжатия изображения поля.
+
+    - format: Формат изображения.
+    - compress_level: Уровень сжатия PNG от 0 до 9.
+    - quality: Качество WebP и JPEG от 1 до 100.
+    - colors: Сколько цветов в палитре png_palette.
+    """
+
+    format: ImageFormat = ImageFormat.PNG
+    compress_level: int = 6
+    quality: int = 80
+    colors: int = 256
+
+    @property
+    def extension(self) -> str:
+        """Расширение файла изображения."""
+        if self.format == ImageFormat.PNG_PALETTE:
+            return "png"
+        return self.format.value
+
+    def encode(self, image: Image.Image) -> bytes:
+        """Сжимает изображение поля."""
+        buffer = io.BytesIO()
+        if self.format == ImageFormat.PNG:
+            image.save(buffer, "PNG", compress_level=self.compress_level)
+        elif self.format == ImageFormat.PNG_PALETTE:
+            image.quantize(self.colors, method=Image.Quantize.FASTOCTREE).save(
+                buffer, "PNG", compress_level=self.compress_level
+            )
+        elif self.format == ImageFormat.WEBP:
+            image.save(buffer, "WEBP", quality=self.quality)
+        else:
+            image.convert("RGB").save(buffer, "JPEG", quality=self.quality)
+        return buffer.getvalue()
+
+
+# Полноцветный PNG, как поле отправлялось всегда
+DEFAULT_ENCODING = BoardEncoding()
 
 
 # Главная функция
 # ===============
 
 
-def generate_board(game: MonoGame) -> BufferedInputFile:
-    """Собирает изображение игрового поля для бота."""
-    board = Image.open(ASSETS_PATH / "board.png")
-    draw_layer = Image.new("RGBA", board.size)
-    pointer_layer = Image.new("RGBA", board.size)
+def compose_view(
+    view: BoardView,
+    atlas: AssetAtlas = ATLAS,
+    layers: BoardLayers | None = None,
+) -> Image.Image:
+    """Собирает изображение игрового поля по снятому состоянию.
+
+    Если переданы слои игры, статичный слой берётся из них.
+    """
+    if layers is None:
+        board = compose_static(view, atlas)
+    else:
+        board = layers.static(view, atlas).copy()
 
     # Кто сейчас ходит
-    PLAYER_ASSET[game.current_player].paste_to(draw_layer)
+    if view.current is not None:
+        PLAYER_ASSET[view.current].paste_to(board, atlas)
 
     # Указатели игроков
-    for i, player in enumerate(game.players):
-        paste_player_pointer(pointer_layer, player.index, i)
+    for index, seat in view.pointers:
+        paste_player_pointer(board, atlas, view.layout, index, seat)
+    return board
+
+
+def render_view(
+    view: BoardView,
+    atlas: AssetAtlas = ATLAS,
+    layers: BoardLayers | None = None,
+    encoding: BoardEncoding = DEFAULT_ENCODING,
+) -> BufferedInputFile:
+    """Собирает и сжимает изображение поля по снятому состоянию."""
+    return BufferedInputFile(
+        encoding.encode(compose_view(view, atlas, layers)),
+        f"board_{int(time())}.{encoding.extension}",
+    )
 
-    # TODO: Что там по занятым полям?
 
-    # Сохраняем изображение
-    composite = Image.alpha_composite(
-        board, Image.alpha_composite(draw_layer, pointer_layer)
-    )
-    buffer = io.BytesIO()
-    composite.save(buffer, format="PNG")
-    return BufferedInputFile(buffer.getvalue(), f"board_{int(time())}.png")
+def compose_board(
+    game: MonoGame,
+    atlas: AssetAtlas = ATLAS,
+    layers: BoardLayers | None = None,
+) -> Image.Image:
+    """Собирает изображение игрового поля."""
+    return compose_view(BoardView.from_game(game), atlas, layers)
+
+
+def generate_board(
+    game: MonoGame,
+    atlas: AssetAtlas = ATLAS,
+    layers: BoardLayers | None = None,
+    encoding: BoardEncoding = DEFAULT_ENCODING,
+) -> BufferedInputFile:
+    """Собирает изображение игрового поля для бота."""
+    return render_view(BoardView.from_game(game), atlas, layers, encoding)
+
+
+# Отрисовка вне цикла событий
+# ===========================
+
+# Готовое поле: изображение для загрузки или file_id уже загруженного
+BoardImage = BufferedInputFile | str
+
+# Нарисованное поле вместе с состоянием, по которому оно нарисовано
+_Rendered = tuple[BoardView, BoardImage]
+# Отрисовка, которая ждёт своей очереди
+_Render = tuple[BoardView, BoardLayers, "asyncio.Future[_Rendered]"]
+
+
+class BoardCache:
+    """Уже нарисованные поля.
+
+    Одинаковые состояния поля дают одинаковые изображения, потому
+    ключом служит само снятое состояние BoardView.
+    Пока поле не загружено в Telegram, хранится сжатое изображение.
+    После первой загрузки вместо него хранится только file_id, и поле
+    отправляется по нему без отрисовки и повторной загрузки.
+
+    Давно не использованные поля вытесняются, когда полей больше
+    max_size или ещё не загруженные изображения занимают больше
+    max_bytes байт.
+    """
+
+    __slots__ = ("boards", "hits", "max_bytes", "max_size", "misses", "size")
+
+    def __init__(
+        self, max_size: int = 4096, max_bytes: int = 32 * 2**20
+    ) -> None:
+        self.boards: OrderedDict[BoardView, BoardImage] = OrderedDict()
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _weight(board: BoardImage) -> int:
+        return len(board.data) if isinstance(board, BufferedInputFile) else 0
+
+    def get(self, view: BoardView) -> BoardImage | None:
+        """Получает готовое поле для состояния, если оно есть."""
+        board = self.boards.get(view)
+        if board is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.boards.move_to_end(view)
+        return board
+
+    def put(self, view: BoardView, board: BoardImage) -> None:
+        """Запоминает нарисованное или загруженное поле.
+
+        file_id заменяет изображение того же поля, и его байты больше
+        не занимают место в кеше.
+        """
+        old = self.boards.get(view)
+        if old is not None:
+            self.size -= self._weight(old)
+        self.boards[view] = board
+        self.boards.move_to_end(view)
+        self.size += self._weight(board)
+        while len(self.boards) > self.max_size or self.size > self.max_bytes:
+            _, evicted = self.boards.popitem(last=False)
+            self.size -= self._weight(evicted)
+
+
+class BoardRenderer:
+    """Рисует поля в пуле потоков, не блокируя цикл событий.
+
+    Одновременно рисуется не больше workers полей, а у одной комнаты
+    не больше одного поля за раз.
+    Если пока поле комнаты рисуется, приходит несколько новых состояний,
+    нарисовано будет только последнее из них и все ожидающие получат
+    одно и то же изображение.
+
+    Поля, которые уже рисовались, берутся из cache без отрисовки.
+
+    Глубина очереди depth показывает, сколько комнат ждут свои поля.
+    Если она часто больше числа потоков, потоков не хватает.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        atlas: AssetAtlas = ATLAS,
+        cache: BoardCache | None = None,
+        encoding: BoardEncoding = DEFAULT_ENCODING,
+    ) -> None:
+        self.workers = workers
+        self.atlas = atlas
+        self.cache = cache or BoardCache()
+        self.encoding = encoding
+        self._executor = ThreadPoolExecutor(
+            workers, thread_name_prefix="board-render"
+        )
+        # Комнаты, поле которых рисуется сейчас, и следующие состояния
+        self._running: set[int] = set()
+        self._pending: dict[int, _Render] = {}
+
+        self.rendered = 0
+        self.coalesced = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self) -> int:
+        """Сколько комнат ждут отрисовки поля."""
+        return len(self._running) + len(self._pending)
+
+    async def render(
+        self, room_id: int, view: BoardView, layers: BoardLayers
+    ) -> tuple[BoardView, BoardImage]:
+        """Рисует поле комнаты в отдельном потоке.
+
+        Возвращает изображение или file_id, если поле уже загружалось.
+        Если отрисовку обогнало более новое состояние, возвращается поле
+        для него, потому вместе с полем возвращается и его состояние.
+        """
+        board = self.cache.get(view)
+        if board is not None:
+            return view, board
+
+        pending = self._pending.get(room_id)
+        if pending is not None:
+            # Новое состояние заменяет то, что ещё не начали рисовать
+            self._pending[room_id] = (view, layers, pending[2])
+            self.coalesced += 1
+            return await asyncio.shield(pending[2])
+
+        future: asyncio.Future[_Rendered] = (
+            asyncio.get_running_loop().create_future()
+        )
+        if room_id in self._running:
+            self._pending[room_id] = (view, layers, future)
+        else:
+            self._start(room_id, (view, layers, future))
+        self.max_depth = max(self.max_depth, self.depth)
+        return await asyncio.shield(future)
+
+    def _start(self, room_id: int, render: _Render) -> None:
+        view, layers, future = render
+        self._running.add(room_id)
+        task = asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            render_view,
+            view,
+            self.atlas,
+            layers,
+            self.encoding,
+        )
+        task.add_done_callback(partial(self._done, room_id, view, future))
+
+    def _done(
+        self,
+        room_id: int,
+        view: BoardView,
+        future: "asyncio.Future[_Rendered]",
+        task: "asyncio.Future[BufferedInputFile]",
+    ) -> None:
+        self._running.discard(room_id)
+        self.rendered += 1
+        if task.cancelled():
+            future.cancel()
+        elif (exc := task.exception()) is not None:
+            future.set_exception(exc)
+        else:
+            self.cache.put(view, task.result())
+            future.set_result((view, task.result()))
+
+        pending = self._pending.pop(room_id, None)
+        if pending is not None:
+            self._start(room_id, pending)
+
+    def close(self) -> None:
+        """Останавливает потоки отрисовки."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
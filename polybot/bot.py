@@ -3,20 +3,43 @@
 Здесь определены функции для запуска бота и регистрации всех обработчиков.
 """
 
+import asyncio
+import signal
 import sys
 from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from datetime import timedelta
+from time import perf_counter
 from typing import Any
 
 from aiogram import Bot, Dispatcher
-from aiogram.types import ErrorEvent, Update
+from aiogram.types import (
+    CallbackQuery,
+    ChatMemberUpdated,
+    ErrorEvent,
+    Message,
+    TelegramObject,
+)
 from aiogram.utils.token import TokenValidationError
+from aiogram.webhook.aiohttp_server import (
+    SimpleRequestHandler,
+    setup_application,
+)
+from aiohttp import web
+from aiohttp.typedefs import Middleware
 from loguru import logger
 
+from maupoly.event_log import EventLog, EventLogHandler
+from maupoly.events import BaseEventHandler
+from maupoly.exceptions import NoGameInChatError, StorageConflictError
+from maupoly.scheduler import TurnScheduler
+from polybot.boardgen import BoardEncoding, BoardRenderer
 from polybot.config import config, default, sm
-from polybot.events.journal import MessageJournal
+from polybot.events.journal import JournalSettings, MessageJournal
 from polybot.events.router import er
 from polybot.handlers import ROUTERS
-from polybot.messages import get_error_message
+from polybot.limiter import Priority, RateLimiter
+from polybot.messages import LOBBY_TIMEOUT, get_error_message
 from polybot.utils import get_context
 
 # Константы
@@ -24,6 +47,15 @@ from polybot.utils import get_context
 
 dp = Dispatcher(sm=sm)
 
+# Как часто изменённые игры передаются в хранилище, в секундах
+FLUSH_INTERVAL = 1.0
+# Как часто выселяются заброшенные игры и каналы, в секундах
+EVICT_INTERVAL = 60.0
+# Сколько секунд при остановке ждать разбора оставшихся событий
+DRAIN_TIMEOUT = 10.0
+# Сколько секунд при остановке ждать обновлений, пришедших вебхуком
+WEBHOOK_SHUTDOWN_TIMEOUT = 30.0
+
 # Настраиваем формат отображения логов loguru
 # Обратите внимание что в проекте помимо loguru используется logging
 LOG_FORMAT = (
@@ -35,22 +67,89 @@ LOG_FORMAT = (
 # Middleware
 # ==========
 
+# Следующий обработчик в цепочке aiogram
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+
+def _room_id(event: Message | CallbackQuery) -> int | None:
+    """Комната, к которой относится обновление."""
+    if isinstance(event, Message):
+        return event.chat.id
+    if event.message is not None:
+        return event.message.chat.id
+    try:
+        return sm.storage.get_room(event.from_user.id)
+    except NoGameInChatError:
+        return None
+
+
+@dp.message.outer_middleware.register
+@dp.chat_member.outer_middleware.register
+async def room_queue_middleware(
+    handler: Handler, event: TelegramObject, data: dict[str, Any]
+) -> object:
+    """Обрабатывает сообщения одной комнаты по очереди.
+
+    Пока события комнаты не разобраны, новые сообщения ждут.
+    Игра комнаты загружается заново, если её изменил другой процесс.
+    """
+    if not isinstance(event, Message | ChatMemberUpdated):
+        return await handler(event, data)
+
+    await data["journal"].wait_ready(event.chat.id)
+    async with sm.lock_room(event.chat.id):
+        await sm.storage.refresh(
+            event.chat.id,
+            event.from_user.id if event.from_user is not None else None,
+        )
+        return await handler(event, data)
+
+
+@dp.callback_query.outer_middleware.register
+async def room_press_middleware(
+    handler: Handler, event: TelegramObject, data: dict[str, Any]
+) -> object:
+    """Обрабатывает нажатия кнопок одной комнаты по очереди.
+
+    Пока обрабатывается одно нажатие, остальные отбрасываются, не
+    доходя до фильтров и игры.
+    """
+    if not isinstance(event, CallbackQuery):
+        return await handler(event, data)
+
+    if event.message is None:
+        await sm.storage.refresh(user_id=event.from_user.id)
+    room_id = _room_id(event)
+    if room_id is None:
+        return await handler(event, data)
+
+    await data["journal"].wait_ready(room_id)
+    async with sm.lock_room(room_id, wait=False) as acquired:
+        if not acquired:
+            await event.answer("⏳ Подождите, ход ещё обрабатывается.")
+            return None
+        await sm.storage.refresh(room_id, event.from_user.id)
+        return await handler(event, data)
 
-@dp.message.middleware()
-@dp.callback_query.middleware()
-@dp.chat_member.middleware()
+
+@dp.message.middleware.register
+@dp.callback_query.middleware.register
+@dp.chat_member.middleware.register
 async def game_middleware(
-    handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
-    event: Update,
-    data: dict[str, Any],
-) -> Awaitable[Any]:
-    """Предоставляет экземпляр игры в обработчики сообщений."""
+    handler: Handler, event: TelegramObject, data: dict[str, Any]
+) -> object:
+    """Предоставляет экземпляр игры в обработчики сообщений.
+
+    После обработки сохраняет изменения игры в хранилище.
+    """
     try:
+        if not isinstance(event, Message | ChatMemberUpdated | CallbackQuery):
+            raise TypeError(f"Unknown update type {type(event).__name__}")
         context = get_context(sm, event)
         data["game"] = context.game
         data["player"] = context.player
         data["channel"] = (
-            sm.event_handler.get_channel(context.game.room_id)
+            data["journal"].get_channel(context.game.room_id)
             if context.game is not None
             else None
         )
@@ -60,7 +159,10 @@ async def game_middleware(
         data["player"] = None
         data["channel"] = None
 
-    return await handler(event, data)
+    try:
+        return await handler(event, data)
+    finally:
+        await sm.storage.commit()
 
 
 @dp.errors()
@@ -80,6 +182,220 @@ async def catch_errors(event: ErrorEvent) -> None:
         await message.answer(get_error_message(event.exception))
 
 
+# Сохранение игр
+# ==============
+
+
+async def flush_storage() -> None:
+    """Периодически передаёт изменённые игры в хранилище."""
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        # Конфликт уже записан в лог хранилищем
+        with suppress(StorageConflictError):
+            await sm.storage.commit()
+
+
+async def evict_idle(journal: MessageJournal) -> None:
+    """Периодически выселяет заброшенные игры и каналы сообщений.
+
+    Заодно сообщает наибольшую глубину очереди отрисовки полей,
+    время ожидания запросов к Telegram и число событий, которые не
+    удалось разобрать.
+    """
+    while True:
+        await asyncio.sleep(EVICT_INTERVAL)
+        games = sm.storage.evict()
+        channels = journal.evict()
+        if games or channels:
+            logger.info("Evicted {} games and {} channels", games, channels)
+
+        renderer = journal.renderer
+        if renderer.max_depth > 0:
+            logger.info(
+                "Render queue depth {}, max {} for {} workers, coalesced {}",
+                renderer.depth,
+                renderer.max_depth,
+                renderer.workers,
+                renderer.coalesced,
+            )
+            renderer.max_depth = renderer.depth
+
+        limiter = journal.limiter
+        limiter.evict()
+        if limiter.sent > 0:
+            logger.info(
+                "Telegram queue depth {}, wait mean {:.3f} s, max {:.3f} s"
+                " for {} requests, retried {}",
+                limiter.depth,
+                limiter.mean_wait,
+                limiter.max_wait,
+                limiter.sent,
+                limiter.retried,
+            )
+            limiter.reset_stats()
+
+        if journal.failed > 0:
+            logger.warning("Failed to process {} events", journal.failed)
+            journal.failed = 0
+
+
+# Сроки ходов
+# ===========
+
+
+async def expire_room(room_id: int, journal: MessageJournal) -> None:
+    """Пропускает затянувшийся ход или закрывает заброшенное лобби."""
+    await journal.wait_ready(room_id)
+    async with sm.lock_room(room_id):
+        await sm.storage.refresh(room_id)
+        try:
+            game = sm.storage.get_game(room_id)
+        except NoGameInChatError:
+            return
+
+        if game.started:
+            journal.get_channel(room_id).add(
+                f"⏰ {game.player.name} слишком долго думает, "
+                "ход переходит дальше.\n"
+            )
+            game.timeout_turn()
+        else:
+            await journal.limiter.call(
+                room_id,
+                Priority.LOBBY,
+                lambda: journal.bot.send_message(room_id, LOBBY_TIMEOUT),
+            )
+            sm.remove(room_id)
+        await sm.storage.commit()
+
+
+async def expire_rooms(
+    scheduler: TurnScheduler, journal: MessageJournal
+) -> None:
+    """Раз в шаг колеса таймеров разбирает комнаты с истёкшим сроком."""
+    while True:
+        await asyncio.sleep(scheduler.wheel.tick)
+        for room_id in scheduler.expired():
+            try:
+                await expire_room(room_id, journal)
+            except Exception as e:
+                logger.warning("Unable to expire room {}: {}", room_id, e)
+
+
+@dp.shutdown()
+async def close_storage(journal: MessageJournal) -> None:
+    """Сохраняет все игры перед остановкой бота.
+
+    Сначала журнал дожидается разбора уже пришедших событий, пока
+    хранилище, журнал событий и сессия бота ещё открыты.
+    """
+    logger.info("Drain message journal ...")
+    try:
+        await asyncio.wait_for(journal.close(), DRAIN_TIMEOUT)
+    except TimeoutError:
+        logger.warning("Dropped {} pending events", journal.pending)
+
+    logger.info("Close session storage ...")
+    await sm.storage.aclose()
+    if isinstance(sm.event_handler, EventLogHandler):
+        sm.event_handler.log.close()
+
+
+def recover_games(scheduler: TurnScheduler) -> BaseEventHandler:
+    """Восстанавливает игры из журнала событий, если он включён.
+
+    Возвращает обработчик, который пишет события в журнал.
+    Сроки восстановленных комнат отсчитываются заново.
+    """
+    if config.event_log_path is None:
+        return scheduler
+
+    log_handler = EventLogHandler(EventLog(config.event_log_path), scheduler)
+    start = perf_counter()
+    games = log_handler.log.recover_all(log_handler)
+    for game in games:
+        sm.restore(game)
+        scheduler.touch(game)
+    logger.info(
+        "Recovered {} games in {:.3f} s", len(games), perf_counter() - start
+    )
+    return log_handler
+
+
+# Вебхук
+# ======
+
+
+def limit_updates(limit: int) -> Middleware:
+    """Пропускает к диспетчеру не больше limit обновлений разом.
+
+    Остальные запросы ждут своей очереди, не получая ответа.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    @web.middleware
+    async def middleware(
+        request: web.Request,
+        handler: Callable[[web.Request], Awaitable[web.StreamResponse]],
+    ) -> web.StreamResponse:
+        async with semaphore:
+            return await handler(request)
+
+    return middleware
+
+
+async def run_webhook(bot: Bot, port: int) -> None:
+    """Принимает обновления вебхуком до сигнала остановки.
+
+    Обновление разбирается прямо в запросе Telegram, потому пока бот
+    занят, Telegram не присылает больше webhook_concurrency обновлений.
+    При остановке сервер перестаёт принимать запросы и дожидается
+    разбора уже принятых обновлений.
+    """
+    secret = (
+        config.webhook_secret.get_secret_value()
+        if config.webhook_secret is not None
+        else None
+    )
+    app = web.Application(
+        middlewares=[limit_updates(config.webhook_concurrency)]
+    )
+    SimpleRequestHandler(
+        dp, bot, handle_in_background=False, secret_token=secret
+    ).register(app, path=config.webhook_path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app, shutdown_timeout=WEBHOOK_SHUTDOWN_TIMEOUT)
+    await runner.setup()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await web.TCPSite(runner, config.webhook_host, port).start()
+        if config.webhook_url is not None:
+            await bot.set_webhook(
+                config.webhook_url,
+                secret_token=secret,
+                max_connections=config.webhook_concurrency,
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+        logger.success(
+            "Start webhook on {}:{}{}",
+            config.webhook_host,
+            port,
+            config.webhook_path,
+        )
+        await stop.wait()
+    finally:
+        logger.info("Stop webhook ...")
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+        await runner.cleanup()
+        await bot.session.close()
+
+
 # Главная функция запуска бота
 # ============================
 
@@ -89,7 +405,7 @@ async def main() -> None:
 
     Настраивает журнал
     Загружает все необходимые обработчики.
-    После запускает обработку событий.
+    После запускает обработку событий опросом или вебхуком.
     """
     logger.remove()
     logger.add(sys.stdout, format=LOG_FORMAT)
@@ -110,7 +426,59 @@ async def main() -> None:
         logger.debug("Include router {}", router.name)
 
     logger.info("Set event handler")
-    sm.set_handler(MessageJournal(bot, er))
+    journal = MessageJournal(
+        bot,
+        er,
+        settings=JournalSettings(
+            channel_ttl=config.idle_ttl,
+            max_channels=config.max_games,
+            edit_delay=config.edit_delay,
+            room_backlog=config.room_backlog,
+            max_pending=config.max_pending,
+        ),
+        renderer=BoardRenderer(
+            config.render_workers,
+            encoding=BoardEncoding(
+                config.board_format,
+                compress_level=config.board_compress_level,
+                quality=config.board_quality,
+            ),
+        ),
+        limiter=RateLimiter(
+            global_rate=config.global_rate,
+            chat_rate=config.chat_rate / 60,
+            chat_burst=config.chat_burst,
+        ),
+    )
+    dp["journal"] = journal
+    scheduler = TurnScheduler(
+        journal,
+        turn_timeout=(
+            timedelta(seconds=config.turn_timeout)
+            if config.turn_timeout is not None
+            else None
+        ),
+        lobby_timeout=(
+            timedelta(seconds=config.lobby_timeout)
+            if config.lobby_timeout is not None
+            else None
+        ),
+    )
+    sm.set_handler(recover_games(scheduler))
 
-    logger.success("Start polling!")
-    await dp.start_polling(bot)
+    flush_task = asyncio.create_task(flush_storage())
+    evict_task = asyncio.create_task(evict_idle(journal))
+    expire_task = asyncio.create_task(expire_rooms(scheduler, journal))
+
+    try:
+        if config.webhook_port is not None:
+            await run_webhook(bot, config.webhook_port)
+        else:
+            logger.success("Start polling!")
+            await dp.start_polling(bot)
+    finally:
+        flush_task.cancel()
+        evict_task.cancel()
+        expire_task.cancel()
+        journal.renderer.close()
+        journal.limiter.close()
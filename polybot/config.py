@@ -5,6 +5,7 @@
 Загружаются один раз при запуске бота и больше не изменяются.
 """
 
+from datetime import timedelta
 from pathlib import Path
 
 from aiogram.client.default import DefaultBotProperties
@@ -12,6 +13,9 @@ from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from maupoly.session import SessionManager
+from maupoly.session_storage import BaseStorage, MemoryStorage, SQLiteStorage
+from maupoly.shared_storage import RedisKeyValue, SharedStorage
+from polybot.boardgen import ImageFormat
 
 # Общие настройки бота
 # ====================
@@ -22,10 +26,62 @@ class Config(BaseSettings):
 
     - telegram_token: Токен от Telegram бота.
     - assets_path: Путь к директории с игровыми асетами (поле).
+    - storage_path: Файл базы SQLite для игр, иначе игры хранятся в памяти.
+    - redis_url: Общее хранилище игр для нескольких процессов бота.
+    - idle_ttl: Через сколько секунд простоя игра выселяется из памяти.
+    - lobby_ttl: То же для лобби, по умолчанию idle_ttl.
+    - max_games: Сколько игр и каналов сообщений держать в памяти.
+    - spill_path: Файл SQLite для выселенных игр, иначе они теряются.
+    - event_log_path: Директория журнала событий для восстановления игр.
+    - turn_timeout: Через сколько секунд бездействия ход пропускается.
+    - lobby_timeout: Через сколько секунд бездействия лобби закрывается.
+    - render_workers: Сколько полей можно рисовать одновременно.
+    - board_format: Формат изображения поля: png, png_palette, webp, jpeg.
+    - board_compress_level: Уровень сжатия PNG от 0 до 9.
+    - board_quality: Качество WebP и JPEG от 1 до 100.
+    - edit_delay: Сколько секунд копить правки журнала перед отправкой.
+    - global_rate: Сколько запросов в секунду бот отправляет на все чаты.
+    - chat_rate: Сколько запросов в минуту бот отправляет в один чат.
+    - chat_burst: Сколько запросов в чат можно отправить разом.
+    - room_backlog: Сколько пачек событий комнаты ждут до новых обновлений.
+    - max_pending: Сколько событий всех комнат ждут до новых обновлений.
+    - webhook_port: Если задан, бот принимает обновления вебхуком на этом
+      порту, а не опрашивает Telegram.
+    - webhook_host: Адрес, на котором слушает сервер вебхука.
+    - webhook_path: Путь вебхука на сервере.
+    - webhook_url: Публичный адрес вебхука, который получит Telegram.
+      Если не задан, вебхук не регистрируется, например для проверки.
+    - webhook_secret: Секрет из заголовка запросов Telegram.
+    - webhook_concurrency: Сколько обновлений разбирается одновременно.
     """
 
     telegram_token: SecretStr
     assets_path: Path
+    storage_path: Path | None = None
+    redis_url: str | None = None
+    idle_ttl: int | None = None
+    lobby_ttl: int | None = None
+    max_games: int | None = None
+    spill_path: Path | None = None
+    event_log_path: Path | None = None
+    turn_timeout: int | None = None
+    lobby_timeout: int | None = None
+    render_workers: int = 2
+    board_format: ImageFormat = ImageFormat.PNG
+    board_compress_level: int = 6
+    board_quality: int = 80
+    edit_delay: float = 0.5
+    global_rate: float = 30
+    chat_rate: float = 20
+    chat_burst: int = 3
+    room_backlog: int = 8
+    max_pending: int = 10_000
+    webhook_port: int | None = None
+    webhook_host: str = "0.0.0.0"
+    webhook_path: str = "/webhook"
+    webhook_url: str | None = None
+    webhook_secret: SecretStr | None = None
+    webhook_concurrency: int = 50
 
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8"
@@ -40,5 +96,32 @@ config: Config = Config()  # type: ignore
 
 # Настройки бота по умолчанию
 default = DefaultBotProperties(parse_mode="html")
+
+# Хранилище игр
+storage: BaseStorage
+if config.redis_url is not None:
+    storage = SharedStorage(RedisKeyValue(config.redis_url))
+elif config.storage_path is not None:
+    storage = SQLiteStorage(config.storage_path)
+else:
+    storage = MemoryStorage(
+        idle_ttl=(
+            timedelta(seconds=config.idle_ttl)
+            if config.idle_ttl is not None
+            else None
+        ),
+        lobby_ttl=(
+            timedelta(seconds=config.lobby_ttl)
+            if config.lobby_ttl is not None
+            else None
+        ),
+        max_games=config.max_games,
+        spill=(
+            SQLiteStorage(config.spill_path, offload=True)
+            if config.spill_path is not None
+            else None
+        ),
+    )
+
 # FIXME: Аннотации типов не хватает немного
-sm = SessionManager()
+sm = SessionManager(storage)
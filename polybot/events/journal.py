@@ -1,9 +1,11 @@
 """Обработчик игровых событий движка."""
 
 import asyncio
-from collections import deque
-from collections.abc import Awaitable, Callable
-from typing import Any, TypeVar
+from collections import OrderedDict, deque
+from collections.abc import Awaitable, Callable, Sequence
+from itertools import islice
+from time import monotonic
+from typing import Any, NamedTuple, TypeVar
 
 from aiogram import Bot
 from aiogram.types import BufferedInputFile, InlineKeyboardMarkup, Message
@@ -11,8 +13,14 @@ from loguru import logger
 
 from maupoly.enums import GameEvents
 from maupoly.events import BaseEventHandler, Event
-from polybot.boardgen import generate_board
+from polybot.boardgen import (
+    BoardImage,
+    BoardLayers,
+    BoardRenderer,
+    BoardView,
+)
 from polybot.keyboards import TURN_MARKUP
+from polybot.limiter import Priority, RateLimiter
 
 FuncType = Callable[..., Any] | Callable[..., Awaitable[Any]]
 
@@ -64,9 +72,9 @@ class EventContext:
         """Добавляет новую запись в буфер сообщений."""
         self._channel.add(text)
 
-    def gen_board(self) -> None:
+    async def gen_board(self) -> None:
         """Обновляет игровое поле."""
-        self._channel.gen_board(self.event)
+        await self._channel.gen_board(self.event)
 
 
 class EventRouter:
@@ -96,20 +104,59 @@ class EventRouter:
         return wrapper
 
 
+class JournalSettings(NamedTuple):
+    """Настройки журнала сообщений.
+
+    - channel_ttl: Сколько секунд канал может не использоваться.
+    - max_channels: Сколько каналов держать, начиная с недавних.
+    - edit_delay: На сколько секунд откладываются правки журналов.
+    - room_backlog: Сколько пачек событий может ждать в одной комнате.
+    - max_pending: Сколько событий может ждать во всех комнатах.
+    """
+
+    channel_ttl: float | None = None
+    max_channels: int | None = None
+    edit_delay: float = 0.0
+    room_backlog: int = 8
+    max_pending: int = 10_000
+
+
 class MessageChannel:
-    """Канал сообщений, привязанный к конкретному чату."""
+    """Канал сообщений, привязанный к конкретному чату.
 
-    def __init__(
-        self, room_id: int, bot: Bot, default_markup: InlineKeyboardMarkup
-    ) -> None:
+    Правки уже отправленного журнала откладываются на edit_delay секунд,
+    и все изменения за это время уходят в Telegram одной правкой.
+    Если подпись и клавиатура не изменились, правка не отправляется.
+    Бота, отрисовку полей, общий limiter и настройки канал берёт
+    у журнала, которому принадлежит.
+    Ошибки отложенных правок учитываются в счётчике failed журнала.
+    """
+
+    def __init__(self, room_id: int, journal: "MessageJournal") -> None:
         self.room_id = room_id
+        self.journal = journal
         self.lobby_message: Message | None = None
         self.room_message: Message | None = None
         self.message_queue: deque[str] = deque(maxlen=10)
-        self.bot = bot
-        self.default_markup = default_markup
+        self.bot = journal.bot
+        self.default_markup = journal.default_markup
         self.markup: InlineKeyboardMarkup | None = self.default_markup
-        self.board: BufferedInputFile | None = None
+        self.board: BoardImage | None = None
+        self.board_view: BoardView | None = None
+        self.renderer = journal.renderer
+        self.limiter = journal.limiter
+        self.layers = BoardLayers()
+        self.last_used = monotonic()
+
+        # Пока идёт разбор пачки событий, журнал отправляется один раз
+        self.batch = False
+        self.pending = False
+
+        # Отложенная правка журнала и последние отправленные подпись
+        # и клавиатура
+        self.edit_delay = journal.settings.edit_delay
+        self._edit_task: asyncio.Task[None] | None = None
+        self._sent: tuple[str, InlineKeyboardMarkup | None] | None = None
 
         self.semaphore = asyncio.Semaphore()
 
@@ -118,31 +165,55 @@ class MessageChannel:
     ) -> None:
         """Отправляет сообщение-лобби о начале новой игры."""
         if self.lobby_message is None:
-            lobby_message = await self.bot.send_message(
-                text=message,
-                chat_id=self.room_id,
-                reply_markup=reply_markup,
+            lobby_message = await self.limiter.call(
+                self.room_id,
+                Priority.LOBBY,
+                lambda: self.bot.send_message(
+                    text=message,
+                    chat_id=self.room_id,
+                    reply_markup=reply_markup,
+                ),
             )
             if isinstance(lobby_message, Message):
                 self.lobby_message = lobby_message
 
         else:
-            await self.lobby_message.edit_text(
-                text=message,
-                reply_markup=reply_markup,
+            lobby = self.lobby_message
+            await self.limiter.call(
+                self.room_id,
+                Priority.LOBBY,
+                lambda: lobby.edit_text(
+                    text=message,
+                    reply_markup=reply_markup,
+                ),
             )
 
     async def send_message(self, text: str) -> Message:
-        """Отправляет сообщение в комнату."""
-        if self.board is None:
+        """Отправляет сообщение в комнату.
+
+        После первой загрузки поля запоминает его file_id, чтобы больше
+        не загружать такое же поле.
+        """
+        if self.board is None or self.board_view is None:
             raise ValueError("Board image not generated")
 
-        return await self.bot.send_photo(
-            photo=self.board,
-            chat_id=self.room_id,
-            caption=text,
-            reply_markup=self.markup,
+        board, view, markup = self.board, self.board_view, self.markup
+        message = await self.limiter.call(
+            self.room_id,
+            Priority.TURN,
+            lambda: self.bot.send_photo(
+                photo=board,
+                chat_id=self.room_id,
+                caption=text,
+                reply_markup=markup,
+            ),
         )
+        if isinstance(board, BufferedInputFile) and message.photo:
+            file_id = message.photo[-1].file_id
+            self.renderer.cache.put(view, file_id)
+            if self.board is board:
+                self.board = file_id
+        return message
 
     async def send(self) -> None:
         """Отправляет журнал в чат.
@@ -151,29 +222,90 @@ class MessageChannel:
         новое сообщение с журналом.
         Если же журнал привязан, то изменится текст сообщения.
         По умолчанию журнал очищается при каждом новом ходе игрока.
+        Во время разбора пачки событий отправка откладывается до flush.
+        Правка уже отправленного журнала откладывается на edit_delay.
         """
-        if len(self.message_queue) == 0:
+        if self.batch:
+            self.pending = True
+            return None
+
+        if self.room_message is not None and self.edit_delay > 0:
+            if self._edit_task is None:
+                self._edit_task = asyncio.create_task(self._delayed_flush())
             return None
+        await self.flush()
+
+    @property
+    def unsent(self) -> bool:
+        """Есть ли изменения журнала, которые ещё не отправлены."""
+        return self.pending or self._edit_task is not None
+
+    async def _delayed_flush(self) -> None:
+        await asyncio.sleep(self.edit_delay)
+        self._edit_task = None
+        await self.safe_flush()
+
+    async def safe_flush(self) -> None:
+        """Отправляет журнал в чат, записывая ошибку вместо выброса.
+
+        Ошибка учитывается в счётчике failed журнала, как и ошибки
+        разбора событий.
+        """
+        try:
+            await self.flush()
+        except Exception as e:
+            self.journal.failed += 1
+            logger.opt(exception=e).error(
+                "Unable to send journal in room {}", self.room_id
+            )
+
+    async def flush(self) -> None:
+        """Отправляет журнал в чат, не дожидаясь конца пачки событий.
+
+        Отложенная правка журнала выполняется сразу.
+        """
+        self.pending = False
+        if self._edit_task is not None:
+            self._edit_task.cancel()
+            self._edit_task = None
 
         async with self.semaphore:
+            if len(self.message_queue) == 0:
+                return None
+
+            caption = "\n".join(self.message_queue)
             if self.room_message is None:
-                self.room_message = await self.send_message(
-                    text="\n".join(self.message_queue),
-                )
-            else:
-                await self.room_message.edit_caption(
-                    caption="\n".join(self.message_queue),
-                    reply_markup=self.markup,
+                self.room_message = await self.send_message(text=caption)
+            elif self._sent != (caption, self.markup):
+                room_message, markup = self.room_message, self.markup
+                await self.limiter.call(
+                    self.room_id,
+                    Priority.EDIT,
+                    lambda: room_message.edit_caption(
+                        caption=caption,
+                        reply_markup=markup,
+                    ),
                 )
+            self._sent = (caption, self.markup)
 
     async def clear(self) -> None:
         """Очищает буфер событий и сбрасывает клавиатуру."""
-        self.markup = self.default_markup
-        self.lobby_message = None
-        if self.room_message is not None:
-            await self.room_message.edit_reply_markup(reply_markup=None)
-            self.room_message = None
-        self.message_queue = deque(maxlen=10)
+        if self.unsent:
+            await self.flush()
+
+        async with self.semaphore:
+            self.markup = self.default_markup
+            self.lobby_message = None
+            if self.room_message is not None:
+                room_message = self.room_message
+                await self.limiter.call(
+                    self.room_id,
+                    Priority.EDIT,
+                    lambda: room_message.edit_reply_markup(reply_markup=None),
+                )
+                self.room_message = None
+            self.message_queue = deque(maxlen=10)
+            self._sent = None
 
     def set_markup(self, markup: InlineKeyboardMarkup | None) -> None:
         """Устанавливает клавиатуру для игровых событий."""
@@ -183,35 +315,203 @@ class MessageChannel:
         """Добавляет новую запись в буфер сообщений."""
         self.message_queue.append(text)
 
-    def gen_board(self, event: Event) -> None:
-        """Обновляет игровое поле."""
-        self.board = generate_board(event.game)
+    async def gen_board(self, event: Event) -> None:
+        """Обновляет игровое поле, не блокируя цикл событий."""
+        self.board_view, self.board = await self.renderer.render(
+            self.room_id, BoardView.from_game(event.game), self.layers
+        )
 
 
 class MessageJournal(BaseEventHandler):
-    """Обрабатывает события в рамках Telegram бота."""
+    """Обрабатывает события в рамках Telegram бота.
+
+    У каждой комнаты своя очередь событий и одна задача, которая
+    разбирает её по порядку, пока очередь не опустеет.
+    Движок отдаёт события синхронно, потому очередь не ограничена сама
+    по себе. Вместо этого бот ждёт wait_ready перед обработкой
+    обновления, пока в комнате не меньше room_backlog пачек или всего
+    не меньше max_pending событий.
+
+    Каналы сообщений заброшенных комнат выселяются вызовом evict по
+    channel_ttl и max_channels.
+    Все ограничения собраны в JournalSettings.
+
+    Поля всех комнат рисует общий renderer вне цикла событий.
+    Запросы всех каналов к Telegram проходят через общий limiter.
+    """
 
-    def __init__(self, bot: Bot, router: EventRouter) -> None:
-        self.channels: dict[int, MessageChannel] = {}
+    def __init__(
+        self,
+        bot: Bot,
+        router: EventRouter,
+        settings: JournalSettings | None = None,
+        renderer: BoardRenderer | None = None,
+        limiter: RateLimiter | None = None,
+    ) -> None:
+        self.settings = settings or JournalSettings()
+        # Порядок каналов от давно использованных к недавним
+        self.channels: OrderedDict[int, MessageChannel] = OrderedDict()
+        self.evicted_channels = 0
         self._loop = asyncio.get_running_loop()
         self.bot: Bot = bot
         self.default_markup = TURN_MARKUP
         self.router = router
+        self.renderer = renderer or BoardRenderer()
+        self.limiter = limiter or RateLimiter()
+
+        # Неразобранные события комнат и задачи, которые их разбирают
+        self.queues: dict[int, deque[Event | Sequence[Event]]] = {}
+        self.workers: dict[int, asyncio.Task[None]] = {}
+        self.pending = 0
+        self.failed = 0
+        self._progress = asyncio.Condition()
 
     def push(self, event: Event) -> None:
-        """Обрабатывает входящие события."""
+        """Ставит событие в очередь комнаты."""
         logger.debug(event)
-        self._loop.create_task(self.router.process(event, self))
+        self._enqueue(event.room_id, event, 1)
+
+    def push_many(self, events: Sequence[Event]) -> None:
+        """Ставит все события хода в очередь комнаты одной пачкой."""
+        logger.debug("Batch of {} events", len(events))
+        self._enqueue(events[0].room_id, events, len(events))
+
+    def _enqueue(
+        self, room_id: int, item: Event | Sequence[Event], size: int
+    ) -> None:
+        queue = self.queues.get(room_id)
+        if queue is None:
+            queue = deque()
+            self.queues[room_id] = queue
+        queue.append(item)
+        self.pending += size
+        if room_id not in self.workers:
+            self.workers[room_id] = self._loop.create_task(
+                self._drain(room_id, queue)
+            )
+
+    async def _drain(
+        self, room_id: int, queue: deque[Event | Sequence[Event]]
+    ) -> None:
+        """Разбирает очередь комнаты по порядку, пока она не опустеет."""
+        try:
+            while len(queue) > 0:
+                item = queue[0]
+                size = 1 if isinstance(item, Event) else len(item)
+                try:
+                    if isinstance(item, Event):
+                        await self.router.process(item, self)
+                    else:
+                        await self.process_batch(item)
+                except Exception as e:
+                    self.failed += 1
+                    logger.opt(exception=e).error(
+                        "Unable to process events in room {}", room_id
+                    )
+                finally:
+                    queue.popleft()
+                    self.pending -= size
+                    async with self._progress:
+                        self._progress.notify_all()
+        finally:
+            del self.queues[room_id]
+            del self.workers[room_id]
+
+    def backlog(self, room_id: int) -> int:
+        """Сколько пачек событий ждут разбора в комнате."""
+        queue = self.queues.get(room_id)
+        return 0 if queue is None else len(queue)
+
+    async def wait_ready(self, room_id: int) -> None:
+        """Ждёт, пока у комнаты и у бота хватит места для событий."""
+        if (
+            self.backlog(room_id) < self.settings.room_backlog
+            and self.pending < self.settings.max_pending
+        ):
+            return None
+        async with self._progress:
+            await self._progress.wait_for(
+                lambda: (
+                    self.backlog(room_id) < self.settings.room_backlog
+                    and self.pending < self.settings.max_pending
+                )
+            )
+
+    async def close(self) -> None:
+        """Дожидается разбора всех очередей событий.
+
+        После этого сразу отправляет отложенные правки журналов.
+        """
+        while len(self.workers) > 0:
+            await asyncio.gather(*self.workers.values())
+        await asyncio.gather(
+            *(c.safe_flush() for c in self.channels.values() if c.unsent)
+        )
+
+    async def process_batch(self, events: Sequence[Event]) -> None:
+        """Обрабатывает события по порядку и отправляет журнал один раз."""
+        channel = self.get_channel(events[0].room_id)
+        channel.batch = True
+        try:
+            for event in events:
+                await self.router.process(event, self)
+        finally:
+            channel.batch = False
+            if channel.pending:
+                channel.pending = False
+                await channel.send()
 
     def get_channel(self, room_id: int) -> MessageChannel:
         """Получает/создаёт канал сообщений для чата."""
         channel = self.channels.get(room_id)
         if channel is None:
-            channel = MessageChannel(room_id, self.bot, self.default_markup)
+            channel = MessageChannel(room_id, self)
             self.channels[room_id] = channel
-
+        else:
+            self.channels.move_to_end(room_id)
+        channel.last_used = monotonic()
         return channel
 
     def remove_channel(self, room_id: int) -> None:
         """Устанавливает канал сообщений для чата."""
-        self.channels.pop(room_id)
+        self.channels.pop(room_id, None)
+
+    def evict(self) -> int:
+        """Выселяет давно не использованные каналы сообщений.
+
+        Возвращает количество выселенных каналов.
+        """
+        evicted = 0
+        if self.settings.channel_ttl is not None:
+            deadline = monotonic() - self.settings.channel_ttl
+            while self.channels:
+                room_id, channel = next(iter(self.channels.items()))
+                if (
+                    channel.last_used > deadline
+                    or room_id in self.queues
+                    or channel.unsent
+                ):
+                    break
+                self.channels.pop(room_id)
+                evicted += 1
+
+        if self.settings.max_channels is not None:
+            excess = len(self.channels) - self.settings.max_channels
+            # Каналы комнат с неразобранными событиями или отложенной
+            # правкой ещё нужны
+            idle = list(
+                islice(
+                    (
+                        r
+                        for r, c in self.channels.items()
+                        if r not in self.queues and not c.unsent
+                    ),
+                    max(excess, 0),
+                )
+            )
+            for room_id in idle:
+                del self.channels[room_id]
+            evicted += len(idle)
+
+        self.evicted_channels += evicted
+        return evicted
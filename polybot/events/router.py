@@ -1,6 +1,14 @@
 """Маршрутизация событий от движка."""
 
-from maupoly.enums import GameEvents
+from maupoly.enums import GameEvents, TurnState
+from maupoly.events import (
+    DiceData,
+    LeaveData,
+    MoneyData,
+    MoveData,
+    RentData,
+    StateData,
+)
 from polybot import keyboards, messages
 from polybot.config import sm
 from polybot.events.journal import EventContext, EventRouter
@@ -38,7 +46,7 @@ async def end_session(ctx: EventContext) -> None:
 @er.handler(event=GameEvents.GAME_START)
 async def start_game(ctx: EventContext) -> None:
     """Оповещает что пользователь зашёл в игру."""
-    ctx.gen_board()
+    await ctx.gen_board()
     ctx.add(messages.get_new_game_message(ctx.event.game))
     await ctx.send()
 
@@ -73,7 +81,7 @@ async def join_player(ctx: EventContext) -> None:
 async def leave_player(ctx: EventContext) -> None:
     """Оповещает что пользователь зашёл в игру."""
     # Это может бывать выход из игры до её начала
-    if ctx.event.data == "win":
+    if isinstance(ctx.event.data, LeaveData) and ctx.event.data.win:
         ctx.add(f"👑 {ctx.event.player.name} победил(а)!\n")
     else:
         ctx.add(f"👋 {ctx.event.player.name} покидает игру!\n")
@@ -93,7 +101,7 @@ async def next_turn(ctx: EventContext) -> None:
 
     # Создаём новое сообщение
     await ctx.clear()
-    ctx.gen_board()
+    await ctx.gen_board()
     ctx.add(
         f"\n🍰 <b>ход</b>: {ctx.event.game.player.name} "
         f"(💸 {ctx.event.player.balance})"
@@ -108,11 +116,14 @@ async def next_turn(ctx: EventContext) -> None:
 @er.handler(event=GameEvents.GAME_STATE)
 async def new_game_state(ctx: EventContext) -> None:
     """Изменение игрового состояния."""
-    if ctx.event.data == "buy":
+    if not isinstance(ctx.event.data, StateData):
+        raise ValueError("Game state event must contain StateData")
+
+    if ctx.event.data.state == TurnState.BYU:
         ctx.add(f"👀 {ctx.event.player.name} задумывается о покупке.")
         ctx.set_markup(keyboards.get_buy_field_markup(ctx.event.player))
     else:
-        ctx.add(f"⚙️ Новое состояние: {ctx.event.data}")
+        ctx.add(f"⚙️ Новое состояние: {ctx.event.data.state}")
         ctx.set_markup(keyboards.NEXT_MARKUP)
     await ctx.send()
 
@@ -124,24 +135,31 @@ async def new_game_state(ctx: EventContext) -> None:
 @er.handler(event=GameEvents.PLAYER_DICE)
 async def roll_dice(ctx: EventContext) -> None:
     """Оповещает что пользователь зашёл в игру."""
-    ctx.add(f"🎲 На кубике {ctx.event.data}")
+    dice = ctx.event.data
+    if not isinstance(dice, DiceData):
+        raise ValueError("Dice event must contain DiceData")
+    ctx.add(f"🎲 На кубике {dice.first} + {dice.second} ({dice.total})")
 
 
 @er.handler(event=GameEvents.PLAYER_MOVE)
 async def move_player(ctx: EventContext) -> None:
     """Когда игрок перемещается по полю."""
-    field_status = messages.field_status(ctx.event.player.field)
+    if not isinstance(ctx.event.data, MoveData):
+        raise ValueError("Move event must contain MoveData")
+    field_status = messages.field_status(ctx.event.game, ctx.event.data.end)
     ctx.add(f"🧭 Вы попали на поле {field_status}!")
 
 
 @er.handler(event=GameEvents.PLAYER_BUY)
 async def pay_field(ctx: EventContext) -> None:
     """Когда пользователь попал на поле, которое можно купить."""
-    cost, is_reward = ctx.event.data.split()
-    if is_reward == "true":
-        ctx.add(f"💸 {ctx.event.player.name} Получает {cost}")
+    payment = ctx.event.data
+    if not isinstance(payment, MoneyData):
+        raise ValueError("Payment event must contain MoneyData")
+    if payment.reward:
+        ctx.add(f"💸 {ctx.event.player.name} Получает {payment.amount}")
     else:
-        ctx.add(f"💸 {ctx.event.player.name} должен заплатить {cost}")
+        ctx.add(f"💸 {ctx.event.player.name} должен заплатить {payment.amount}")
     ctx.set_markup(keyboards.NEXT_MARKUP)
     await ctx.send()
 
@@ -152,10 +170,18 @@ async def byu_field(ctx: EventContext) -> None:
     ctx.add(f"💸 {ctx.event.player.name} покупает поле.")
 
 
+@er.handler(event=GameEvents.PLAYER_RENT)
+async def pay_rent(ctx: EventContext) -> None:
+    """Когда игрок платит ренту владельцу поля."""
+    if not isinstance(ctx.event.data, RentData):
+        raise ValueError("Rent event must contain RentData")
+    ctx.add(f"🏠 {ctx.event.player.name} платит ренту {ctx.event.data.amount}")
+
+
 @er.handler(event=GameEvents.PLAYER_CHANCE)
 async def player_chance(ctx: EventContext) -> None:
     """Когда игрок попал на поле шанс или общественная казна."""
-    ctx.add(f"✨ {ctx.event.data}!")
+    ctx.add("✨ No implemented!")
 
 
 @er.handler(event=GameEvents.PLAYER_PRISON)
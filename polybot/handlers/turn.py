@@ -3,7 +3,7 @@
 from aiogram import F, Router
 from aiogram.types import CallbackQuery
 
-from maupoly.dice import Dice
+from maupoly.enums import TurnState
 from maupoly.game import MonoGame
 from maupoly.player import Player
 from polybot import filters
@@ -17,8 +17,15 @@ router = Router(name="Turn")
 
 @router.callback_query(F.data == "dice", filters.NowPlaying())
 async def roll_dice(query: CallbackQuery, game: MonoGame) -> None:
-    """Обрабатывает бросок кубика."""
-    game.process_turn(Dice.new())
+    """Обрабатывает бросок кубика.
+
+    Кубик бросается только в начале хода: после броска ход либо
+    переходит дальше, либо ждёт решения игрока.
+    """
+    if game.state != TurnState.NEXT:
+        await query.answer("🎲 Кубик в этот ход уже брошен.")
+        return
+    game.process_turn(game.roll_dice())
 
 
 @router.callback_query(F.data == "next", filters.NowPlaying())
@@ -0,0 +1,255 @@
+"""Ограничение частоты запросов бота к Telegram.
+
+Telegram позволяет отправлять около 30 сообщений в секунду на всех и
+около 20 сообщений в минуту в одну группу.
+Потому все каналы сообщений отправляют запросы через общую очередь:
+- У каждого чата и у бота в целом своё ведро жетонов.
+- Первыми уходят приглашения к ходу, затем правки журнала, затем лобби.
+- Если Telegram всё же ответил RetryAfter, чат ждёт указанное время,
+  а запрос возвращается в очередь на своё место.
+"""
+
+import asyncio
+import heapq
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from enum import IntEnum
+from itertools import count
+from time import monotonic
+from typing import Any, TypeVar
+
+from aiogram.exceptions import TelegramRetryAfter
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """Очерёдность запросов, меньше уходит раньше.
+
+    - turn: Новое сообщение хода с полем.
+    - edit: Правка журнала и клавиатуры.
+    - lobby: Сообщения лобби.
+    """
+
+    TURN = 0
+    EDIT = 1
+    LOBBY = 2
+
+
+class TokenBucket:
+    """Ведро жетонов: не больше rate запросов в секунду.
+
+    Полное ведро позволяет сразу отправить capacity запросов.
+    После RetryAfter ведро закрывается до указанного момента.
+    """
+
+    __slots__ = ("blocked_until", "capacity", "rate", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def wait(self, now: float) -> float:
+        """Сколько секунд ждать до следующего запроса."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        """Забирает жетон на отправку запроса."""
+        self.tokens -= 1
+
+    def block(self, until: float) -> None:
+        """Закрывает ведро до момента until."""
+        self.blocked_until = max(self.blocked_until, until)
+
+    def idle(self, now: float) -> bool:
+        """Ведро полное и его можно забыть."""
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+@dataclass(order=True, slots=True)
+class _Request:
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    request: Callable[[], Awaitable[Any]] = field(compare=False)
+    future: "asyncio.Future[Any]" = field(compare=False)
+    enqueued: float = field(compare=False)
+
+
+class RateLimiter:
+    """Общая очередь исходящих запросов к Telegram.
+
+    - global_rate: Сколько запросов в секунду на всех.
+    - chat_rate: Сколько запросов в секунду в один чат.
+    - chat_burst: Сколько запросов в чат можно отправить разом.
+
+    Запросы уходят по приоритету, а внутри приоритета по очереди.
+    Запрос передаётся функцией без аргументов, чтобы его можно было
+    повторить после RetryAfter.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 20 / 60,
+        chat_burst: float = 3,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.clock = clock
+        self.global_bucket = TokenBucket(global_rate, global_rate, clock())
+        self.buckets: dict[int, TokenBucket] = {}
+
+        self._queue: list[_Request] = []
+        self._seq = count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        # Запросы, которые уже отправлены и ждут ответа
+        self._sending: set[asyncio.Task[None]] = set()
+
+        self.sent = 0
+        self.retried = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def depth(self) -> int:
+        """Сколько запросов ждут отправки."""
+        return len(self._queue)
+
+    @property
+    def mean_wait(self) -> float:
+        """Среднее время ожидания запроса в очереди, в секундах."""
+        return self.total_wait / self.sent if self.sent > 0 else 0.0
+
+    async def call(
+        self,
+        chat_id: int,
+        priority: Priority,
+        request: Callable[[], Awaitable[T]],
+    ) -> T:
+        """Ставит запрос в очередь и ждёт его ответа."""
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        seq = next(self._seq)
+        heapq.heappush(
+            self._queue,
+            _Request(priority, seq, chat_id, request, future, self.clock()),
+        )
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    def reset_stats(self) -> None:
+        """Начинает подсчёт отправленных запросов и ожидания заново."""
+        self.sent = 0
+        self.retried = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def evict(self) -> int:
+        """Забывает вёдра чатов, которые давно ничего не отправляли."""
+        now = self.clock()
+        idle = [c for c, b in self.buckets.items() if b.idle(now)]
+        for chat_id in idle:
+            del self.buckets[chat_id]
+        return len(idle)
+
+    def close(self) -> None:
+        """Останавливает отправку запросов."""
+        if self._task is not None:
+            self._task.cancel()
+
+    # Отправка запросов
+    # =================
+
+    async def _run(self) -> None:
+        while True:
+            delay = self._dispatch()
+            self._wakeup.clear()
+            if delay is None:
+                await self._wakeup.wait()
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except TimeoutError:
+                pass
+
+    def _bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self.buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst, now)
+            self.buckets[chat_id] = bucket
+        return bucket
+
+    def _dispatch(self) -> float | None:
+        """Отправляет всё, что можно, и возвращает сколько ждать."""
+        now = self.clock()
+        delay: float | None = None
+        deferred: list[_Request] = []
+        while len(self._queue) > 0:
+            wait = self.global_bucket.wait(now)
+            if wait > 0:
+                delay = wait if delay is None else min(delay, wait)
+                break
+
+            request = heapq.heappop(self._queue)
+            if request.future.done():
+                continue
+            bucket = self._bucket(request.chat_id, now)
+            wait = bucket.wait(now)
+            if wait > 0:
+                deferred.append(request)
+                delay = wait if delay is None else min(delay, wait)
+                continue
+
+            bucket.take()
+            self.global_bucket.take()
+            wait = now - request.enqueued
+            self.sent += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            task = asyncio.create_task(self._send(request))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+        for request in deferred:
+            heapq.heappush(self._queue, request)
+        return delay
+
+    async def _send(self, request: _Request) -> None:
+        try:
+            result = await request.request()
+        except TelegramRetryAfter as e:
+            logger.warning(
+                "Retry after {} s in chat {}", e.retry_after, request.chat_id
+            )
+            self.retried += 1
+            self._bucket(request.chat_id, self.clock()).block(
+                self.clock() + e.retry_after
+            )
+            heapq.heappush(self._queue, request)
+            self._wakeup.set()
+        except Exception as e:
+            if not request.future.done():
+                request.future.set_exception(e)
+        else:
+            if not request.future.done():
+                request.future.set_result(result)
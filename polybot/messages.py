@@ -6,7 +6,7 @@
 from datetime import datetime
 
 from maupoly import exceptions
-from maupoly.field import BaseField, BaseRentField
+from maupoly.field import BaseRentField
 from maupoly.game import MonoGame
 
 # Статические сообщения
@@ -48,6 +48,16 @@ CLOSED_ROOM = (
     "Пожалуйста дождитесь <b>окончания партии</b>."
 )
 
+LOBBY_TIMEOUT = (
+    "⏰ В комнате давно ничего не происходит, потому она <b>закрыта</b>.\n"
+    "🍰 Создайте новую при помощи /game."
+)
+
+STORAGE_CONFLICT = (
+    "🔄 Пока вы нажимали кнопку, игра уже <b>изменилась</b>.\n"
+    "Пожалуйста попробуйте ещё раз."
+)
+
 
 # Вспомогательные функции
 # =======================
@@ -148,6 +158,9 @@ def get_error_message(exc: Exception) -> str:
     if isinstance(exc, exceptions.NotEnoughPlayersError):
         return NOT_ENOUGH_PLAYERS
 
+    if isinstance(exc, exceptions.StorageConflictError):
+        return STORAGE_CONFLICT
+
     return f"👀 Что-то пошло не по плану...\n\n{exc}"
 
 
@@ -173,12 +186,14 @@ def end_game_message(game: MonoGame) -> str:
 # =============
 
 
-def field_status(field: BaseField | BaseRentField) -> str:
+def field_status(game: MonoGame, index: int) -> str:
     """Краткая информация о поле."""
+    field = game.fields[index]
     res = f"{field.type.symbol}<b>{field.name}</b>"
     if isinstance(field, BaseRentField):
-        if field.owner is not None:
-            res += f" {field.owner.name} {field.count_rent()}💸"
+        owner = game.get_owner(index)
+        if owner is not None:
+            res += f" {owner.name} {field.count_rent(game, index)}💸"
         else:
             res += f" цена {field.buy_cost}💸"
     return res
@@ -0,0 +1,96 @@
+r"""Отправка записанных обновлений на вебхук бота.
+
+Помогает проверить режим вебхука без Telegram.
+Обновления берутся из файла, по одному JSON объекту на строку.
+Например, их можно записать из ответа getUpdates, пока бот выключен:
+
+```sh
+curl "https://api.telegram.org/bot$TOKEN/getUpdates" \
+    | jq -c ".result[]" > updates.jsonl
+```
+
+Бот запускается с заданным WEBHOOK_PORT и без WEBHOOK_URL, после чего
+обновления отправляются на сервер несколько раз подряд:
+
+```sh
+uv run -m polybot.post_updates updates.jsonl --repeat 100
+```
+
+Выводит ответы сервера и сколько обновлений в секунду он принял.
+"""
+
+import argparse
+import asyncio
+import json
+from collections import Counter
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+from aiohttp import ClientSession
+
+
+async def post_updates(
+    url: str,
+    updates: list[dict[str, Any]],
+    concurrency: int,
+    secret: str | None,
+) -> Counter[int]:
+    """Отправляет обновления, не больше concurrency запросов разом.
+
+    Возвращает число ответов сервера с каждым кодом.
+    """
+    headers = (
+        {"X-Telegram-Bot-Api-Secret-Token": secret}
+        if secret is not None
+        else {}
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses: Counter[int] = Counter()
+
+    async def post(session: ClientSession, update: dict[str, Any]) -> None:
+        async with semaphore, session.post(url, json=update) as response:
+            statuses[response.status] += 1
+
+    async with ClientSession(headers=headers) as session:
+        await asyncio.gather(*(post(session, u) for u in updates))
+    return statuses
+
+
+def main() -> None:
+    """Отправляет записанные обновления и выводит скорость приёма."""
+    parser = argparse.ArgumentParser(
+        prog="polybot.post_updates",
+        description="Отправка записанных обновлений на вебхук бота.",
+    )
+    parser.add_argument("updates", type=Path)
+    parser.add_argument("-u", "--url", default="http://127.0.0.1:8080/webhook")
+    parser.add_argument("-n", "--repeat", type=int, default=1)
+    parser.add_argument("-c", "--concurrency", type=int, default=50)
+    parser.add_argument("--secret", default=None)
+    args = parser.parse_args()
+
+    with args.updates.open() as f:
+        recorded = [json.loads(line) for line in f if line.strip()]
+    # Telegram не присылает одно обновление дважды
+    updates = [
+        {**update, "update_id": i}
+        for i, update in enumerate(recorded * args.repeat)
+    ]
+
+    start = perf_counter()
+    statuses = asyncio.run(
+        post_updates(args.url, updates, args.concurrency, args.secret)
+    )
+    elapsed = perf_counter() - start
+
+    for status, count in sorted(statuses.items()):
+        print(f"HTTP {status}: {count}")
+    print(
+        f"{len(updates)} updates in {elapsed:.2f} s, "
+        f"{len(updates) / elapsed:.0f} updates/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Проверка кеша полей вместе с отправкой поля в Telegram.
+
+Вместо бота используется заглушка, которая запоминает отправленные
+поля и отвечает сообщением с новым file_id.
+
+```sh
+uv run -m unittest discover tests
+```
+"""
+
+import unittest
+from types import SimpleNamespace
+from typing import Any
+
+from aiogram.types import BufferedInputFile
+
+from maupoly.enums import GameEvents
+from maupoly.events import Event
+from maupoly.game import MonoGame
+from maupoly.sim import Simulator
+from polybot.boardgen import BoardCache, BoardRenderer, BoardView
+from polybot.events.journal import EventRouter, MessageJournal
+from polybot.limiter import RateLimiter
+
+
+class StubBot:
+    """Бот, который ничего не отправляет в Telegram."""
+
+    def __init__(self) -> None:
+        self.photos: list[BufferedInputFile | str] = []
+        self.fail = False
+
+    async def send_photo(
+        self, photo: BufferedInputFile | str, **kwargs: object
+    ) -> SimpleNamespace:
+        """Запоминает поле и отвечает сообщением с новым file_id."""
+        self.photos.append(photo)
+        if self.fail:
+            raise ConnectionError("Upload failed")
+        file_id = f"file-{len(self.photos)}"
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=file_id)])
+
+
+def new_game() -> MonoGame:
+    """Начатая игра, поле которой будет отправляться."""
+    game = Simulator().new_game(seed=0)
+    game.start()
+    return game
+
+
+class BoardCacheTest(unittest.TestCase):
+    """Вытеснение полей из кеша."""
+
+    def setUp(self) -> None:
+        """Начатая игра и её поле."""
+        self.game = new_game()
+        self.view = BoardView.from_game(self.game)
+
+    def other_view(self) -> BoardView:
+        """Поле игры после следующего хода."""
+        self.game.process_turn(self.game.roll_dice())
+        return BoardView.from_game(self.game)
+
+    def test_file_id_frees_bytes(self) -> None:
+        """file_id заменяет изображение и освобождает его байты."""
+        cache = BoardCache()
+        cache.put(self.view, BufferedInputFile(b"x" * 100, "board.png"))
+        self.assertEqual(cache.size, 100)
+        cache.put(self.view, "file")
+        self.assertEqual(cache.size, 0)
+        self.assertEqual(cache.get(self.view), "file")
+
+    def test_max_bytes(self) -> None:
+        """Изображения вытесняются по занятым байтам."""
+        cache = BoardCache(max_bytes=150)
+        other = self.other_view()
+        cache.put(self.view, BufferedInputFile(b"x" * 100, "board.png"))
+        cache.put(other, BufferedInputFile(b"x" * 100, "board.png"))
+        self.assertIsNone(cache.get(self.view))
+        self.assertIsNotNone(cache.get(other))
+        self.assertEqual(cache.size, 100)
+
+    def test_max_size(self) -> None:
+        """Поля вытесняются по их числу."""
+        cache = BoardCache(max_size=1)
+        other = self.other_view()
+        cache.put(self.view, "first")
+        cache.put(other, "second")
+        self.assertIsNone(cache.get(self.view))
+        self.assertEqual(cache.get(other), "second")
+
+
+class BoardUploadTest(unittest.IsolatedAsyncioTestCase):
+    """Отправка полей через канал сообщений."""
+
+    async def asyncSetUp(self) -> None:
+        """Журнал с заглушкой вместо бота."""
+        self.bot = StubBot()
+        self.renderer = BoardRenderer(1)
+        self.limiter = RateLimiter(chat_burst=10)
+        bot: Any = self.bot
+        self.journal = MessageJournal(
+            bot, EventRouter(), renderer=self.renderer, limiter=self.limiter
+        )
+        self.game = new_game()
+        self.event = Event(
+            0, self.game.player, GameEvents.GAME_START, None, self.game
+        )
+
+    async def asyncTearDown(self) -> None:
+        """Останавливает потоки отрисовки и отправку запросов."""
+        self.renderer.close()
+        self.limiter.close()
+
+    async def send_board(self, room_id: int) -> None:
+        """Рисует поле игры и отправляет его в комнату."""
+        channel = self.journal.get_channel(room_id)
+        await channel.gen_board(self.event)
+        await channel.send_message("turn")
+
+    async def test_miss_uploads(self) -> None:
+        """Новое поле рисуется и загружается."""
+        await self.send_board(1)
+        self.assertIsInstance(self.bot.photos[0], BufferedInputFile)
+        self.assertEqual(self.renderer.rendered, 1)
+        view = BoardView.from_game(self.game)
+        self.assertEqual(self.renderer.cache.get(view), "file-1")
+
+    async def test_hit_reuses_file_id(self) -> None:
+        """Уже загруженное поле отправляется по file_id."""
+        await self.send_board(1)
+        await self.send_board(2)
+        self.assertEqual(self.bot.photos[1], "file-1")
+        self.assertEqual(self.renderer.rendered, 1)
+        self.assertEqual(self.renderer.cache.hits, 1)
+
+    async def test_failed_upload_not_cached(self) -> None:
+        """Неудачная загрузка не запоминает file_id."""
+        self.bot.fail = True
+        with self.assertRaises(ConnectionError):
+            await self.send_board(1)
+        view = BoardView.from_game(self.game)
+        self.assertIsInstance(self.renderer.cache.get(view), BufferedInputFile)
+
+        # Следующая отправка снова загружает поле
+        self.bot.fail = False
+        await self.send_board(2)
+        self.assertIsInstance(self.bot.photos[1], BufferedInputFile)
+        self.assertEqual(self.renderer.cache.get(view), "file-2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""Проверка отложенных правок журнала сообщений.
+
+Вместо сообщения Telegram используется заглушка, которая запоминает
+правки подписи.
+
+```sh
+uv run -m unittest discover tests
+```
+"""
+
+import asyncio
+import unittest
+from typing import Any
+
+from aiogram.types import InlineKeyboardMarkup
+
+from polybot.boardgen import BoardRenderer
+from polybot.events.journal import EventRouter, JournalSettings, MessageJournal
+from polybot.limiter import RateLimiter
+
+
+class StubMessage:
+    """Сообщение журнала, которое ничего не отправляет в Telegram."""
+
+    def __init__(self) -> None:
+        self.captions: list[str] = []
+        self.fail = False
+
+    async def edit_caption(
+        self, caption: str, reply_markup: InlineKeyboardMarkup | None
+    ) -> None:
+        """Запоминает новую подпись."""
+        if self.fail:
+            raise ConnectionError("Edit failed")
+        self.captions.append(caption)
+
+
+class DelayedEditTest(unittest.IsolatedAsyncioTestCase):
+    """Отложенные правки не теряются и не глотают ошибки."""
+
+    async def asyncSetUp(self) -> None:
+        """Канал с уже отправленным журналом."""
+        self.renderer = BoardRenderer(1)
+        self.limiter = RateLimiter(chat_burst=10)
+        self.message = StubMessage()
+
+    async def asyncTearDown(self) -> None:
+        """Останавливает потоки отрисовки и отправку запросов."""
+        self.renderer.close()
+        self.limiter.close()
+
+    async def edit(self, edit_delay: float) -> MessageJournal:
+        """Добавляет запись в журнал и откладывает его правку."""
+        bot: Any = None
+        journal = MessageJournal(
+            bot,
+            EventRouter(),
+            settings=JournalSettings(edit_delay=edit_delay),
+            renderer=self.renderer,
+            limiter=self.limiter,
+        )
+        channel = journal.get_channel(1)
+        message: Any = self.message
+        channel.room_message = message
+        channel.add("turn")
+        await channel.send()
+        self.assertTrue(channel.unsent)
+        return journal
+
+    async def test_close_sends_pending_edit(self) -> None:
+        """Закрытие журнала сразу отправляет отложенную правку."""
+        journal = await self.edit(edit_delay=60)
+        self.assertEqual(self.message.captions, [])
+        await asyncio.wait_for(journal.close(), 1)
+        self.assertEqual(self.message.captions, ["turn"])
+        self.assertFalse(journal.get_channel(1).unsent)
+
+    async def test_pending_edit_not_evicted(self) -> None:
+        """Канал с отложенной правкой не выселяется."""
+        journal = await self.edit(edit_delay=60)
+        journal.settings = JournalSettings(channel_ttl=0, max_channels=0)
+        self.assertEqual(journal.evict(), 0)
+        await journal.close()
+        self.assertEqual(journal.evict(), 1)
+
+    async def test_failed_edit_counted(self) -> None:
+        """Ошибка отложенной правки учитывается в failed."""
+        self.message.fail = True
+        journal = await self.edit(edit_delay=0.01)
+        await asyncio.sleep(0.1)
+        self.assertEqual(journal.failed, 1)
+        self.assertFalse(journal.get_channel(1).unsent)
+
+
+if __name__ == "__main__":
+    unittest.main()
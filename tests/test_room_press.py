@@ -0,0 +1,140 @@
+"""Проверка повторных нажатий кнопки кубика.
+
+Обновления проходят через настоящий диспетчер бота вместе с его
+middleware, фильтрами и обработчиками.
+Вместо Telegram используется сессия-заглушка, которая запоминает
+ответы на нажатия.
+
+```sh
+uv run -m unittest discover tests
+```
+"""
+
+import asyncio
+import os
+import unittest
+from datetime import datetime
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import AnswerCallbackQuery, TelegramMethod
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from maupoly.enums import Action
+from maupoly.player import BaseUser
+
+# Настройки бота читаются при импорте
+os.environ.setdefault("TELEGRAM_TOKEN", "1:test")
+os.environ.setdefault("ASSETS_PATH", "assets")
+
+from polybot.bot import dp  # noqa: E402
+from polybot.config import sm  # noqa: E402
+from polybot.events.journal import EventRouter, MessageJournal  # noqa: E402
+from polybot.handlers import ROUTERS  # noqa: E402
+
+ROOM_ID = -100
+PRESSES = 8
+
+
+class StubSession(BaseSession):
+    """Сессия, которая отвечает на запросы вместо Telegram."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.answers: list[str | None] = []
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[Any],
+        timeout: int | None = None,
+    ) -> Any:  # noqa: ANN401
+        """Запоминает ответ на нажатие после задержки сети."""
+        await asyncio.sleep(0.01)
+        if isinstance(method, AnswerCallbackQuery):
+            self.answers.append(method.text)
+        return True
+
+    async def stream_content(  # type: ignore[override]
+        self, *args: object, **kwargs: object
+    ) -> Any:  # noqa: ANN401
+        """Файлы в проверке не скачиваются."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Закрывать нечего."""
+
+
+def dice_press(update_id: int, user_id: int) -> Update:
+    """Нажатие кнопки кубика под сообщением комнаты."""
+    return Update(
+        update_id=update_id,
+        callback_query=CallbackQuery(
+            id=str(update_id),
+            from_user=User(id=user_id, is_bot=False, first_name="player"),
+            chat_instance="room",
+            data="dice",
+            message=Message(
+                message_id=1,
+                date=datetime.now(),
+                chat=Chat(id=ROOM_ID, type="group"),
+            ),
+        ),
+    )
+
+
+class RoomPressTest(unittest.IsolatedAsyncioTestCase):
+    """Повторные нажатия одного хода."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Подключает обработчики к диспетчеру, как при запуске бота."""
+        if len(dp.sub_routers) == 0:
+            dp.include_routers(*ROUTERS)
+
+    async def asyncSetUp(self) -> None:
+        """Комната с начатой игрой двух игроков."""
+        self.session = StubSession()
+        self.bot = Bot("1:test", session=self.session)
+        self.journal = MessageJournal(self.bot, EventRouter())
+        self.game = sm.create(ROOM_ID, BaseUser(1, "owner"))
+        sm.join(ROOM_ID, BaseUser(2, "player"))
+        self.game.start()
+
+    async def asyncTearDown(self) -> None:
+        """Удаляет комнату и останавливает журнал."""
+        sm.remove(ROOM_ID)
+        self.journal.renderer.close()
+        self.journal.limiter.close()
+
+    async def press(self, presses: int) -> None:
+        """Текущий игрок жмёт кнопку кубика несколько раз подряд."""
+        user_id = self.game.player.user_id
+        await asyncio.gather(
+            *(
+                dp.feed_update(
+                    self.bot, dice_press(i, user_id), journal=self.journal
+                )
+                for i in range(presses)
+            )
+        )
+
+    def rolls(self) -> int:
+        """Сколько раз за партию бросали кубик.
+
+        Кроме бросков решений нет, а бросок занимает два байта.
+        """
+        return self.game.actions[::2].count(Action.DICE)
+
+    async def test_one_roll_per_turn(self) -> None:
+        """Из всех нажатий одного хода принимается только одно."""
+        await self.press(PRESSES)
+        self.assertEqual(self.rolls(), 1)
+        # Остальные нажатия получили отказ
+        self.assertEqual(len(self.session.answers), PRESSES - 1)
+        self.assertTrue(all(self.session.answers))
+
+
+if __name__ == "__main__":
+    unittest.main()
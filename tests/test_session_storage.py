@@ -0,0 +1,83 @@
+"""Проверка выселения игр в запасное хранилище SQLite.
+
+```sh
+uv run -m unittest discover tests
+```
+"""
+
+import sqlite3
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from maupoly.events import NullEventHandler
+from maupoly.player import BaseUser
+from maupoly.session import SessionManager
+from maupoly.session_storage import MemoryStorage, SQLiteStorage
+
+ROOMS = 100
+MAX_GAMES = 10
+
+
+class SpillTest(unittest.TestCase):
+    """Игры сверх max_games не остаются в памяти."""
+
+    def setUp(self) -> None:
+        """Хранилище в памяти с запасным хранилищем во временном файле."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spill = SQLiteStorage(
+            Path(self.tmp.name) / "spill.db", offload=True
+        )
+        self.storage = MemoryStorage(max_games=MAX_GAMES, spill=self.spill)
+        self.sm = SessionManager(self.storage, NullEventHandler())
+
+    def tearDown(self) -> None:
+        """Закрывает хранилище и удаляет файл."""
+        self.storage.close()
+        self.tmp.cleanup()
+
+    def create_rooms(self) -> None:
+        """Создаёт комнаты с двумя игроками и начинает в них игры."""
+        for room_id in range(ROOMS):
+            game = self.sm.create(room_id, BaseUser(room_id * 2, "owner"))
+            self.sm.join(room_id, BaseUser(room_id * 2 + 1, "guest"))
+            game.start()
+        self.storage.flush()
+
+    def test_resident_bounded(self) -> None:
+        """В памяти только max_games игр, остальные на диске."""
+        self.create_rooms()
+        self.assertEqual(self.storage.resident, MAX_GAMES)
+        self.assertEqual(len(self.spill.games), 0)
+
+        # Обращение к выселенным играм возвращает их по одной
+        for room_id in range(ROOMS):
+            game = self.sm.storage.get_player_game(room_id * 2 + 1)
+            self.assertEqual(game.room_id, room_id)
+            self.assertTrue(game.started)
+            self.storage.flush()
+            self.assertEqual(self.storage.resident, MAX_GAMES)
+            self.assertEqual(len(self.spill.games), 0)
+
+    def test_unwritten_snapshot(self) -> None:
+        """Игра загружается из снимка, который ещё не записан."""
+        written = threading.Event()
+        write = self.spill._write
+
+        def wait_write(conn: sqlite3.Connection, batches: list) -> bool:
+            written.wait()
+            return write(conn, batches)
+
+        self.spill._write = wait_write  # type: ignore[method-assign]
+        self.create_rooms()
+        self.assertEqual(len(self.spill.games), 0)
+
+        game = self.storage.get_game(0)
+        self.assertEqual(game.owner.user_id, 0)
+        self.assertTrue(game.started)
+        written.set()
+
+
+if __name__ == "__main__":
+    unittest.main()